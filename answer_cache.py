@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Persistent answer cache for first-turn questions
+
+Two lookup tiers share one SQLite table:
+- exact: normalized question text (case, punctuation and spacing folded)
+- similar: cosine similarity over character n-gram vectors computed locally
+
+Entries are scoped by model, verbosity and vector store ID, expire after a
+TTL and are evicted least-recently-used once the size cap is reached.
+"""
+
+import hashlib
+import math
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+_PUNCTUATION = re.compile(r"[^\w\s]+")
+
+
+def normalize_question(question: str) -> str:
+    """Fold case, punctuation and whitespace so near-verbatim questions share a key"""
+    text = unicodedata.normalize("NFKC", question).lower()
+    text = _PUNCTUATION.sub(" ", text)
+    return " ".join(text.split())
+
+
+def ngram_vector(text: str, n: int = 3) -> Dict[str, float]:
+    """L2-normalized bag of character n-grams plus whole words"""
+    padded = f" {text} "
+    grams = Counter(padded[i:i + n] for i in range(len(padded) - n + 1))
+    grams.update(f"w:{word}" for word in text.split())
+    norm = math.sqrt(sum(count * count for count in grams.values())) or 1.0
+    return {gram: count / norm for gram, count in grams.items()}
+
+
+def cosine(a: Dict[str, float], b: Dict[str, float]) -> float:
+    """Cosine similarity of two normalized sparse vectors"""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(gram, 0.0) for gram, weight in a.items())
+
+
+@dataclass
+class CachedAnswer:
+    answer: str
+    response_id: Optional[str]
+    match: str  # "exact" or "similar"
+    similarity: float = 1.0
+
+
+class AnswerCache:
+    """SQLite-backed LRU+TTL cache of first-turn answers"""
+
+    def __init__(self, path: Path, ttl_seconds: float, max_entries: int, similarity_threshold: float):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        self._stats = Counter()
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS answers (
+                key TEXT PRIMARY KEY,
+                scope TEXT NOT NULL,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                response_id TEXT,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS answers_last_access ON answers (last_access)")
+        self._db.commit()
+
+        # Similarity index: scope -> {key: n-gram vector}, rebuilt from disk on startup
+        self._vectors: Dict[str, Dict[str, Dict[str, float]]] = {}
+        with self._lock:
+            self._purge_expired()
+            for key, scope, question in self._db.execute("SELECT key, scope, question FROM answers"):
+                self._vectors.setdefault(scope, {})[key] = ngram_vector(question)
+
+    @staticmethod
+    def scope(model: str, verbosity: str, vector_store_id: Optional[str]) -> str:
+        return f"{model}|{verbosity}|{vector_store_id}"
+
+    @staticmethod
+    def make_key(scope: str, normalized: str) -> str:
+        return hashlib.sha256(f"{scope}\n{normalized}".encode("utf-8")).hexdigest()
+
+    def get(self, question: str, model: str, verbosity: str, vector_store_id: Optional[str]) -> Optional[CachedAnswer]:
+        """Look up an answer, trying the exact tier before the similarity tier"""
+        scope = self.scope(model, verbosity, vector_store_id)
+        normalized = normalize_question(question)
+        with self._lock:
+            row = self._fetch(self.make_key(scope, normalized))
+            if row is not None:
+                self._stats["exact_hits"] += 1
+                return CachedAnswer(answer=row[0], response_id=row[1], match="exact")
+
+            vector = ngram_vector(normalized)
+            best_key, best_score = None, 0.0
+            for key, candidate in self._vectors.get(scope, {}).items():
+                score = cosine(vector, candidate)
+                if score > best_score:
+                    best_key, best_score = key, score
+            if best_key is not None and best_score >= self.similarity_threshold:
+                row = self._fetch(best_key)
+                if row is not None:
+                    self._stats["similar_hits"] += 1
+                    return CachedAnswer(answer=row[0], response_id=row[1], match="similar", similarity=best_score)
+
+            self._stats["misses"] += 1
+            return None
+
+    def contains(self, question: str, model: str, verbosity: str, vector_store_id: Optional[str],
+                 max_age: Optional[float] = None) -> bool:
+        """Exact-tier presence check that leaves hit/miss counters and LRU order alone"""
+        key = self.make_key(self.scope(model, verbosity, vector_store_id), normalize_question(question))
+        max_age = self.ttl_seconds if max_age is None else min(max_age, self.ttl_seconds)
+        with self._lock:
+            row = self._db.execute("SELECT created_at FROM answers WHERE key = ?", (key,)).fetchone()
+        return row is not None and time.time() - row[0] <= max_age
+
+    def put(self, question: str, answer: str, response_id: Optional[str],
+            model: str, verbosity: str, vector_store_id: Optional[str]) -> None:
+        """Store an answer and evict least-recently-used entries beyond the cap"""
+        scope = self.scope(model, verbosity, vector_store_id)
+        normalized = normalize_question(question)
+        key = self.make_key(scope, normalized)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, scope, normalized, answer, response_id, now, now),
+            )
+            self._vectors.setdefault(scope, {})[key] = ngram_vector(normalized)
+            self._stats["stores"] += 1
+            self._purge_expired()
+            self._evict_over_cap()
+            self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self._stats["exact_hits"] + self._stats["similar_hits"] + self._stats["misses"]
+            hits = lookups - self._stats["misses"]
+            return {
+                **{name: self._stats[name] for name in
+                   ("exact_hits", "similar_hits", "misses", "stores", "evictions", "expired")},
+                "entries": sum(len(keys) for keys in self._vectors.values()),
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM answers")
+            self._db.commit()
+            self._vectors.clear()
+
+    def _fetch(self, key: str):
+        """Return (answer, response_id) for a live entry and refresh its LRU position"""
+        row = self._db.execute(
+            "SELECT answer, response_id, created_at, scope FROM answers WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if now - row[2] > self.ttl_seconds:
+            self._delete(key, row[3])
+            self._stats["expired"] += 1
+            self._db.commit()
+            return None
+        self._db.execute("UPDATE answers SET last_access = ? WHERE key = ?", (now, key))
+        self._db.commit()
+        return row[0], row[1]
+
+    def _delete(self, key: str, scope: str) -> None:
+        self._db.execute("DELETE FROM answers WHERE key = ?", (key,))
+        self._vectors.get(scope, {}).pop(key, None)
+
+    def _purge_expired(self) -> None:
+        cutoff = time.time() - self.ttl_seconds
+        expired = self._db.execute("SELECT key, scope FROM answers WHERE created_at < ?", (cutoff,)).fetchall()
+        for key, scope in expired:
+            self._delete(key, scope)
+        self._stats["expired"] += len(expired)
+
+    def _evict_over_cap(self) -> None:
+        (count,) = self._db.execute("SELECT COUNT(*) FROM answers").fetchone()
+        excess = count - self.max_entries
+        if excess <= 0:
+            return
+        victims = self._db.execute(
+            "SELECT key, scope FROM answers ORDER BY last_access ASC LIMIT ?", (excess,)
+        ).fetchall()
+        for key, scope in victims:
+            self._delete(key, scope)
+        self._stats["evictions"] += len(victims)
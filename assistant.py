@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Session-free core of the Time Series Course Assistant
+
+Prompts and the responses.create call shape used by ask_bot. Nothing here
+touches Streamlit, so background jobs and scripts build exactly the same
+requests as the live chat.
+"""
+
+import socket
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+import config
+import course_shards
+import tracing
+from prompt_topics import COURSE_MAP, TOPIC_MODULES, classify_topics, topic_context
+
+DEFAULT_VERBOSITY = "low"
+
+
+def supports_verbosity(model: str) -> bool:
+    """text.verbosity is only accepted by the GPT-5 family"""
+    return model.startswith("gpt-5")
+
+
+def request_verbosity(request: Dict[str, Any]) -> str:
+    """Verbosity a request was built with ("default" when the model has no such setting)"""
+    return request.get("text", {}).get("verbosity", "default")
+
+# System instructions: the rules around the course map, which is sent whole (SYSTEM_INSTRUCTIONS)
+# or, with topic prompts, as a one-line outline in a fixed core (kept byte-stable so upstream
+# prompt caching hits) plus the sections the question touches (see prompt_topics)
+_RULES = """
+You are Cyber Diogo, the assistant for the best "Time Series Course" in the world.
+Be concise, direct, and practical. Use active voice. No fluff.
+
+Primary objective
+- Answer questions about the course content and code using the attached Vector Store (transcripts and .py files).
+- Prefer retrieved facts over memory. If the files don't cover it, say so.
+
+Retrieval & citations
+- Always use File Search first.
+- Ground every substantive answer in retrieved snippets.
+- If nothing relevant is found, say: "I don't see this in the course files." Then propose the most likely Sections.
+
+Answer style
+- Keep outputs scannable: short paragraphs, bullets for steps, and minimal runnable code blocks for Python.
+- If "how to do X in Python", show a small snippet with imports and comments.
+- End by asking a question to the user that could be asked in the future.
+- write like talking to a friend. Be approachable, friendly, fun.
+
+Boundaries
+- Don't invent references or numbers.
+- If the question is off-scope (not time series/Python/this curriculum), ask a brief clarifying question or answer at a high level and flag it as outside the course corpus.
+
+"""
+
+_CLOSING = """
+What to prioritize per topic
+- Definitions & when-to-use: ARIMA vs SARIMA vs SARIMAX; SES/DES/TES selection; Prophet vs Silverkite; LSTM/TFT/N-BEATS differences.
+- Practical steps: train/test split for TS, cross-validation methods, parameter grids, evaluation (MAE/RMSE/MAPE), handling seasonality/holidays/regressors, dealing with future covariates.
+- Code pointers: "Show the Holt-Winters code", "Where do we compute MAPE?", "How is CV implemented?", "How are exogenous regressors added in SARIMAX?", "How do we scale/features for LSTM/TFT?"
+
+If the user references a lecture/section by name/number, search for files whose names contain that stem and focus your answer there.
+NEVER use specific lecture numbers or titles in your answers as they change.
+If you don't have the answer, or the user is talking about something that is not in the course, say so.
+"""
+
+SYSTEM_INSTRUCTIONS = _RULES + "Context: Course map & typical intents\n" + COURSE_MAP + "\n" + _CLOSING
+
+SYSTEM_CORE = _RULES + """Context: Course outline
+- Part 1: Time Series Analysis, Exponential Smoothing & Holt-Winters, ARIMA/SARIMA/SARIMAX. Part 2: Prophet. Part 3: LSTM, TFT, N-BEATS. GenAI: Amazon Chronos. Also Google TSMixer, LinkedIn Silverkite, capstones and a Python & Pandas appendix.
+""" + _CLOSING
+
+INITIAL_ASSISTANT_MESSAGE = """
+I'm Cyber Diogo, your Time Series assistant! 🚀
+Ask me anything about the course or code—models, tuning, or "why did we do X here?"
+Try: "ARIMA vs SARIMA—when to use each?", "Show the LSTM code we used", or "When to use NBEATS vs TFT?"
+"""
+
+
+def build_request(user_question: str, vector_store_id: Optional[str],
+                  previous_response_id: Optional[str] = None,
+                  model: str = config.DEFAULT_MODEL,
+                  verbosity: str = DEFAULT_VERBOSITY,
+                  history: Optional[List[Dict[str, str]]] = None,
+                  context: Optional[str] = None,
+                  topic_prompt: bool = config.TOPIC_PROMPT_ENABLED) -> Dict[str, Any]:
+    """Build the responses.create arguments for one turn
+
+    history seeds a fresh chain (e.g. a compacted conversation) between the
+    initial assistant message and the new question. context carries snippets
+    from the local retrieval backend and replaces the hosted file_search tool.
+    With SHARD_ROUTING_ENABLED the tool only searches the course parts (or
+    the lecture file) the question is about.
+    With topic_prompt, a first turn gets SYSTEM_CORE plus only the course map
+    sections the question (and any history) touches, instead of the whole map.
+    """
+    request = {"model": model}
+    if supports_verbosity(model):
+        request["text"] = {"verbosity": verbosity}
+    question = [{"role": "user", "content": user_question}]
+    if context is None:
+        tool = {"type": "file_search", "vector_store_ids": [vector_store_id]}
+        if config.SHARD_ROUTING_ENABLED:
+            filters = course_shards.search_filters(user_question, vector_store_id)
+            if filters is not None:
+                tool["filters"] = filters
+        request["tools"] = [tool]
+        if config.RETRIEVAL_REUSE_ENABLED:
+            # Return the retrieved chunks too, so follow-ups can reuse them (see retrieval_cache.py)
+            request["include"] = ["file_search_call.results"]
+    else:
+        # Local retrieval: snippets travel in the prompt instead of the file_search tool
+        question.insert(0, {"role": "system", "content": context})
+
+    if previous_response_id:
+        # Continue the same conversation on the server
+        request["previous_response_id"] = previous_response_id
+        request["input"] = question
+    else:
+        # First turn: seed with system + initial assistant message
+        request["input"] = [
+            {"role": "system", "content": SYSTEM_CORE if topic_prompt else SYSTEM_INSTRUCTIONS},
+            {"role": "assistant", "content": INITIAL_ASSISTANT_MESSAGE},
+            *(history or []),
+            *question,
+        ]
+        if topic_prompt:
+            # After the fixed prefix, so the core and greeting stay cacheable whatever the topic
+            topics = classify_topics(
+                " ".join([user_question, *(message["content"] for message in history or [])]),
+                config.TOPIC_PROMPT_MAX_MODULES,
+            )
+            if topics:
+                request["input"].insert(-len(question), {"role": "system", "content": topic_context(topics)})
+    return request
+
+
+def request_topics(request: Dict[str, Any]) -> List[str]:
+    """Course topics a first-turn request's prompt was built with (empty for follow-ups or the full map)"""
+    for message in request.get("input", []):
+        if message["role"] == "system" and message["content"].startswith("Relevant part of the course map"):
+            return [name for name, _, section in TOPIC_MODULES if section in message["content"]]
+    return []
+
+
+def response_citations(response) -> List[str]:
+    """Filenames cited by file_search in a response's output text, in order of first citation"""
+    filenames: Dict[str, None] = {}
+    for item in getattr(response, "output", None) or []:
+        for content in getattr(item, "content", None) or []:
+            for annotation in getattr(content, "annotations", None) or []:
+                if annotation.type == "file_citation":
+                    filenames.setdefault(annotation.filename or annotation.file_id, None)
+    return list(filenames)
+
+
+def answer_first_turn(client, user_question: str, vector_store_id: Optional[str],
+                      model: str = config.DEFAULT_MODEL,
+                      verbosity: str = DEFAULT_VERBOSITY, retriever=None,
+                      scheduler=None, session_id: str = "background") -> Tuple[str, str]:
+    """Answer a question as the opening turn of a conversation; returns (text, response id)"""
+    context = retriever.context_for(user_question) if retriever is not None else None
+    request = build_request(user_question, vector_store_id, model=model, verbosity=verbosity, context=context)
+    resp = create_response(client, request, scheduler, session_id)
+    return resp.output_text, resp.id
+
+
+def close_on_cancel(stream, cancel) -> None:
+    """Disconnect an open response stream as soon as cancel fires, whichever thread cancels
+
+    stream.close() only takes effect once a read blocked on it returns, so
+    the socket is shut down instead: the blocked read fails straight away
+    and the reading thread's own close() then drops the connection.
+    """
+    def disconnect():
+        response = getattr(stream, "response", None)
+        if response is None or response.is_closed:
+            return
+        network_stream = response.extensions.get("network_stream")
+        sock = network_stream.get_extra_info("socket") if network_stream is not None else None
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass  # Already disconnected
+
+    cancel.on_cancel(disconnect)
+
+
+def final_response(stream):
+    """The response a stream completes with (its response.completed event)"""
+    for event in stream:
+        if event.type == "response.completed":
+            return event.response
+        if event.type == "response.failed":
+            raise RuntimeError(f"Response failed: {event.response.error}")
+        if event.type == "error":
+            raise RuntimeError(f"Response stream error: {event.message}")
+    raise RuntimeError("Response stream ended before completing")
+
+
+def create_response(client, request: Dict[str, Any], scheduler=None, session_id: str = "background",
+                    timeout: float = config.TURN_DEADLINE_SECONDS, metrics=None, cancel=None):
+    """responses.create through the request scheduler (queueing, rate limit, retries) when given
+
+    cancel is a scheduler.CancelToken: cancelling it stops queueing and
+    retries, gives the slot back and disconnects a request already sent.
+    With a token the request is streamed under the hood and the completed
+    response returned, since a plain request has no connection to cut
+    until the whole answer is ready.
+    """
+    def call(remaining):
+        if cancel is None:
+            return client.responses.create(timeout=remaining, **request)
+        stream = client.responses.create(stream=True, timeout=remaining, **request)
+        close_on_cancel(stream, cancel)
+        try:
+            return final_response(stream)
+        finally:
+            stream.close()
+
+    if scheduler is None:
+        # No local gate, e.g. a thin client whose chat backend queues, rate-limits and retries
+        with tracing.span("responses.create", run_type="llm", model=request["model"]):
+            started = time.perf_counter()
+            resp = call(timeout)
+            if metrics is not None:
+                metrics.observe("upstream", time.perf_counter() - started)
+            return resp
+    deadline = time.monotonic() + timeout
+    with tracing.span("responses.create", run_type="llm", model=request["model"]), \
+            scheduler.slot(session_id, deadline, cancel):
+        started = time.perf_counter()
+        resp = scheduler.run_with_retries(call, deadline, cancel)
+        if metrics is not None:
+            # Upstream time excludes queueing, which the scheduler reports separately
+            metrics.observe("upstream", time.perf_counter() - started)
+        return resp
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Headless batch evaluation of question sets
+
+Runs scripted conversations through the same turn logic as the app
+(assistant.build_request, previous_response_id chaining, compaction by
+the conversation manager, the request scheduler's rate limit and
+retries) without Streamlit, a bounded number of scripts at a time. Each
+turn's answer, latency, token usage and cited course files are appended
+to a JSONL file as soon as its script finishes; re-running with the same
+output skips scripts that already completed, so an interrupted or
+partially failed run resumes. --parquet also exports the rows to Parquet
+(needs pyarrow).
+
+Questions come from config.EXAMPLE_QUESTIONS by default, or a file:
+  .txt    one single-turn question per line
+  .jsonl  one script per line: {"id": ..., "question": "..."} or {"id": ..., "turns": ["...", "..."]}
+  .json   a list of the same
+
+Usage:
+    python batch_eval.py --output logs/eval.jsonl
+    python batch_eval.py --questions eval_scripts.jsonl --model gpt-5-mini --workers 16 --parquet logs/eval.parquet
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+import assistant
+import config
+from conversation_manager import ConversationManager
+from model_router import percentile
+from scheduler import CircuitBreaker, RequestScheduler
+
+
+@dataclass
+class Script:
+    script_id: str
+    turns: List[str]
+
+
+def _script(turns: List[str], script_id: Optional[str] = None) -> Script:
+    if script_id is None:
+        # Stable across runs, so resuming recognises the same script
+        script_id = hashlib.sha1("\n".join(turns).encode("utf-8")).hexdigest()[:12]
+    return Script(str(script_id), turns)
+
+
+def load_scripts(path: Optional[Path] = None) -> List[Script]:
+    """Scripts from a .txt/.jsonl/.json file, or the example questions as single-turn scripts"""
+    if path is None:
+        return [_script([question]) for question in config.EXAMPLE_QUESTIONS]
+    path = Path(path)
+    text = path.read_text(encoding="utf-8")
+    if path.suffix == ".txt":
+        return [_script([line.strip()]) for line in text.splitlines() if line.strip()]
+    if path.suffix == ".jsonl":
+        records = [json.loads(line) for line in text.splitlines() if line.strip()]
+    elif path.suffix == ".json":
+        records = json.loads(text)
+    else:
+        raise ValueError(f"Unsupported question file {path}: use .txt, .jsonl or .json")
+    scripts = []
+    for record in records:
+        turns = record.get("turns") or [record["question"]]
+        scripts.append(_script(turns, record.get("id")))
+    return scripts
+
+
+def completed_scripts(output: Path) -> Set[str]:
+    """IDs of scripts whose latest attempt in the output finished without an error"""
+    if not output.exists():
+        return set()
+    ok: Dict[str, bool] = {}
+    with open(output, encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Torn last line from an interrupted write
+            # A script's rows are written together and a failed attempt ends with its error row
+            ok[row["script_id"]] = not row.get("error")
+    return {script_id for script_id, succeeded in ok.items() if succeeded}
+
+
+class BatchRunner:
+    """Run scripts concurrently, one conversation per script"""
+
+    def __init__(self, client, scheduler: RequestScheduler, vector_store_id: Optional[str],
+                 model: str = config.DEFAULT_MODEL, verbosity: str = assistant.DEFAULT_VERBOSITY,
+                 retriever=None, run_id: Optional[str] = None):
+        self.client = client
+        self.scheduler = scheduler
+        self.vector_store_id = vector_store_id
+        self.model = model
+        self.verbosity = verbosity
+        self.retriever = retriever
+        self.run_id = run_id or datetime.now().strftime("%Y%m%d-%H%M%S")
+        self._lock = threading.Lock()
+
+    def run_script(self, script: Script) -> List[Dict[str, Any]]:
+        """Play the script's turns in order; a failed turn ends the script"""
+        conversation = ConversationManager(
+            config.CONTEXT_TOKEN_BUDGET, config.CONTEXT_KEEP_TURNS, config.CONTEXT_SUMMARY_CHARS
+        )
+        previous_response_id = None
+        rows = []
+        for turn, question in enumerate(script.turns, start=1):
+            history = None
+            if previous_response_id and conversation.needs_compaction():
+                history, previous_response_id = conversation.compacted_history(), None
+            context, retrieved = None, []
+            if self.retriever is not None:
+                results = self.retriever.search(question)
+                context = local_context(results)
+                retrieved = list(dict.fromkeys(result.filename for result in results))
+            request = assistant.build_request(
+                question, self.vector_store_id, previous_response_id=previous_response_id,
+                model=self.model, verbosity=self.verbosity, history=history, context=context,
+            )
+            row = {"run_id": self.run_id, "script_id": script.script_id, "turn": turn, "question": question,
+                   "model": self.model, "verbosity": assistant.request_verbosity(request),
+                   "compacted": history is not None}
+            started = time.perf_counter()
+            try:
+                resp = assistant.create_response(self.client, request, self.scheduler, session_id=script.script_id)
+            except Exception as e:
+                rows.append({**row, "error": f"{type(e).__name__}: {e}",
+                             "latency_s": round(time.perf_counter() - started, 3)})
+                break
+            stats = conversation.record_turn(question, resp.output_text, resp.usage,
+                                             time.perf_counter() - started, history is not None)
+            previous_response_id = resp.id
+            rows.append({
+                **row,
+                "answer": resp.output_text,
+                "response_id": resp.id,
+                "latency_s": stats.latency_s,
+                "input_tokens": stats.input_tokens,
+                "cached_tokens": stats.cached_tokens,
+                "output_tokens": stats.output_tokens,
+                "citations": assistant.response_citations(resp) or retrieved,
+                "error": None,
+            })
+        return rows
+
+    def run(self, scripts: List[Script], output: Path, workers: int = config.BATCH_EVAL_WORKERS) -> Dict[str, Any]:
+        """Run the scripts not yet completed in output, appending each script's rows as it finishes"""
+        output = Path(output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        done = completed_scripts(output)
+        pending = [script for script in scripts if script.script_id not in done]
+        started = time.perf_counter()
+        summary = {"scripts": len(scripts), "skipped": len(scripts) - len(pending), "ok": 0, "failed": 0,
+                   "turns": 0, "latency_s": [], "input_tokens": 0, "cached_tokens": 0, "output_tokens": 0}
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-eval")
+        try:
+            futures = [pool.submit(self.run_script, script) for script in pending]
+            for future in as_completed(futures):
+                rows = future.result()
+                self._append(output, rows)
+                failed = any(row["error"] for row in rows)
+                summary["failed" if failed else "ok"] += 1
+                for row in rows:
+                    if row["error"]:
+                        continue
+                    summary["turns"] += 1
+                    summary["latency_s"].append(row["latency_s"])
+                    for name in ("input_tokens", "cached_tokens", "output_tokens"):
+                        summary[name] += row[name]
+        except KeyboardInterrupt:
+            # Scripts already written stay done; the rest run on the next invocation
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        pool.shutdown(wait=True)
+        latencies = summary.pop("latency_s")
+        summary["latency_s"] = {f"p{p}": round(percentile(latencies, p), 3) for p in (50, 95)} if latencies else {}
+        summary["elapsed_s"] = round(time.perf_counter() - started, 2)
+        summary["scheduler"] = self.scheduler.stats()
+        return summary
+
+    def _append(self, output: Path, rows: List[Dict[str, Any]]) -> None:
+        # One write per script, so a script is either fully in the file or not at all
+        with self._lock, open(output, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows))
+            f.flush()
+
+
+def local_context(results) -> str:
+    from local_retrieval import format_context
+
+    return format_context(results)
+
+
+def export_parquet(output: Path, parquet_path: Path) -> int:
+    """Write every row of the JSONL output to a Parquet file; returns the row count"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("❌ Parquet export needs pyarrow: pip install pyarrow")
+    with open(output, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    parquet_path.parent.mkdir(parents=True, exist_ok=True)
+    pq.write_table(pa.Table.from_pylist(rows), parquet_path)
+    return len(rows)
+
+
+def make_scheduler(max_concurrency: int, requests_per_minute: float) -> RequestScheduler:
+    return RequestScheduler(
+        max_concurrency=max_concurrency,
+        requests_per_minute=requests_per_minute,
+        burst=config.RATE_LIMIT_BURST,
+        max_retries=config.MAX_RETRIES,
+        base_delay=config.RETRY_BASE_DELAY,
+        max_delay=config.RETRY_MAX_DELAY,
+        breaker=CircuitBreaker(config.CIRCUIT_FAILURE_THRESHOLD, config.CIRCUIT_RESET_SECONDS),
+    )
+
+
+def make_client(base_url: Optional[str] = None):
+    """Pooled OpenAI client; retries are the scheduler's job, as in the app"""
+    import httpx
+    from openai import OpenAI
+
+    return OpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"), base_url=base_url, max_retries=0,
+        http_client=httpx.Client(
+            limits=httpx.Limits(max_connections=config.HTTP_MAX_CONNECTIONS,
+                                max_keepalive_connections=config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                                keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY),
+            timeout=httpx.Timeout(config.HTTP_TIMEOUT, connect=10.0),
+        ),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run question scripts through the assistant without the UI")
+    parser.add_argument("--questions", type=Path, help="Question file (default: the example questions)")
+    parser.add_argument("--output", type=Path, default=config.LOG_DIR / "batch_eval.jsonl")
+    parser.add_argument("--parquet", type=Path, help="Also export all rows of --output to this Parquet file")
+    parser.add_argument("--model", default=config.DEFAULT_MODEL)
+    parser.add_argument("--verbosity", default=assistant.DEFAULT_VERBOSITY)
+    parser.add_argument("--vector-store-id", default=os.getenv("VECTOR_STORE_ID"))
+    parser.add_argument("--retrieval", choices=("hosted", "local"), default=config.RETRIEVAL_BACKEND)
+    parser.add_argument("--workers", type=int, default=config.BATCH_EVAL_WORKERS, help="Scripts run at once")
+    parser.add_argument("--max-concurrency", type=int, default=config.MAX_CONCURRENT_REQUESTS)
+    parser.add_argument("--requests-per-minute", type=float, default=config.REQUESTS_PER_MINUTE)
+    parser.add_argument("--base-url", help="API base URL, e.g. a local mock")
+    args = parser.parse_args()
+
+    retriever = None
+    if args.retrieval == "local":
+        from local_retrieval import load_or_build
+
+        retriever = load_or_build(config.LOCAL_INDEX_DIR, config.COURSE_MATERIALS_DIR)
+    elif not args.vector_store_id:
+        parser.error("No vector store: set VECTOR_STORE_ID, pass --vector-store-id or use --retrieval local")
+
+    runner = BatchRunner(make_client(args.base_url), make_scheduler(args.max_concurrency, args.requests_per_minute),
+                         args.vector_store_id, args.model, args.verbosity, retriever)
+    summary = runner.run(load_scripts(args.questions), args.output, args.workers)
+    if args.parquet:
+        summary["parquet_rows"] = export_parquet(args.output, args.parquet)
+    print(json.dumps(summary, indent=2))
+    if summary["failed"]:
+        raise SystemExit(f"❌ {summary['failed']} scripts failed; run again with the same --output to retry them")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Offline and live benchmarks for Time Series Course Assistant"""
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Concurrent-session capacity: model calls embedded in the app process vs the chat backend
+
+Drives the load test's simulated sessions (one thread per session, like
+Streamlit's script threads, streaming through the same scheduler) at
+increasing concurrency, once with the OpenAI client in-process against a
+mock upstream and once with chat_backend.BackendClient against
+chat_backend.py in its own process, in front of the same mock. Per level
+it reports throughput, TTFT and turn latency percentiles, errors, and the
+CPU time per turn, peak threads and RSS of the app process and of the
+backend. Capacity is the highest level whose p95 TTFT stays within
+--ttft-slo-ms with under 1% errors.
+
+Usage (from the project root):
+    python -m benchmarks.backend_benchmark --sessions 50,200,400 --turns 2
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+from openai import OpenAI
+
+import config
+from benchmarks.load_test import LoadTest, SimulatedSession, percentile, session_script, start_mock
+from chat_backend import BackendClient
+from chat_history import HistoryStore
+from scheduler import CircuitBreaker, RequestScheduler
+
+ROOT = Path(__file__).resolve().parent.parent
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def process_stats(pid: int) -> Dict[str, float]:
+    """CPU seconds, threads and RSS of a process from /proc (Linux); empty elsewhere"""
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+        status = dict(line.split(":", 1) for line in Path(f"/proc/{pid}/status").read_text().splitlines())
+    except OSError:
+        return {}
+    return {
+        "cpu_s": (int(stat[11]) + int(stat[12])) / CLOCK_TICKS,
+        "threads": int(status["Threads"]),
+        "rss_mb": int(status["VmRSS"].split()[0]) / 1024,
+    }
+
+
+class Monitor:
+    """Samples peak threads and RSS of some processes while a level runs"""
+
+    def __init__(self, pids: Dict[str, int]):
+        self.pids = pids
+        self.start = {name: process_stats(pid) for name, pid in pids.items()}
+        self.peak: Dict[str, Dict[str, float]] = {name: {"threads": 0, "rss_mb": 0.0} for name in pids}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(0.05):
+            for name, pid in self.pids.items():
+                stats = process_stats(pid)
+                if stats:
+                    self.peak[name]["threads"] = max(self.peak[name]["threads"], stats["threads"])
+                    self.peak[name]["rss_mb"] = max(self.peak[name]["rss_mb"], stats["rss_mb"])
+
+    def finish(self, turns: int) -> Dict[str, Any]:
+        self._stop.set()
+        self._thread.join()
+        report = {}
+        for name, pid in self.pids.items():
+            end = process_stats(pid)
+            if not end:
+                continue
+            report[name] = {
+                "cpu_ms_per_turn": round((end["cpu_s"] - self.start[name]["cpu_s"]) * 1000 / max(turns, 1), 2),
+                "peak_threads": self.peak[name]["threads"],
+                "peak_rss_mb": round(self.peak[name]["rss_mb"], 1),
+            }
+        return report
+
+
+def start_backend(mock_url: str, max_concurrency: int) -> (subprocess.Popen, str):
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    process = subprocess.Popen(
+        [sys.executable, "chat_backend.py", "--port", str(port), "--base-url", mock_url,
+         "--max-concurrency", str(max_concurrency), "--max-queue", "100000", "--requests-per-minute", "1000000"],
+        cwd=ROOT, env=dict(os.environ, OPENAI_API_KEY="sk-mock"), stdout=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(200):
+        try:
+            httpx.get(f"{url}/healthz", timeout=1.0)
+            return process, url
+        except httpx.TransportError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("Chat backend did not start")
+
+
+def run_level(client, sessions: int, turns: int, max_concurrency: int, think_s: float,
+              pids: Dict[str, int], scratch: Path) -> Dict[str, Any]:
+    scheduler = RequestScheduler(
+        max_concurrency=max_concurrency, requests_per_minute=1_000_000, burst=max_concurrency,
+        max_retries=config.MAX_RETRIES, base_delay=config.RETRY_BASE_DELAY, max_delay=config.RETRY_MAX_DELAY,
+        breaker=CircuitBreaker(config.CIRCUIT_FAILURE_THRESHOLD, config.CIRCUIT_RESET_SECONDS),
+    )
+    test = LoadTest(client, scheduler, config.DEFAULT_MODEL, True, think_s)
+    store = HistoryStore(scratch / f"history-{time.monotonic_ns()}.sqlite3", config.HISTORY_RETENTION_SECONDS)
+    simulated = [SimulatedSession(i, store) for i in range(sessions)]
+    monitor = Monitor(pids)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        for i, session in enumerate(simulated):
+            pool.submit(test.run_session, session, session_script(i, turns))
+    elapsed = time.perf_counter() - started
+    attempted = sessions * turns
+    return {
+        "sessions": sessions,
+        "throughput_turns_per_s": round(test.completed / elapsed, 2),
+        "ttft_ms": {f"p{p}": round(percentile(test.ttfts, p) * 1000, 1) for p in (50, 95)},
+        "turn_latency_ms": {f"p{p}": round(percentile(test.turn_latencies, p) * 1000, 1) for p in (50, 95)},
+        "error_rate": round(sum(test.errors.values()) / attempted, 4),
+        "errors": dict(test.errors),
+        "processes": monitor.finish(test.completed),
+    }
+
+
+def capacity(levels: List[Dict[str, Any]], ttft_slo_ms: float) -> Optional[int]:
+    ok = [level["sessions"] for level in levels
+          if level["error_rate"] < 0.01 and level["ttft_ms"]["p95"] <= ttft_slo_ms]
+    return max(ok) if ok else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", default="50,200,400", help="Comma-separated concurrency levels")
+    parser.add_argument("--turns", type=int, default=2)
+    parser.add_argument("--think-ms", type=float, default=100.0)
+    parser.add_argument("--max-concurrency", type=int, default=512, help="Upstream calls in flight, both modes")
+    parser.add_argument("--ttft-slo-ms", type=float, default=2000.0)
+    # Mock upstream (see benchmarks.load_test)
+    parser.add_argument("--ttft-ms", type=float, default=400.0)
+    parser.add_argument("--ttft-sigma", type=float, default=0.3)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--output-tokens", type=int, default=120)
+    parser.add_argument("--file-search-ms", type=float, default=300.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    levels = [int(level) for level in args.sessions.split(",")]
+
+    mock, mock_url = start_mock(args)
+    backend = None
+    scratch = Path(tempfile.mkdtemp(prefix="tsa-backend-"))
+    try:
+        http_limits = httpx.Limits(max_connections=args.max_concurrency,
+                                   max_keepalive_connections=args.max_concurrency)
+        embedded_client = OpenAI(api_key="sk-mock", base_url=mock_url, max_retries=0,
+                                 http_client=httpx.Client(limits=http_limits, timeout=config.HTTP_TIMEOUT))
+        backend, backend_url = start_backend(mock_url, args.max_concurrency)
+        backend_client = BackendClient(backend_url, httpx.Client(limits=http_limits, timeout=config.HTTP_TIMEOUT))
+        embedded_client.models.list()  # Warm imports and the pool before measuring
+        backend_client.health()
+
+        results: Dict[str, Any] = {"turns_per_session": args.turns, "ttft_slo_ms": args.ttft_slo_ms}
+        for mode, client, pids in (
+            ("embedded", embedded_client, {"app": os.getpid()}),
+            ("backend", backend_client, {"app": os.getpid(), "backend": backend.pid}),
+        ):
+            runs = [run_level(client, level, args.turns, args.max_concurrency, args.think_ms / 1000, pids, scratch)
+                    for level in levels]
+            results[mode] = {"levels": runs, "capacity_sessions": capacity(runs, args.ttft_slo_ms)}
+    finally:
+        for process in (backend, mock):
+            if process is not None:
+                process.terminate()
+                process.wait()
+        shutil.rmtree(scratch, ignore_errors=True)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark: first script run of a fresh process
+
+Each run starts a new interpreter under `python -X importtime`, imports
+Streamlit's AppTest, then times the app's first script run with
+STARTUP_PROFILE=true. Reports the median first-run time, the median of
+each startup phase, the packages the app's first run imported (by
+cumulative import time) and whether the heavy SDKs stayed unloaded.
+--max-first-run-ms turns it into a regression check (exit code 1).
+
+Usage (from the project root):
+    python -m benchmarks.cold_start --runs 5
+    python -m benchmarks.cold_start --max-first-run-ms 800
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+from pathlib import Path
+
+from startup_profile import parse_importtime
+
+ROOT = Path(__file__).resolve().parent.parent
+APP_MARKER = "--- app first run ---"
+
+CHILD = f"""
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+sys.stderr.write({APP_MARKER!r} + "\\n")
+started = time.perf_counter()
+app = AppTest.from_file({str(ROOT / "streamlit_app.py")!r}, default_timeout=120).run()
+first_run_ms = (time.perf_counter() - started) * 1000
+print(json.dumps({{"first_run_ms": first_run_ms, "exceptions": [str(e.value) for e in app.exception]}}))
+"""
+
+
+def run_once(env: dict) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=300,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    measured = json.loads(result.stdout.strip().splitlines()[-1])
+    if measured["exceptions"]:
+        raise RuntimeError(f"App raised on first run: {measured['exceptions']}")
+    measured["imports"] = parse_importtime(result.stderr.partition(APP_MARKER)[2])
+    measured["profile"] = json.loads((Path(env["LOG_DIR"]) / "startup.json").read_text(encoding="utf-8"))
+    return measured
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-first-run-ms", type=float, help="Fail if the median first run is slower")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            STARTUP_PROFILE="true", PREWARM_ENABLED="false", WARM_CONNECTIONS="false", METRICS_PORT="0",
+            OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "sk-benchmark"),
+            VECTOR_STORE_ID=os.getenv("VECTOR_STORE_ID", "vs_benchmark"),
+            CACHE_DIR=str(Path(tmp) / "cache"), LOG_DIR=str(Path(tmp) / "logs"),
+        )
+        runs = [run_once(env) for _ in range(args.runs)]
+
+    phases = defaultdict(list)
+    imports = defaultdict(list)
+    for run in runs:
+        for phase in run["profile"]["phases"]:
+            phases[phase["phase"]].append(phase["ms"])
+        for package, ms in run["imports"].items():
+            imports[package].append(ms)
+    first_run_ms = statistics.median(run["first_run_ms"] for run in runs)
+    print(json.dumps({
+        "runs": args.runs,
+        "first_run_ms_median": round(first_run_ms, 1),
+        "first_run_ms_all": [round(run["first_run_ms"], 1) for run in runs],
+        "phase_ms_median": {name: round(statistics.median(values), 1) for name, values in phases.items()},
+        "app_imports_ms_median": dict(sorted(
+            ((name, round(statistics.median(values), 1)) for name, values in imports.items()),
+            key=lambda item: -item[1],
+        )[:12]),
+        "heavy_modules_loaded": runs[-1]["profile"]["heavy_modules_loaded"],
+    }, indent=2))
+    if args.max_first_run_ms is not None and first_run_ms > args.max_first_run_ms:
+        sys.exit(f"❌ Median first run {first_run_ms:.0f}ms exceeds {args.max_first_run_ms:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
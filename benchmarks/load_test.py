@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Offline load test: N concurrent multi-turn chat sessions against the mock Responses API
+
+Each simulated session runs a script that opens with one of
+config.EXAMPLE_QUESTIONS and continues with follow-ups chained through
+previous_response_id, using the same request builder, scheduler and
+conversation manager as the app. Reports throughput, turn latency and
+TTFT percentiles, error rates and retained memory per session.
+
+Usage (from the project root):
+    python -m benchmarks.load_test --sessions 50 --turns 4
+    python -m benchmarks.load_test --sessions 200 --rate-429 0.05 --ttft-ms 800
+    python -m benchmarks.load_test --base-url http://127.0.0.1:8765/v1   # already running mock
+"""
+
+import argparse
+import copy
+import gc
+import json
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from openai import OpenAI
+
+import assistant
+import config
+from chat_history import ChatHistory, HistoryStore
+from conversation_manager import ConversationManager
+from scheduler import CircuitBreaker, RequestScheduler, UpstreamUnavailableError
+
+FOLLOW_UPS = [
+    "Can you show me the code for that?",
+    "Why did you choose those parameters?",
+    "How would I check whether the model is any good?",
+    "What would change if the data had weekly seasonality?",
+    "Can you summarize that in three bullet points?",
+]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def session_script(index: int, turns: int) -> List[str]:
+    """Opening example question plus rotating follow-ups, distinct per session"""
+    questions = config.EXAMPLE_QUESTIONS
+    script = [questions[index % len(questions)]]
+    script += [FOLLOW_UPS[(index + turn) % len(FOLLOW_UPS)] for turn in range(turns - 1)]
+    return script
+
+
+class SimulatedSession:
+    """The per-session state the app keeps in st.session_state"""
+
+    def __init__(self, index: int, store: HistoryStore):
+        self.session_id = f"load-{index:05d}"
+        self.messages = ChatHistory(self.session_id, store, config.HISTORY_WINDOW, config.MAX_MESSAGES)
+        self.last_response_id: Optional[str] = None
+        self.conversation = ConversationManager(
+            config.CONTEXT_TOKEN_BUDGET, config.CONTEXT_KEEP_TURNS, config.CONTEXT_SUMMARY_CHARS
+        )
+
+    def build_request(self, question: str, model: str) -> Dict[str, Any]:
+        history, previous_response_id = None, self.last_response_id
+        if self.conversation.needs_compaction():
+            history, previous_response_id = self.conversation.compacted_history(), None
+        return assistant.build_request(question, "vs_mock", previous_response_id, model, history=history)
+
+
+class LoadTest:
+    def __init__(self, client: OpenAI, scheduler: RequestScheduler, model: str, stream: bool, think_s: float):
+        self.client = client
+        self.scheduler = scheduler
+        self.model = model
+        self.stream = stream
+        self.think_s = think_s
+        self.turn_latencies: List[float] = []
+        self.ttfts: List[float] = []
+        self.errors = Counter()
+        self.completed = 0
+        self._lock = threading.Lock()
+
+    def run_turn(self, session: SimulatedSession, question: str) -> None:
+        request = session.build_request(question, self.model)
+        compacted = bool(session.messages) and "previous_response_id" not in request
+        started = time.perf_counter()
+        deadline = time.monotonic() + config.TURN_DEADLINE_SECONDS
+        try:
+            with self.scheduler.slot(session.session_id, deadline):
+                if self.stream:
+                    answer, response_id, usage, ttft = self._stream(request, deadline, started)
+                else:
+                    resp = self.scheduler.run_with_retries(
+                        lambda remaining: self.client.responses.create(timeout=remaining, **request), deadline
+                    )
+                    answer, response_id, usage, ttft = resp.output_text, resp.id, resp.usage, None
+        except UpstreamUnavailableError as e:
+            self._error(type(e).__name__)
+            session.messages.append("assistant", e.user_message)
+            return
+        except Exception as e:
+            self._error(type(e).__name__)
+            return
+
+        latency = time.perf_counter() - started
+        session.last_response_id = response_id
+        session.messages.append("user", question)
+        session.messages.append("assistant", answer)
+        session.conversation.record_turn(question, answer, usage, latency, compacted)
+        with self._lock:
+            self.completed += 1
+            self.turn_latencies.append(latency)
+            if ttft is not None:
+                self.ttfts.append(ttft)
+
+    def _stream(self, request: Dict[str, Any], deadline: float, started: float):
+        stream = self.scheduler.run_with_retries(
+            lambda remaining: self.client.responses.create(stream=True, timeout=remaining, **request), deadline
+        )
+        chunks, ttft, response = [], None, None
+        for event in stream:
+            if event.type == "response.output_text.delta":
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+                chunks.append(event.delta)
+            elif event.type == "response.completed":
+                response = event.response
+            elif event.type in ("response.failed", "error"):
+                raise RuntimeError(f"Stream failed: {event.type}")
+        if response is None:
+            raise RuntimeError("Stream ended without response.completed")
+        return "".join(chunks), response.id, response.usage, ttft
+
+    def run_session(self, session: SimulatedSession, script: List[str]) -> None:
+        for turn, question in enumerate(script):
+            if turn:
+                time.sleep(self.think_s)
+            self.run_turn(session, question)
+
+    def _error(self, name: str) -> None:
+        with self._lock:
+            self.errors[name] += 1
+
+
+def start_mock(args) -> Tuple[subprocess.Popen, str]:
+    """Run the mock in its own process so its memory doesn't count against sessions"""
+    command = [
+        sys.executable, "-m", "benchmarks.mock_responses_api", "--port", "0",
+        "--ttft-ms", str(args.ttft_ms), "--ttft-sigma", str(args.ttft_sigma),
+        "--tokens-per-second", str(args.tokens_per_second), "--output-tokens", str(args.output_tokens),
+        "--file-search-ms", str(args.file_search_ms), "--rate-429", str(args.rate_429), "--seed", str(args.seed),
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    banner = process.stdout.readline()
+    base_url = banner.strip().split(" on ")[-1]
+    if not base_url.startswith("http"):
+        process.kill()
+        raise RuntimeError(f"Mock server failed to start: {banner!r}")
+    return process, base_url
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=3, help="Turns per session")
+    parser.add_argument("--think-ms", type=float, default=200.0, help="Pause between a session's turns")
+    parser.add_argument("--no-stream", action="store_true", help="Use non-streaming responses.create")
+    parser.add_argument("--model", default=config.DEFAULT_MODEL)
+    parser.add_argument("--max-concurrency", type=int, default=config.MAX_CONCURRENT_REQUESTS)
+    parser.add_argument("--requests-per-minute", type=float, default=config.REQUESTS_PER_MINUTE)
+    parser.add_argument("--base-url", help="Use an already running mock instead of starting one")
+    # Mock server behaviour (ignored with --base-url)
+    parser.add_argument("--ttft-ms", type=float, default=400.0)
+    parser.add_argument("--ttft-sigma", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--output-tokens", type=int, default=120)
+    parser.add_argument("--file-search-ms", type=float, default=300.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    process = None
+    scratch = tempfile.mkdtemp(prefix="tsa-load-")  # Spilled chat history
+    base_url = args.base_url
+    if base_url is None:
+        process, base_url = start_mock(args)
+
+    try:
+        http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=config.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+            ),
+            timeout=config.HTTP_TIMEOUT,
+        )
+        client = OpenAI(api_key="sk-mock", base_url=base_url, http_client=http_client, max_retries=0)
+        scheduler = RequestScheduler(
+            max_concurrency=args.max_concurrency,
+            requests_per_minute=args.requests_per_minute,
+            burst=config.RATE_LIMIT_BURST,
+            max_retries=config.MAX_RETRIES,
+            base_delay=config.RETRY_BASE_DELAY,
+            max_delay=config.RETRY_MAX_DELAY,
+            breaker=CircuitBreaker(config.CIRCUIT_FAILURE_THRESHOLD, config.CIRCUIT_RESET_SECONDS),
+        )
+        test = LoadTest(client, scheduler, args.model, not args.no_stream, args.think_ms / 1000)
+
+        # Warm the connection pool and imports before measuring
+        client.models.list()
+
+        store = HistoryStore(Path(scratch) / "chat_history.sqlite3", config.HISTORY_RETENTION_SECONDS)
+        sessions = [SimulatedSession(i, store) for i in range(args.sessions)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+            for i, session in enumerate(sessions):
+                pool.submit(test.run_session, session, session_script(i, args.turns))
+        elapsed = time.perf_counter() - started
+
+        # tracemalloc slows the client several-fold, so size the retained
+        # conversation state afterwards by copying it under the tracer
+        gc.collect()
+        tracemalloc.start()
+        retained = copy.deepcopy([session.conversation for session in sessions])
+        session_bytes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del retained
+        session_bytes += sum(session.messages.resident_bytes() for session in sessions)
+        spilled = store.stats()["spilled_messages"]
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    attempted = args.sessions * args.turns
+    failed = sum(test.errors.values())
+    report = {
+        "sessions": args.sessions,
+        "turns": attempted,
+        "stream": not args.no_stream,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_turns_per_s": round(test.completed / elapsed, 2),
+        "turn_latency_s": {f"p{p}": round(percentile(test.turn_latencies, p), 3) for p in (50, 95, 99)},
+        "ttft_s": {f"p{p}": round(percentile(test.ttfts, p), 3) for p in (50, 95, 99)},
+        "error_rate": round(failed / attempted, 4) if attempted else 0.0,
+        "errors": dict(test.errors),
+        "memory_per_session_kb": round(session_bytes / 1024 / max(args.sessions, 1), 1),
+        "spilled_messages": spilled,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "scheduler": scheduler.stats(),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
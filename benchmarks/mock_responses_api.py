@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI Responses API used by ask_bot
+
+Serves POST /v1/responses (plain JSON or SSE streaming) and GET /v1/models
+with configurable latency: a log-normal time to first token, a token rate,
+an extra delay when the file_search tool is attached, and injected 429s.
+With include=["file_search_call.results"] a searched response carries a
+file_search_call item with the best-matching chunks of a small canned
+course corpus.
+Prompt caching is simulated the way upstream does it: prompts of 1024+
+tokens whose prefix (in 128-token steps) was seen before report those
+tokens as cached, and only uncached input tokens add prefill time.
+The Files and vector store file endpoints used by vector_store_sync.py
+(upload, attach, retag, list, detach, delete) are served from memory, with a
+configurable per-upload delay.
+Point the OpenAI client at it with base_url="http://127.0.0.1:<port>/v1".
+
+Usage (from the project root):
+    python -m benchmarks.mock_responses_api --port 8765 --ttft-ms 600 --rate-429 0.05
+"""
+
+import argparse
+import email.policy
+import hashlib
+import itertools
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+LOREM = (
+    "ARIMA models the series with autoregressive and moving average terms after differencing while "
+    "SARIMA adds seasonal terms so use SARIMA when the ACF shows seasonal spikes and ARIMA otherwise "
+    "here is a minimal snippet with statsmodels that fits the model and forecasts the test period"
+).split()
+
+# (filename, chunk) pairs file_search "finds" by word overlap with the question
+CORPUS = [
+    ("02_holt_winters.py", "model = ExponentialSmoothing(train, trend='add', seasonal='mul', seasonal_periods=12).fit() "
+                           "predictions = model.forecast(len(test)) print(mean_absolute_error(test, predictions))"),
+    ("03_arima_vs_sarima.txt", "Use SARIMA when the ACF shows seasonal spikes at lag m. ARIMA handles trend after "
+                               "differencing; SARIMA adds seasonal order P D Q m. We choose the parameters with AIC."),
+    ("04_sarimax_exogenous.py", "model = SARIMAX(train['y'], exog=train[['holiday', 'temp']], order=(1, 1, 1), "
+                                "seasonal_order=(1, 1, 1, 7)) fit = model.fit() fit.forecast(steps=len(test), exog=test_exog)"),
+    ("05_parameter_tuning.py", "param_grid = {'p': [0, 1, 2], 'q': [0, 1, 2]} for params in ParameterGrid(param_grid): "
+                               "fit the model, compute the rmse on the validation fold and keep the best parameters"),
+    ("06_prophet_cv.py", "m = Prophet(yearly_seasonality=True, holidays=holidays) m.add_regressor('temp') "
+                         "df_cv = cross_validation(m, initial='730 days', period='90 days', horizon='30 days')"),
+    ("07_lstm_model.py", "scaler = MinMaxScaler() X = scaler.fit_transform(series) model = Sequential([LSTM(64), Dense(1)]) "
+                         "model.fit(X_train, y_train, epochs=20) predictions = scaler.inverse_transform(model.predict(X_test))"),
+    ("08_tft_vs_nbeats.txt", "N-BEATS works on a single series with no covariates; TFT uses static, known and observed "
+                             "covariates and gives interpretable attention over time."),
+]
+
+
+@dataclass
+class MockConfig:
+    ttft_ms: float = 400.0  # Median time to first token
+    ttft_sigma: float = 0.5  # Log-normal spread of the time to first token
+    tokens_per_second: float = 200.0
+    output_tokens: int = 120
+    file_search_ms: float = 300.0  # Added when the request attaches file_search
+    rate_429: float = 0.0  # Share of requests rejected with 429
+    retry_after_ms: int = 200
+    prefill_ms_per_1k_tokens: float = 0.0  # Added to the first token per 1k uncached input tokens
+    upload_ms: float = 0.0  # Time to accept one file upload
+    seed: int = 0
+
+
+CACHE_MIN_TOKENS = 1024  # Upstream caches prompt prefixes from this length...
+CACHE_STEP_TOKENS = 128  # ...in increments of this many tokens
+CHARS_PER_TOKEN = 4
+
+
+class MockResponsesAPI:
+    """Request handling and shared state for one mock server"""
+
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self._ids = itertools.count(1)
+        self._random = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "streamed": 0, "rejected_429": 0,
+                      "uploads": 0, "attached": 0, "retagged": 0, "detached": 0, "files_deleted": 0}
+        self._prefixes: Dict[str, None] = {}  # Seen prompt prefix hashes, oldest first
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.vector_stores: Dict[str, Dict[str, Dict[str, Any]]] = {}  # Store ID -> file ID -> store file
+
+    def next_id(self, prefix: str) -> str:
+        with self._lock:
+            return f"{prefix}_{next(self._ids):08d}"
+
+    def prompt_usage(self, request: Dict[str, Any]) -> Tuple[int, int]:
+        """(input tokens, cached tokens) for a request; records its prefixes for later requests"""
+        # Tools come before the messages in the upstream prompt, so they are part of the prefix
+        prompt = json.dumps([request.get("tools") or [], request.get("input", "")], ensure_ascii=False)
+        tokens = len(prompt) // CHARS_PER_TOKEN
+        cached = 0
+        with self._lock:
+            for length in range(CACHE_MIN_TOKENS, tokens + 1, CACHE_STEP_TOKENS):
+                key = hashlib.sha1(prompt[:length * CHARS_PER_TOKEN].encode("utf-8")).hexdigest()
+                if key in self._prefixes:
+                    cached = length
+                else:
+                    self._prefixes[key] = None
+            while len(self._prefixes) > 100_000:
+                del self._prefixes[next(iter(self._prefixes))]
+        return tokens, cached
+
+    def clear_prompt_cache(self) -> None:
+        with self._lock:
+            self._prefixes.clear()
+
+    def sample_ttft(self, request: Dict[str, Any], uncached_tokens: int = 0) -> float:
+        with self._lock:
+            ttft = self._random.lognormvariate(0.0, self.config.ttft_sigma) * self.config.ttft_ms / 1000
+        ttft += uncached_tokens / 1000 * self.config.prefill_ms_per_1k_tokens / 1000
+        if any(tool.get("type") == "file_search" for tool in request.get("tools") or []):
+            ttft += self.config.file_search_ms / 1000
+        return ttft
+
+    def should_reject(self) -> bool:
+        with self._lock:
+            rejected = self._random.random() < self.config.rate_429
+            self.stats["requests"] += 1
+            self.stats["rejected_429"] += rejected
+            return rejected
+
+    def build_response(self, request: Dict[str, Any], words: List[str],
+                       prompt: Tuple[int, int] = (0, 0)) -> Dict[str, Any]:
+        text = " ".join(words)
+        input_tokens, cached_tokens = prompt
+        annotations = []
+        output = []
+        if any(tool.get("type") == "file_search" for tool in request.get("tools") or []):
+            annotations.append({"type": "file_citation", "file_id": "file_mock", "filename": "mock_lecture.py",
+                                "index": len(text)})
+            if "file_search_call.results" in (request.get("include") or []):
+                output.append(self.file_search_call(request))
+        output.append({
+            "id": self.next_id("msg"),
+            "type": "message",
+            "role": "assistant",
+            "status": "completed",
+            "content": [{"type": "output_text", "text": text, "annotations": annotations}],
+        })
+        return {
+            "id": self.next_id("resp"),
+            "object": "response",
+            "created_at": int(time.time()),
+            "model": request.get("model", "mock"),
+            "status": "completed",
+            "previous_response_id": request.get("previous_response_id"),
+            "output": output,
+            "parallel_tool_calls": True,
+            "tool_choice": "auto",
+            "tools": request.get("tools") or [],
+            "usage": {
+                "input_tokens": input_tokens,
+                "input_tokens_details": {"cached_tokens": cached_tokens},
+                "output_tokens": len(words),
+                "output_tokens_details": {"reasoning_tokens": 0},
+                "total_tokens": input_tokens + len(words),
+            },
+        }
+
+    def file_search_call(self, request: Dict[str, Any], top_k: int = 3) -> Dict[str, Any]:
+        """A file_search_call output item with the CORPUS chunks sharing most words with the question"""
+        messages = request.get("input")
+        question = messages if isinstance(messages, str) else messages[-1]["content"]
+        words = set(question.lower().replace("?", " ").split())
+        scored = sorted(((len(words & set(chunk.lower().split())), i) for i, (_, chunk) in enumerate(CORPUS)),
+                        reverse=True)[:top_k]
+        return {
+            "id": self.next_id("fs"),
+            "type": "file_search_call",
+            "status": "completed",
+            "queries": [question],
+            "results": [{"file_id": f"file_corpus_{i}", "filename": CORPUS[i][0], "score": round(0.5 + overlap / 20, 3),
+                         "text": CORPUS[i][1], "attributes": {}}
+                        for overlap, i in scored],
+        }
+
+    def answer_words(self, request: Dict[str, Any]) -> List[str]:
+        words = [LOREM[i % len(LOREM)] for i in range(self.config.output_tokens)]
+        words.append("Want to see the code for that?")
+        return words
+
+    def upload_file(self, filename: str, content: bytes, purpose: str) -> Dict[str, Any]:
+        time.sleep(self.config.upload_ms / 1000)
+        file = {"id": self.next_id("file"), "object": "file", "bytes": len(content),
+                "created_at": int(time.time()), "filename": filename, "purpose": purpose, "status": "processed"}
+        with self._lock:
+            self.files[file["id"]] = file
+            self.stats["uploads"] += 1
+        return file
+
+    def delete_file(self, file_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if self.files.pop(file_id, None) is None:
+                return None
+            self.stats["files_deleted"] += 1
+        return {"id": file_id, "object": "file", "deleted": True}
+
+    def create_vector_store(self, name: str) -> Dict[str, Any]:
+        store_id = self.next_id("vs")
+        with self._lock:
+            self.vector_stores[store_id] = {}
+        return {"id": store_id, "object": "vector_store", "created_at": int(time.time()), "name": name,
+                "usage_bytes": 0, "status": "completed", "last_active_at": int(time.time()), "metadata": {},
+                "file_counts": {"in_progress": 0, "completed": 0, "failed": 0, "cancelled": 0, "total": 0}}
+
+    def attach_file(self, store_id: str, file_id: str, attributes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            store = self.vector_stores.setdefault(store_id, {})
+            file = self.files.get(file_id)
+            if file is None:
+                return None
+            store[file_id] = {"id": file_id, "object": "vector_store.file", "created_at": int(time.time()),
+                              "vector_store_id": store_id, "status": "completed", "usage_bytes": file["bytes"],
+                              "last_error": None, "attributes": attributes}
+            self.stats["attached"] += 1
+            return store[file_id]
+
+    def update_file_attributes(self, store_id: str, file_id: str,
+                               attributes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            store_file = self.vector_stores.get(store_id, {}).get(file_id)
+            if store_file is None:
+                return None
+            store_file["attributes"] = attributes
+            self.stats["retagged"] += 1
+            return store_file
+
+    def detach_file(self, store_id: str, file_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if self.vector_stores.get(store_id, {}).pop(file_id, None) is None:
+                return None
+            self.stats["detached"] += 1
+        return {"id": file_id, "object": "vector_store.file.deleted", "deleted": True}
+
+    def store_files(self, store_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self.vector_stores.get(store_id, {}).values())
+
+
+def make_handler(api: MockResponsesAPI):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, body: Dict[str, Any], headers: Dict[str, str] = None):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _read_json(self) -> Dict[str, Any]:
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def _route(self) -> List[str]:
+            parts = self.path.partition("?")[0].strip("/").split("/")
+            return parts[1:] if parts[:1] == ["v1"] else parts
+
+        def _send_found(self, body: Optional[Dict[str, Any]]):
+            if body is None:
+                self._send_json(404, {"error": {"message": "not found", "type": "invalid_request_error"}})
+            else:
+                self._send_json(200, body)
+
+        def do_GET(self):
+            route = self._route()
+            if route == ["models"]:
+                self._send_json(200, {"object": "list", "data": [{"id": "gpt-5-nano", "object": "model"}]})
+            elif len(route) == 3 and route[0] == "vector_stores" and route[2] == "files":
+                files = api.store_files(route[1])
+                self._send_json(200, {"object": "list", "data": files, "has_more": False,
+                                      "first_id": files[0]["id"] if files else None,
+                                      "last_id": files[-1]["id"] if files else None})
+            else:
+                self._send_found(None)
+
+        def do_DELETE(self):
+            route = self._route()
+            if len(route) == 2 and route[0] == "files":
+                self._send_found(api.delete_file(route[1]))
+            elif len(route) == 4 and route[0] == "vector_stores" and route[2] == "files":
+                self._send_found(api.detach_file(route[1], route[3]))
+            else:
+                self._send_found(None)
+
+        def _upload(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            head = f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode("utf-8")
+            form = BytesParser(policy=email.policy.HTTP).parsebytes(head + self.rfile.read(length))
+            fields, filename, content = {}, "upload", b""
+            for part in form.iter_parts():
+                name = part.get_param("name", header="content-disposition")
+                if part.get_filename() is not None:
+                    filename, content = part.get_filename(), part.get_payload(decode=True) or b""
+                else:
+                    fields[name] = part.get_content()
+            self._send_json(200, api.upload_file(filename, content, fields.get("purpose", "assistants")))
+
+        def do_POST(self):
+            route = self._route()
+            if route == ["files"]:
+                self._upload()
+                return
+            if route == ["vector_stores"]:
+                self._send_json(200, api.create_vector_store(self._read_json().get("name", "")))
+                return
+            if len(route) == 3 and route[0] == "vector_stores" and route[2] == "files":
+                request = self._read_json()
+                self._send_found(api.attach_file(route[1], request["file_id"], request.get("attributes") or {}))
+                return
+            if len(route) == 4 and route[0] == "vector_stores" and route[2] == "files":
+                request = self._read_json()
+                self._send_found(api.update_file_attributes(route[1], route[3], request.get("attributes") or {}))
+                return
+            if route != ["responses"]:
+                self._send_found(None)
+                return
+            request = self._read_json()
+            if api.should_reject():
+                self._send_json(
+                    429,
+                    {"error": {"message": "Rate limit reached (mock)", "type": "rate_limit_error", "code": None}},
+                    {"retry-after-ms": str(api.config.retry_after_ms)},
+                )
+                return
+            if request.get("stream"):
+                self._stream(request)
+            else:
+                words = api.answer_words(request)
+                prompt = api.prompt_usage(request)
+                ttft = api.sample_ttft(request, prompt[0] - prompt[1])
+                time.sleep(ttft + len(words) / api.config.tokens_per_second)
+                self._send_json(200, api.build_response(request, words, prompt))
+
+        def _stream(self, request: Dict[str, Any]):
+            with api._lock:
+                api.stats["streamed"] += 1
+            words = api.answer_words(request)
+            prompt = api.prompt_usage(request)
+            response = api.build_response(request, words, prompt)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+
+            sequence = itertools.count()
+
+            def send(event_type: str, data: Dict[str, Any]):
+                data = {"type": event_type, "sequence_number": next(sequence), **data}
+                self.wfile.write(f"event: {event_type}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+            in_progress = dict(response, status="in_progress", output=[], usage=None)
+            send("response.created", {"response": in_progress})
+            time.sleep(api.sample_ttft(request, prompt[0] - prompt[1]))
+            item_id = response["output"][-1]["id"]
+            for i, word in enumerate(words):
+                send("response.output_text.delta", {
+                    "item_id": item_id, "output_index": len(response["output"]) - 1, "content_index": 0,
+                    "delta": word if i == 0 else " " + word, "logprobs": [],
+                })
+                time.sleep(1 / api.config.tokens_per_second)
+            send("response.completed", {"response": response})
+
+    return Handler
+
+
+class MockServer(ThreadingHTTPServer):
+    # The stdlib default backlog of 5 drops SYNs under load and adds seconds of connect retries
+    request_queue_size = 256
+    daemon_threads = True
+
+
+def make_server(config: MockConfig, host: str = "127.0.0.1", port: int = 0) -> MockServer:
+    """Build (but don't start) a mock server; port 0 picks a free port"""
+    api = MockResponsesAPI(config)
+    server = MockServer((host, port), make_handler(api))
+    server.api = api  # Exposes request and 429 counts to in-process callers
+    return server
+
+
+def start_in_thread(config: MockConfig, host: str = "127.0.0.1", port: int = 0) -> MockServer:
+    server = make_server(config, host, port)
+    threading.Thread(target=server.serve_forever, name="mock-responses-api", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the Responses API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ttft-ms", type=float, default=MockConfig.ttft_ms)
+    parser.add_argument("--ttft-sigma", type=float, default=MockConfig.ttft_sigma)
+    parser.add_argument("--tokens-per-second", type=float, default=MockConfig.tokens_per_second)
+    parser.add_argument("--output-tokens", type=int, default=MockConfig.output_tokens)
+    parser.add_argument("--file-search-ms", type=float, default=MockConfig.file_search_ms)
+    parser.add_argument("--rate-429", type=float, default=MockConfig.rate_429)
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=MockConfig.prefill_ms_per_1k_tokens)
+    parser.add_argument("--upload-ms", type=float, default=MockConfig.upload_ms)
+    parser.add_argument("--seed", type=int, default=MockConfig.seed)
+    args = parser.parse_args()
+
+    config = MockConfig(
+        ttft_ms=args.ttft_ms, ttft_sigma=args.ttft_sigma, tokens_per_second=args.tokens_per_second,
+        output_tokens=args.output_tokens, file_search_ms=args.file_search_ms, rate_429=args.rate_429,
+        prefill_ms_per_1k_tokens=args.prefill_ms_per_1k, upload_ms=args.upload_ms, seed=args.seed,
+    )
+    server = make_server(config, args.host, args.port)
+    print(f"🧪 Mock Responses API on http://{args.host}:{server.server_address[1]}/v1", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
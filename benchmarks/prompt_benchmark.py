@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+First-turn prompt cost: the whole course map vs the topic-conditioned prompt
+
+Sends the opening turn of a conversation for each question, once with
+SYSTEM_INSTRUCTIONS (the full course map) and once with SYSTEM_CORE plus
+the topic modules the classifier picks, and reports input tokens, cached
+tokens and time to first token per variant, with a cold prompt cache
+(cleared before every request) and a warm one (passes run back to back).
+
+By default each variant gets a fresh local mock Responses API, which
+simulates upstream prefix caching and charges prefill time for uncached
+input tokens. --base-url measures any compatible endpoint instead (warm
+only; with the real API, file_search results add input tokens the mock
+leaves out).
+
+Usage (from the project root):
+    python -m benchmarks.prompt_benchmark --passes 5
+    python -m benchmarks.prompt_benchmark --base-url https://api.openai.com/v1
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+from openai import OpenAI
+
+import assistant
+import config
+from benchmarks.load_test import percentile
+from benchmarks.mock_responses_api import MockConfig, start_in_thread
+from prompt_topics import classify_topics
+
+# Beyond the example questions: a spread of topics, and some that match none
+EXTRA_QUESTIONS = [
+    "How do I read a CSV and set a datetime index with pandas?",
+    "What does the Chronos model need as input?",
+    "How did we tune TSMixer?",
+    "Prophet vs Silverkite: which handles changepoints better?",
+    "Walk me through the Air miles capstone with Holt-Winters",
+    "What is a good learning rate?",
+    "Explain the lecture on pitfalls",
+]
+
+
+def first_turn(client: OpenAI, request: Dict[str, Any]) -> Dict[str, Any]:
+    """Stream one request; returns TTFT and the usage numbers"""
+    started = time.perf_counter()
+    ttft: Optional[float] = None
+    usage = None
+    for event in client.responses.create(stream=True, **request):
+        if event.type == "response.output_text.delta" and ttft is None:
+            ttft = time.perf_counter() - started
+        elif event.type == "response.completed":
+            usage = event.response.usage
+    details = getattr(usage, "input_tokens_details", None)
+    return {
+        "ttft_s": ttft if ttft is not None else time.perf_counter() - started,
+        "input_tokens": usage.input_tokens if usage else 0,
+        "cached_tokens": (getattr(details, "cached_tokens", 0) or 0) if details else 0,
+    }
+
+
+def run_variant(client: OpenAI, questions: List[str], passes: int, topic_prompt: bool,
+                model: str, vector_store_id: str,
+                clear_cache: Optional[Callable[[], None]] = None) -> Dict[str, Any]:
+    """Cold: every request finds an empty prompt cache (mock only). Warm: passes in a row"""
+    report = {}
+    if clear_cache is not None:
+        cold = []
+        for question in questions:
+            clear_cache()
+            cold.append(first_turn(client, build(question, topic_prompt, model, vector_store_id)))
+        report["cold"] = summarize(cold)
+    warm = [first_turn(client, build(question, topic_prompt, model, vector_store_id))
+            for _ in range(passes) for question in questions]
+    # The very first request only primes the cache
+    report["warm"] = summarize(warm[1:] or warm)
+    return report
+
+
+def build(question: str, topic_prompt: bool, model: str, vector_store_id: str) -> Dict[str, Any]:
+    return assistant.build_request(question, vector_store_id, model=model, topic_prompt=topic_prompt)
+
+
+def summarize(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    ttft = [run["ttft_s"] for run in runs]
+    return {
+        "input_tokens_avg": round(statistics.mean(run["input_tokens"] for run in runs), 1),
+        "cached_tokens_avg": round(statistics.mean(run["cached_tokens"] for run in runs), 1),
+        "uncached_tokens_avg": round(statistics.mean(run["input_tokens"] - run["cached_tokens"] for run in runs), 1),
+        "ttft_ms": {f"p{p}": round(percentile(ttft, p) * 1000, 1) for p in (50, 95)},
+    }
+
+
+def classifier_cost(questions: List[str], repeat: int = 200) -> Dict[str, Any]:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for question in questions:
+            classify_topics(question, config.TOPIC_PROMPT_MAX_MODULES)
+    per_call = (time.perf_counter() - started) / (repeat * len(questions))
+    return {
+        "classify_us": round(per_call * 1e6, 1),
+        "topics": {question: ", ".join(classify_topics(question, config.TOPIC_PROMPT_MAX_MODULES)) or "-"
+                   for question in questions},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--passes", type=int, default=3, help="Warm passes over the questions per variant")
+    parser.add_argument("--base-url", help="Use this endpoint instead of a local mock")
+    parser.add_argument("--model", default=config.DEFAULT_MODEL)
+    parser.add_argument("--vector-store-id", default=config.VECTOR_STORE_ID or "vs_mock")
+    parser.add_argument("--ttft-ms", type=float, default=300.0, help="Mock base time to first token")
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=150.0,
+                        help="Mock prefill time per 1k uncached input tokens")
+    args = parser.parse_args()
+
+    questions = config.EXAMPLE_QUESTIONS + EXTRA_QUESTIONS
+    results = {"questions": len(questions), "passes": args.passes}
+    for name, topic_prompt in (("full_map", False), ("topic_modules", True)):
+        server = None
+        base_url = args.base_url
+        if base_url is None:
+            server = start_in_thread(MockConfig(ttft_ms=args.ttft_ms, ttft_sigma=0.1, output_tokens=20,
+                                                prefill_ms_per_1k_tokens=args.prefill_ms_per_1k))
+            base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY", "sk-mock"), base_url=base_url,
+                        http_client=httpx.Client(), max_retries=2)
+        results[name] = run_variant(client, questions, args.passes, topic_prompt, args.model,
+                                    args.vector_store_id, server.api.clear_prompt_cache if server else None)
+        if server is not None:
+            server.shutdown()
+    results["classifier"] = classifier_cost(questions)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Chat rendering cost per rerun as the history grows to MAX_MESSAGES
+
+Part 1 compares building the history's HTML the old way (every bubble,
+every rerun, six str.replace passes each) with the memoized block pipeline
+in rendering.py, and estimates the bytes Streamlit has to ship per rerun:
+elements under global.minCachedMessageSize, or new since the last rerun,
+go over the wire in full; larger unchanged ones only by hash.
+
+Part 2 times a whole app rerun through Streamlit's AppTest with the history
+seeded to each size (HISTORY_WINDOW is raised so every message is resident).
+
+With --code every answer carries fenced code blocks. Part 1 then also
+times highlighting every block on every rerun (all render caches cleared
+first), the cost code_blocks.py pays once per block, and reports the raw
+markdown that would otherwise be shipped for the browser to parse.
+
+Usage (from the project root):
+    python -m benchmarks.render_benchmark
+    python -m benchmarks.render_benchmark --skip-app
+    python -m benchmarks.render_benchmark --code
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+ROOT = Path(__file__).resolve().parent.parent
+MIN_CACHED_MESSAGE_SIZE = 10_000  # Streamlit's global.minCachedMessageSize default
+
+ANSWER = (
+    "**ARIMA vs SARIMA** — use SARIMA when the ACF shows seasonal spikes at lag *m*.<br>"
+    "<ul><li>Difference once for the trend, once at lag m for the season.</li>"
+    "<li>Fit with <code>SARIMAX(y, order=(1,1,1), seasonal_order=(1,1,1,12))</code>.</li></ul>"
+) * 4
+
+CODE_ANSWER = """Fit a seasonal model and forecast the next year:
+
+```python
+import pandas as pd
+from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+df = pd.read_csv("airline.csv", parse_dates=["Month"], index_col="Month")
+train, test = df.iloc[:-12], df.iloc[-12:]
+
+model = SARIMAX(train["Passengers"], order=(1, 1, 1), seasonal_order=(1, 1, 1, 12))
+fit = model.fit(disp=False)
+forecast = fit.get_forecast(steps=len(test))
+print(forecast.summary_frame(alpha=0.05).head())
+```
+
+Then score it against the holdout:
+
+```python
+from sklearn.metrics import mean_absolute_percentage_error
+
+mape = mean_absolute_percentage_error(test["Passengers"], forecast.predicted_mean)
+print(f"MAPE: {mape:.2%}")
+```
+"""
+
+
+def legacy_render(role: str, content: str, timestamp=None) -> str:
+    """The pre-memoization render_message_html, kept here as the baseline"""
+    def clean(txt: str) -> str:
+        for r in ['<br>', '<br/>', '<br />', '&lt;br&gt;', '&lt;br/&gt;', '&lt;br /&gt;']:
+            txt = txt.replace(r, '')
+        return txt.strip()
+
+    safe = clean(content)
+    if role == "user":
+        return f"""
+        <div class="user-message">
+            <strong>You</strong>{f' <small style="color:#666;">{timestamp}</small>' if timestamp else ''}
+            <br>{safe}
+        </div>
+        """
+    return f"""
+        <div class="assistant-message">
+            <strong>Assistant</strong>{f' <small style="color:#666;">{timestamp}</small>' if timestamp else ''}
+            <br>{content}
+        </div>
+        """
+
+
+def make_history(size: int, answer: str = ANSWER):
+    from chat_history import ChatMessage
+
+    # The sequence number keeps every answer (and its code) distinct, as in a real history
+    return [
+        ChatMessage(seq, "user" if seq % 2 == 0 else "assistant",
+                    f"Question {seq}: how do I pick SARIMA orders?<br>" if seq % 2 == 0
+                    else f"{seq}: {answer.replace('(disp=False)', f'(disp=False, maxiter={seq})')}",
+                    0.0)
+        for seq in range(size)
+    ]
+
+
+def best_of(fn: Callable[[], object], repeat: int = 20) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def shipped_bytes(elements: List[str], previous: set) -> int:
+    """Bytes sent in full: small elements, plus large ones the browser doesn't have yet"""
+    return sum(len(html) for html in elements if len(html) < MIN_CACHED_MESSAGE_SIZE or html not in previous)
+
+
+def uncached(fn: Callable[[], object]) -> Callable[[], object]:
+    """fn with every render cache emptied first: each block is highlighted again"""
+    import rendering
+    from code_blocks import code_block_html
+
+    def run():
+        for cached in (rendering.render_message_html, rendering.render_block_html, code_block_html):
+            cached.cache_clear()
+        return fn()
+    return run
+
+
+def html_pipeline(sizes: List[int], answer: str = ANSWER) -> List[dict]:
+    from rendering import history_html
+
+    rows = []
+    for size in sizes:
+        history = make_history(size, answer)
+        legacy = lambda: [legacy_render(m.role, m.content, "12:00" if i == size - 1 else None)
+                          for i, m in enumerate(history)]
+        memoized = lambda: history_html(history, "12:00")
+
+        # The previous rerun had one turn fewer: its elements are what the browser holds
+        before = set(history_html(history[:-2], "12:00")) if size > 2 else set()
+        row = {
+            "messages": size,
+            "legacy_ms": round(best_of(legacy) * 1000, 3),
+            "memoized_ms": round(best_of(memoized) * 1000, 3),
+            "legacy_shipped_kb": round(sum(len(html) for html in legacy()) / 1024, 1),
+            "memoized_shipped_kb": round(shipped_bytes(memoized(), before) / 1024, 1),
+        }
+        if "```" in answer:
+            row["highlight_every_rerun_ms"] = round(best_of(uncached(memoized), repeat=3) * 1000, 3)
+        rows.append(row)
+    return rows
+
+
+def app_reruns(sizes: List[int], repeat: int, answer: str = ANSWER) -> List[dict]:
+    from streamlit.testing.v1 import AppTest
+
+    rows = []
+    for size in sizes:
+        app = AppTest.from_file(str(ROOT / "streamlit_app.py"), default_timeout=60).run()
+        messages = app.session_state.messages
+        for message in make_history(size, answer):
+            messages.append(message.role, message.content)
+        app.run()  # Warm the render cache, as the turn that added each message would have
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            app.run()
+            timings.append(time.perf_counter() - started)
+        rows.append({"messages": size, "rerun_ms": round(statistics.median(timings) * 1000, 1)})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--step", type=int, default=20, help="History sizes go up in steps of this")
+    parser.add_argument("--repeat", type=int, default=10, help="App reruns timed per size")
+    parser.add_argument("--skip-app", action="store_true", help="Only the HTML pipeline comparison")
+    parser.add_argument("--code", action="store_true", help="Answers with fenced code blocks")
+    args = parser.parse_args()
+
+    # Before anything imports config, which reads the environment once
+    os.environ.update(
+        PREWARM_ENABLED="false", WARM_CONNECTIONS="false", METRICS_PORT="0", LANGSMITH_TRACING="false",
+        OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "sk-benchmark"),
+        VECTOR_STORE_ID=os.getenv("VECTOR_STORE_ID", "vs_benchmark"),
+    )
+    sys.path.insert(0, str(ROOT))
+    import config
+
+    os.environ["HISTORY_WINDOW"] = str(config.MAX_MESSAGES)
+    config.HISTORY_WINDOW = config.MAX_MESSAGES
+    sizes = sorted({*range(args.step, config.MAX_MESSAGES, args.step), config.MAX_MESSAGES})
+
+    answer = CODE_ANSWER if args.code else ANSWER
+    print(json.dumps({"html_pipeline": html_pipeline(sizes, answer)}, indent=2))
+    if not args.skip_app:
+        print(json.dumps({"app_rerun": app_reruns(sizes, args.repeat, answer)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
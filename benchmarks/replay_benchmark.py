@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Rendering and state-handling cost of a chat turn, with the model replayed from a cassette
+
+"record" drives the real app (via Streamlit's AppTest) through a scripted
+conversation against the local mock Responses API and writes a cassette.
+"replay" runs the same conversation from that cassette with zero latency,
+so the timings cover only process_user_input, display_message and the
+rerun itself. Run the two modes as separate processes: the client is
+cached per process.
+
+Usage (from the project root):
+    python -m benchmarks.replay_benchmark record --turns 8
+    python -m benchmarks.replay_benchmark replay --repeat 5
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_CASSETTE = ROOT / ".cache" / "cassettes" / "replay_benchmark.jsonl.gz"
+
+# Keep the run deterministic: no shared caches, background work or network listeners
+BENCHMARK_ENV = {
+    "ANSWER_CACHE_ENABLED": "false",
+    "SINGLE_FLIGHT_ENABLED": "false",
+    "PREWARM_ENABLED": "false",
+    "WARM_CONNECTIONS": "false",
+    "METRICS_PORT": "0",
+    "LANGSMITH_TRACING": "false",
+    "ROUTER_ENABLED": "false",
+}
+
+
+def script(turns: int) -> List[str]:
+    import config
+    from benchmarks.load_test import FOLLOW_UPS
+
+    return [config.EXAMPLE_QUESTIONS[0]] + [FOLLOW_UPS[i % len(FOLLOW_UPS)] for i in range(turns - 1)]
+
+
+def run_conversation(questions: List[str]) -> Dict[str, Any]:
+    """Submit each question through the chat form; time the submit and a plain rerun afterwards"""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(str(ROOT / "streamlit_app.py"), default_timeout=120).run()
+    timings = {"turn_s": [], "rerun_s": [], "misses": 0}
+    for question in questions:
+        app.text_area[0].input(question)
+        send = next(button for button in app.button if button.label == "🚀 Send")
+        started = time.perf_counter()
+        send.click().run()
+        timings["turn_s"].append(time.perf_counter() - started)
+        if app.exception:
+            raise RuntimeError(app.exception[0].value)
+        timings["misses"] += app.session_state.messages[-1].content.startswith("⚠️ Replay mode")
+
+        # A rerun with no new input: cost of redrawing the history so far
+        started = time.perf_counter()
+        app.run()
+        timings["rerun_s"].append(time.perf_counter() - started)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("--cassette", type=Path, default=DEFAULT_CASSETTE)
+    parser.add_argument("--turns", type=int, default=6, help="Turns to record")
+    parser.add_argument("--repeat", type=int, default=3, help="Replay passes")
+    args = parser.parse_args()
+
+    # Before anything imports config, which reads the environment once
+    os.environ.update(BENCHMARK_ENV)
+    os.environ["CASSETTE_PATH"] = str(args.cassette)
+    os.environ.setdefault("VECTOR_STORE_ID", "vs_mock")
+    sys.path.insert(0, str(ROOT))
+
+    if args.mode == "record":
+        from benchmarks.mock_responses_api import MockConfig, start_in_thread
+
+        args.cassette.unlink(missing_ok=True)
+        server = start_in_thread(MockConfig())
+        os.environ.update(
+            CASSETTE_MODE="record",
+            OPENAI_API_KEY="sk-mock",
+            OPENAI_BASE_URL=f"http://127.0.0.1:{server.server_address[1]}/v1",
+        )
+        timings = run_conversation(script(args.turns))
+        server.shutdown()
+        print(f"📼 Recorded {args.turns} turns to {args.cassette}")
+        passes = [timings]
+    else:
+        from cassette import Cassette
+
+        os.environ.update(CASSETTE_MODE="replay", CASSETTE_LATENCY="zero")
+        questions = Cassette(args.cassette).questions()
+        if not questions:
+            sys.exit(f"No recorded calls in {args.cassette}; run the record mode first")
+        passes = [run_conversation(questions) for _ in range(args.repeat)]
+
+    from benchmarks.load_test import percentile
+
+    turn = [value for timings in passes for value in timings["turn_s"]]
+    rerun = [value for timings in passes for value in timings["rerun_s"]]
+    print(json.dumps({
+        "mode": args.mode,
+        "turns": len(passes[0]["turn_s"]),
+        "passes": len(passes),
+        "cassette_misses": sum(timings["misses"] for timings in passes),
+        "turn_ms": {f"p{p}": round(percentile(turn, p) * 1000, 1) for p in (50, 95)},
+        "rerun_ms": {f"p{p}": round(percentile(rerun, p) * 1000, 1) for p in (50, 95)},
+        # Redraw cost by history length, first pass
+        "rerun_ms_by_turn": [round(value * 1000, 1) for value in passes[0]["rerun_s"]],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Retrieval latency and recall: local hybrid index vs hosted file_search
+
+The labeled query set is a JSONL file with one query per line:
+    {"query": "How are exogenous regressors added in SARIMAX?", "relevant": ["05_sarimax_exogenous.py"]}
+
+Usage (from the project root):
+    python -m benchmarks.retrieval_benchmark --queries labeled_queries.jsonl
+    python -m benchmarks.retrieval_benchmark --queries labeled_queries.jsonl --vector-store-id vs_...
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import config
+from local_retrieval import LocalIndex
+
+
+def load_queries(path: Path) -> List[Dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def score(queries: List[Dict], retrieved: List[List[str]]) -> Dict[str, float]:
+    """hit@k: any relevant file retrieved; recall@k: share of relevant files retrieved"""
+    hits, recalls = [], []
+    for labeled, filenames in zip(queries, retrieved):
+        relevant = set(labeled["relevant"])
+        found = relevant & set(filenames)
+        hits.append(1.0 if found else 0.0)
+        recalls.append(len(found) / len(relevant) if relevant else 0.0)
+    return {"hit_at_k": statistics.mean(hits), "recall_at_k": statistics.mean(recalls)}
+
+
+def run(name: str, queries: List[Dict], search: Callable[[str], List[str]]) -> Dict[str, float]:
+    latencies, retrieved = [], []
+    for labeled in queries:
+        started = time.perf_counter()
+        retrieved.append(search(labeled["query"]))
+        latencies.append((time.perf_counter() - started) * 1000)
+    report = {
+        "backend": name,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        **{key: round(value, 3) for key, value in score(queries, retrieved).items()},
+    }
+    print(json.dumps(report))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queries", type=Path, required=True, help="Labeled query set (JSONL)")
+    parser.add_argument("--index-dir", type=Path, default=config.LOCAL_INDEX_DIR)
+    parser.add_argument("-k", type=int, default=config.LOCAL_RETRIEVAL_TOP_K)
+    parser.add_argument("--vector-store-id", default=os.getenv("VECTOR_STORE_ID"),
+                        help="Also benchmark hosted search against this vector store")
+    args = parser.parse_args()
+
+    queries = load_queries(args.queries)
+    index = LocalIndex.load(args.index_dir)
+
+    run("local", queries, lambda q: [r.filename for r in index.search(q, args.k)])
+
+    # Batched search amortizes the dense matrix product across queries
+    started = time.perf_counter()
+    batched = index.search_batch([labeled["query"] for labeled in queries], args.k)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(json.dumps({
+        "backend": "local-batched",
+        "per_query_ms": round(elapsed_ms / max(len(queries), 1), 2),
+        **{key: round(value, 3) for key, value in
+           score(queries, [[r.filename for r in results] for results in batched]).items()},
+    }))
+
+    if args.vector_store_id:
+        from openai import OpenAI
+
+        client = OpenAI()
+        run("hosted", queries, lambda q: [
+            r.filename for r in client.vector_stores.search(
+                vector_store_id=args.vector_store_id, query=q, max_num_results=args.k
+            ).data
+        ])
+
+
+if __name__ == "__main__":
+    main()
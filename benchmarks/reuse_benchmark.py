@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Follow-up turns with and without reusing the previous turn's file_search results
+
+Runs the load test's session scripts (an example question, then rotating
+follow-ups) against the mock Responses API, streaming, once searching on
+every turn and once through retrieval_cache.RetrievalCache as the app uses
+it. The mock adds --file-search-ms to the first token of every request
+that attaches file_search, and returns chunks of a small canned corpus as
+the search results. Per mode it reports first-token and turn latency of
+follow-up turns and their input tokens (reused snippets travel in the
+prompt); for the reuse mode also the cache's hit rate, misses by reason
+and its own estimate of the latency saved.
+
+Usage (from the project root):
+    python -m benchmarks.reuse_benchmark --sessions 20 --turns 4
+"""
+
+import argparse
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import httpx
+from openai import OpenAI
+
+import assistant
+import config
+from benchmarks.load_test import percentile, session_script, start_mock
+from retrieval_cache import RetrievalCache, search_results
+
+
+class FollowUpRun:
+    """Sessions of one mode; follow-up turns are measured, opening turns only seed the cache"""
+
+    def __init__(self, client: OpenAI, model: str, cache: Optional[RetrievalCache]):
+        self.client = client
+        self.model = model
+        self.cache = cache
+        self.ttfts: List[float] = []
+        self.latencies: List[float] = []
+        self.input_tokens: List[int] = []
+        self.errors = 0
+
+    def run_session(self, session_id: str, script: List[str], think_s: float) -> None:
+        previous_response_id = None
+        for turn, question in enumerate(script):
+            if turn:
+                time.sleep(think_s)
+            retrieval = self.cache.lookup(session_id, question) if self.cache is not None and turn else None
+            request = assistant.build_request(
+                question, "vs_mock", previous_response_id, self.model,
+                context=self.cache.context(retrieval) if retrieval is not None else None,
+            )
+            started = time.perf_counter()
+            try:
+                ttft, response = self._stream(request, started)
+            except Exception:
+                self.errors += 1
+                return
+            latency = time.perf_counter() - started
+            previous_response_id = response.id
+            if self.cache is not None:
+                if "tools" in request:
+                    self.cache.store(session_id, question, search_results(response))
+                if turn:
+                    self.cache.observe("tools" in request, latency)
+            if turn:
+                self.ttfts.append(ttft)
+                self.latencies.append(latency)
+                self.input_tokens.append(response.usage.input_tokens)
+
+    def _stream(self, request: Dict[str, Any], started: float):
+        ttft, response = None, None
+        for event in self.client.responses.create(stream=True, **request):
+            if event.type == "response.output_text.delta" and ttft is None:
+                ttft = time.perf_counter() - started
+            elif event.type == "response.completed":
+                response = event.response
+        if response is None:
+            raise RuntimeError("Stream ended without response.completed")
+        return ttft, response
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "follow_up_turns": len(self.latencies),
+            "errors": self.errors,
+            "ttft_ms": {f"p{p}": round(percentile(self.ttfts, p) * 1000, 1) for p in (50, 95)},
+            "turn_latency_ms": {f"p{p}": round(percentile(self.latencies, p) * 1000, 1) for p in (50, 95)},
+            "mean_turn_latency_ms": round(statistics.fmean(self.latencies) * 1000, 1) if self.latencies else None,
+            "mean_input_tokens": round(statistics.fmean(self.input_tokens)) if self.input_tokens else None,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=4, help="Turns per session (the first one always searches)")
+    parser.add_argument("--think-ms", type=float, default=100.0)
+    parser.add_argument("--model", default=config.DEFAULT_MODEL)
+    # Mock upstream (see benchmarks.load_test)
+    parser.add_argument("--ttft-ms", type=float, default=400.0)
+    parser.add_argument("--ttft-sigma", type=float, default=0.3)
+    parser.add_argument("--tokens-per-second", type=float, default=400.0)
+    parser.add_argument("--output-tokens", type=int, default=80)
+    parser.add_argument("--file-search-ms", type=float, default=300.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    # The include parameter that returns search results is only sent with reuse enabled
+    config.RETRIEVAL_REUSE_ENABLED = True
+
+    mock, base_url = start_mock(args)
+    try:
+        client = OpenAI(api_key="sk-mock", base_url=base_url, max_retries=2,
+                        http_client=httpx.Client(timeout=config.HTTP_TIMEOUT))
+        client.models.list()  # Warm imports and the pool before measuring
+        results: Dict[str, Any] = {"sessions": args.sessions, "turns_per_session": args.turns,
+                                   "file_search_ms": args.file_search_ms}
+        for mode in ("search_every_turn", "reuse"):
+            cache = RetrievalCache(
+                max_sessions=args.sessions, max_reuses=config.RETRIEVAL_REUSE_MAX_TURNS,
+                ttl_seconds=config.RETRIEVAL_REUSE_TTL_SECONDS, min_coverage=config.RETRIEVAL_REUSE_MIN_COVERAGE,
+                top_k=config.RETRIEVAL_REUSE_TOP_K,
+            ) if mode == "reuse" else None
+            run = FollowUpRun(client, args.model, cache)
+            with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+                for i in range(args.sessions):
+                    pool.submit(run.run_session, f"{mode}-{i:04d}", session_script(i, args.turns),
+                                args.think_ms / 1000)
+            results[mode] = run.report()
+            if cache is not None:
+                results[mode]["retrieval_cache"] = cache.stats()
+    finally:
+        mock.terminate()
+        mock.wait()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Retrieval latency and relevance: one index vs course-part shards with query routing
+
+Builds a single LocalIndex and a ShardedIndex (one index per course part,
+see course_shards.py) over the same materials and runs the same labeled
+queries through both: the single index searches everything, the sharded
+one routes each query to its parts (or to the lecture file it names),
+searches those in parallel and merges. Reports p50/p95 latency, hit@k and
+recall@k per setup, and how the router sent the queries.
+
+The materials and queries are either real (--materials and a --queries
+JSONL as for benchmarks.retrieval_benchmark) or --synthetic: a generated
+course with the same lecture subjects (CV, tuning, ...) in every part, so
+a question about "Prophet cross validation" competes with the CV lectures
+of every other model, and some queries name their lecture by filename.
+With --vector-store-id the hosted store is searched too, with and without
+the route's attribute filter (the store must be synced by
+vector_store_sync.py so its files carry their part).
+
+Usage (from the project root):
+    python -m benchmarks.shard_benchmark --synthetic --lectures 12
+    python -m benchmarks.shard_benchmark --materials course_materials --queries labeled_queries.jsonl
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import config
+import course_shards
+from benchmarks.retrieval_benchmark import load_queries, run
+from local_retrieval import LocalIndex, ShardedIndex
+
+# Course part -> (word it is named by in paths and questions, words of its lectures)
+SYNTHETIC_PARTS = {
+    "analysis": ("acf", "autocorrelation decomposition resample rolling window lag plot"),
+    "exponential_smoothing": ("holt_winters", "smoothing level trend damped seasonal mape"),
+    "arima": ("sarimax", "stationarity differencing order aic exogenous"),
+    "prophet": ("prophet", "holidays changepoint regressor yearly seasonality"),
+    "lstm": ("lstm", "recurrent sequence scaler epochs dropout"),
+    "tft": ("tft", "temporal fusion covariates attention quantiles"),
+    "nbeats": ("nbeats", "stacks blocks basis expansion backcast"),
+    "chronos": ("chronos", "foundation pretrained tokenizer zero shot"),
+    "tsmixer": ("tsmixer", "mixer mlp time feature mixing"),
+    "silverkite": ("silverkite", "greykite growth components fourier"),
+}
+# Lecture subjects every part has, with the words its transcript uses
+SUBJECTS = {
+    "setup": "install import libraries load dataset date index frequency",
+    "params": "parameters defaults configuration arguments settings options",
+    "training": "fit train loss optimizer iterations convergence",
+    "cv": "cross validation folds cutoff horizon initial period",
+    "tuning": "grid search best combination rmse candidates",
+    "forecasting": "predict future dates forecast horizon intervals",
+    "visualization": "plot chart components actual versus predicted",
+}
+FILLER = ("time series forecasting model data the course we now look at how this works in practice "
+          "and what to watch for when applying it to real datasets").split()
+
+
+def write_synthetic(materials: Path, lectures: int, words: int, seed: int) -> List[Dict]:
+    """A course of lectures per part, and labeled queries by part and subject or by filename; returns the queries"""
+    rng = random.Random(seed)
+    queries = []
+    subjects = list(SUBJECTS)
+    for part, (name, vocabulary) in SYNTHETIC_PARTS.items():
+        folder = materials / part
+        folder.mkdir(parents=True, exist_ok=True)
+        written: Dict[str, List[str]] = {}  # Subject -> its lectures (a part can have several on one subject)
+        for i in range(lectures):
+            subject = subjects[i % len(subjects)]
+            stem = f"{i + 1:02d}_{name}_{subject}" + (f"_{i // len(subjects)}" if i >= len(subjects) else "")
+            suffix = ".py" if i % 3 == 0 else ".txt"
+            pool = FILLER * 3 + vocabulary.split() * 2 + SUBJECTS[subject].split() * 2 + [name.replace("_", " ")]
+            lines = [" ".join(rng.choice(pool) for _ in range(12)) for _ in range(words // 12)]
+            (folder / f"{stem}{suffix}").write_text("\n".join(lines), encoding="utf-8")
+            written.setdefault(subject, []).append(f"{stem}{suffix}")
+            if i % 4 == 3:
+                queries.append({"query": f"In {stem}, how are the {SUBJECTS[subject].split()[0]} steps done?",
+                                "relevant": [f"{stem}{suffix}"]})
+        for subject, filenames in written.items():
+            queries.append({"query": f"How does {name.replace('_', ' ')} handle {SUBJECTS[subject]}?",
+                            "relevant": filenames})
+    # Questions that name no course part: every part has a lecture on the subject
+    for subject, vocabulary in SUBJECTS.items():
+        relevant = [p.name for p in materials.rglob(f"*_{subject}*")]
+        queries.append({"query": f"Which {vocabulary} are used?", "relevant": relevant})
+    return queries
+
+
+def hosted_runs(queries: List[Dict], vector_store_id: str, k: int) -> List[Dict]:
+    from openai import OpenAI
+
+    client = OpenAI()
+    router = course_shards.store_router(vector_store_id)
+    if router is None:
+        raise SystemExit(f"❌ {vector_store_id} has no part tags; run vector_store_sync.py first")
+
+    def search(query: str, filtered: bool) -> List[str]:
+        filters = router.route(query).filters() if filtered else None
+        response = client.vector_stores.search(vector_store_id=vector_store_id, query=query, max_num_results=k,
+                                               **({"filters": filters} if filters else {}))
+        return [r.filename for r in response.data]
+
+    return [run("hosted-single", queries, lambda q: search(q, False)),
+            run("hosted-routed", queries, lambda q: search(q, True))]
+
+
+def build_both(materials: Path, index_dir: Path) -> Tuple[LocalIndex, ShardedIndex]:
+    single = LocalIndex.build(materials, index_dir / "single")
+    sharded = ShardedIndex.build(materials, index_dir / "shards")
+    return single, sharded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--synthetic", action="store_true", help="Generate the course and its queries")
+    parser.add_argument("--lectures", type=int, default=12, help="Synthetic lectures per course part")
+    parser.add_argument("--words", type=int, default=1500, help="Words per synthetic lecture")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--materials", type=Path, default=config.COURSE_MATERIALS_DIR)
+    parser.add_argument("--queries", type=Path, help="Labeled query set (JSONL)")
+    parser.add_argument("-k", type=int, default=config.LOCAL_RETRIEVAL_TOP_K)
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the queries (latency samples)")
+    parser.add_argument("--vector-store-id", default=os.getenv("VECTOR_STORE_ID"),
+                        help="Also compare filtered and unfiltered hosted search on this store")
+    args = parser.parse_args()
+    if not args.synthetic and args.queries is None:
+        parser.error("Pass --queries with --materials, or --synthetic")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        materials = Path(tmp) / "materials" if args.synthetic else args.materials
+        queries = (write_synthetic(materials, args.lectures, args.words, args.seed) if args.synthetic
+                   else load_queries(args.queries))
+        single, sharded = build_both(materials, Path(tmp) / "index")
+        results = {
+            "queries": len(queries),
+            "chunks": len(single.texts),
+            "shard_chunks": {part: len(index.texts) for part, index in sorted(sharded.shards.items())},
+            "runs": [
+                run("single", queries * args.repeat, lambda q: [r.filename for r in single.search(q, args.k)]),
+                run("sharded", queries * args.repeat, lambda q: [r.filename for r in sharded.search(q, args.k)]),
+            ],
+            "routing": sharded.router.stats(),
+        }
+        if args.vector_store_id and not args.synthetic:
+            results["runs"] += hosted_runs(queries, args.vector_store_id, args.k)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Vector store sync against the local mock Files / vector store endpoints
+
+Generates a synthetic course directory and runs vector_store_sync through
+the scenarios that matter: a first full sync (one worker vs the pool), a
+no-op re-sync, a sync after editing, adding and deleting a few files, a
+re-sync of a store whose files predate their course-part tags, and a sync
+interrupted with SIGINT part-way and then resumed. Reports the
+uploads, removals and wall time of each, and checks that the store ends
+up holding exactly one copy of every local file with no orphaned uploads.
+
+Usage (from the project root):
+    python -m benchmarks.sync_benchmark --files 200 --upload-ms 50
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+from benchmarks.mock_responses_api import MockConfig, MockServer, start_in_thread
+from vector_store_sync import SyncManifest, make_client, sync
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def write_materials(materials: Path, count: int, size: int = 20_000) -> None:
+    materials.mkdir(parents=True, exist_ok=True)
+    for i in range(count):
+        suffix = ".py" if i % 4 == 0 else ".txt"
+        line = f"Lecture {i}: forecasting with lagged features and rolling windows.\n"
+        (materials / f"{i:03d}_lecture{suffix}").write_text(line * (size // len(line)), encoding="utf-8")
+
+
+def store_check(server: MockServer, store_id: str, materials: Path) -> Dict[str, Any]:
+    api = server.api
+    attached = api.store_files(store_id)
+    paths = [f["attributes"]["path"] for f in attached]
+    local = sorted(p.name for p in materials.iterdir())
+    with api._lock:
+        # Uploads attached to no store at all (every scenario shares one mock)
+        in_stores = {file_id for files in api.vector_stores.values() for file_id in files}
+        orphaned = len(set(api.files) - in_stores)
+    return {"store_files": len(attached), "local_files": len(local),
+            "matches_disk": sorted(paths) == local, "orphaned_uploads": orphaned}
+
+
+def counters(server: MockServer) -> Dict[str, int]:
+    return {name: server.api.stats[name] for name in ("uploads", "attached", "retagged", "detached", "files_deleted")}
+
+
+def delta(before: Dict[str, int], after: Dict[str, int]) -> Dict[str, int]:
+    return {name: after[name] - before[name] for name in after}
+
+
+def run_sync(server: MockServer, client, store_id: str, materials: Path, manifest_dir: Path,
+             workers: int) -> Dict[str, Any]:
+    before = counters(server)
+    report = sync(client, store_id, materials, manifest_dir, workers)
+    return {"plan": {k: report[k] for k in ("upload", "attach", "delete", "retag", "unchanged")},
+            "seconds": report["seconds"], "failed": len(report["failed"]), "api_calls": delta(before, counters(server))}
+
+
+def interrupted(server: MockServer, base_url: str, store_id: str, materials: Path, manifest_dir: Path,
+                workers: int, after_uploads: int) -> Dict[str, Any]:
+    """Run the CLI in a subprocess and SIGINT it once after_uploads files have been uploaded"""
+    before = counters(server)
+    process = subprocess.Popen(
+        [sys.executable, "vector_store_sync.py", "--base-url", base_url, "--vector-store-id", store_id,
+         "--materials", str(materials), "--manifest-dir", str(manifest_dir), "--workers", str(workers)],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    while server.api.stats["uploads"] - before["uploads"] < after_uploads and process.poll() is None:
+        time.sleep(0.005)
+    process.send_signal(signal.SIGINT)
+    process.wait(timeout=60)
+    return {"exit_code": process.returncode, "api_calls": delta(before, counters(server))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--upload-ms", type=float, default=50.0, help="Mock time per upload")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    server = start_in_thread(MockConfig(upload_ms=args.upload_ms))
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "sk-mock")
+    client = make_client(base_url, args.workers)
+    results: Dict[str, Any] = {"files": args.files, "upload_ms": args.upload_ms, "workers": args.workers}
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        materials = tmp / "materials"
+        write_materials(materials, args.files)
+
+        serial_store = client.vector_stores.create(name="serial").id
+        results["full_sync_1_worker"] = run_sync(server, client, serial_store, materials, tmp / "serial", 1)
+        store = client.vector_stores.create(name="pooled").id
+        results["full_sync_pool"] = run_sync(server, client, store, materials, tmp / "manifests", args.workers)
+        results["resync_unchanged"] = run_sync(server, client, store, materials, tmp / "manifests", args.workers)
+
+        for i in range(5):
+            path = next(materials.glob(f"{i * 7:03d}_lecture.*"))
+            path.write_text(path.read_text(encoding="utf-8") + "Errata: corrected the lag order.\n", encoding="utf-8")
+        for i in range(3):
+            next(materials.glob(f"{args.files - 1 - i:03d}_lecture.*")).unlink()
+        (materials / "new_appendix.md").write_text("# Appendix\nExtra reading.\n", encoding="utf-8")
+        (materials / "new_capstone.py").write_text("print('capstone')\n", encoding="utf-8")
+        results["resync_5_edited_2_added_3_deleted"] = run_sync(server, client, store, materials,
+                                                               tmp / "manifests", args.workers)
+        results["store_after_edits"] = store_check(server, store, materials)
+
+        # A store synced before files were tagged with their course part: retagged in place, nothing uploaded
+        manifest = SyncManifest.for_store(store, tmp / "manifests")
+        for rel_path in list(manifest.entries):
+            manifest.entries[rel_path].pop("part", None)
+        manifest.update(rel_path)  # Writes the manifest
+        results["resync_untagged"] = run_sync(server, client, store, materials, tmp / "manifests", args.workers)
+        results["store_after_retag"] = {
+            **store_check(server, store, materials),
+            "untagged": sum("part" not in f["attributes"] for f in server.api.store_files(store)),
+        }
+
+        resumed_store = client.vector_stores.create(name="resumed").id
+        results["interrupted"] = interrupted(server, base_url, resumed_store, materials, tmp / "resume",
+                                             args.workers, after_uploads=len(list(materials.iterdir())) // 3)
+        results["resumed"] = run_sync(server, client, resumed_store, materials, tmp / "resume", args.workers)
+        uploads = results["interrupted"]["api_calls"]["uploads"] + results["resumed"]["api_calls"]["uploads"]
+        results["store_after_resume"] = {**store_check(server, resumed_store, materials),
+                                         "duplicate_uploads": uploads - len(list(materials.iterdir()))}
+    server.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
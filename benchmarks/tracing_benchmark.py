@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Per-call overhead of tracing a turn
+
+Times a traced no-op "turn" (a root span with one child, the shape of
+ask_bot around responses.create) against the same function untraced:
+with tracing off, with the buffered tracer at full and 10% head
+sampling, with a sink too slow to keep up (the buffer drops instead of
+blocking), and with LangSmith's inline @traceable against a local
+capture server. Reports mean and p99 overhead per call in microseconds.
+
+Usage (from the project root):
+    python -m benchmarks.tracing_benchmark --calls 20000
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import tracing
+from benchmarks.load_test import percentile
+from tracing import FileSink, Tracer
+
+
+class SlowSink:
+    """Stands in for an unreachable or overloaded endpoint"""
+
+    def __init__(self, delay_s: float):
+        self.delay_s = delay_s
+
+    def export(self, spans) -> None:
+        time.sleep(self.delay_s)
+
+
+def work() -> int:
+    return sum(range(50))
+
+
+def traced_turn() -> int:
+    with tracing.span("ask_bot"):
+        tracing.annotate_trace(model="gpt-5-nano", input_tokens=1200)
+        with tracing.span("responses.create", run_type="llm"):
+            return work()
+
+
+def time_calls(fn: Callable[[], object], calls: int) -> List[float]:
+    timings = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def overhead(timings: List[float], baseline: List[float]) -> Dict[str, float]:
+    return {
+        "mean_us": round((statistics.mean(timings) - statistics.mean(baseline)) * 1e6, 2),
+        "p99_us": round((percentile(timings, 99) - percentile(baseline, 99)) * 1e6, 2),
+        "max_us": round(max(timings) * 1e6, 1),
+    }
+
+
+def run_buffered(sink, calls: int, baseline: List[float], **options) -> Dict[str, object]:
+    tracer = Tracer(sink, flush_seconds=0.05, **options)
+    tracing.configure(tracer)
+    try:
+        result = overhead(time_calls(traced_turn, calls), baseline)
+    finally:
+        tracing.configure(None)
+    tracer.close()
+    stats = tracer.stats()
+    result.update({name: stats[name] for name in ("kept_sampled", "not_sampled", "dropped", "exported_spans")})
+    return result
+
+
+def run_langsmith(calls: int, baseline: List[float]) -> Dict[str, object]:
+    try:
+        from langsmith import Client, traceable, tracing_context
+    except ImportError:
+        return {"skipped": "langsmith not installed"}
+
+    class Capture(BaseHTTPRequestHandler):
+        def _ok(self):
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        do_GET = do_POST = do_PATCH = _ok
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Capture)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = Client(api_url=f"http://127.0.0.1:{server.server_address[1]}", api_key="lsv2_benchmark")
+
+    @traceable(run_type="llm", name="responses.create")
+    def create():
+        return work()
+
+    @traceable(name="ask_bot")
+    def turn():
+        return create()
+
+    with tracing_context(enabled=True, client=client, project_name="tracing-benchmark"):
+        result = overhead(time_calls(turn, calls), baseline)
+    client.flush()
+    server.shutdown()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20_000)
+    parser.add_argument("--skip-langsmith", action="store_true")
+    args = parser.parse_args()
+
+    time_calls(work, args.calls)  # Warm up
+    baseline = time_calls(work, args.calls)
+    results = {
+        "calls": args.calls,
+        "untraced_mean_us": round(statistics.mean(baseline) * 1e6, 2),
+        "tracing_off": overhead(time_calls(traced_turn, args.calls), baseline),
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        results["buffered_file_sampled_100"] = run_buffered(FileSink(Path(tmp) / "traces.jsonl"), args.calls, baseline)
+        results["buffered_file_sampled_10"] = run_buffered(
+            FileSink(Path(tmp) / "traces.jsonl"), args.calls, baseline, sample_rate=0.1
+        )
+    results["buffered_slow_sink"] = run_buffered(
+        SlowSink(0.2), args.calls, baseline, buffer_size=1000, batch_size=100
+    )
+    if not args.skip_langsmith:
+        results["langsmith_traceable"] = run_langsmith(min(args.calls, 2000), baseline)
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Record/replay cassettes for the model client
+
+In record mode every responses.create call goes to the real client and the
+request/response pair is appended to a gzipped JSONL cassette: the full
+response for plain calls, or the timed event sequence for streamed calls
+(text deltas stored as bare [offset, text] pairs to keep files small).
+In replay mode calls are answered from the cassette without touching the
+network, with the recorded latency or none at all. Requests are matched on
+their content, including previous_response_id, so chained follow-ups replay
+because the recorded response ids are served back unchanged.
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from scheduler import UpstreamUnavailableError
+
+# Per-call transport options that don't change the answer
+_UNKEYED_ARGS = {"timeout", "extra_headers", "extra_query", "extra_body"}
+
+
+class CassetteMissError(UpstreamUnavailableError):
+    """Replay mode got a request that was never recorded"""
+
+    def __init__(self, key: str):
+        super().__init__(
+            f"No recorded response for request {key}",
+            user_message="⚠️ Replay mode: this question isn't in the recorded cassette.",
+        )
+
+
+def request_key(kwargs: Dict[str, Any]) -> str:
+    """Stable identity of a responses.create call"""
+    keyed = {name: value for name, value in kwargs.items() if name not in _UNKEYED_ARGS}
+    canonical = json.dumps(keyed, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+def last_user_message(kwargs: Dict[str, Any]) -> Optional[str]:
+    items = kwargs.get("input")
+    if isinstance(items, str):
+        return items
+    for item in reversed(items or []):
+        if isinstance(item, dict) and item.get("role") == "user":
+            return item.get("content")
+    return None
+
+
+def _dump(obj: Any) -> Dict[str, Any]:
+    data = obj.model_dump(mode="json", exclude_none=True) if hasattr(obj, "model_dump") else dict(obj)
+    # output_text is a computed property on the SDK response model
+    if data.get("object") == "response":
+        data.setdefault("output_text", getattr(obj, "output_text", ""))
+    elif isinstance(data.get("response"), dict):
+        data["response"].setdefault("output_text", getattr(obj.response, "output_text", ""))
+    return data
+
+
+class Record:
+    """Read-only attribute view over recorded JSON, standing in for SDK models"""
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data: Dict[str, Any]):
+        self._data = data
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("__"):
+            raise AttributeError(name)
+        try:
+            return _wrap(self._data[name])
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def model_dump(self, **_) -> Dict[str, Any]:
+        return self._data
+
+    def __repr__(self) -> str:
+        return f"Record({self._data.get('type') or self._data.get('id')})"
+
+
+def _wrap(value: Any) -> Any:
+    if isinstance(value, dict):
+        return Record(value)
+    if isinstance(value, list):
+        return [_wrap(item) for item in value]
+    return value
+
+
+class Cassette:
+    """In-memory index of a cassette file, appended to as calls are recorded"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._entries: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._cursors: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self.stats = {"recorded": 0, "replayed": 0, "misses": 0}
+        if self.path.exists():
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry["key"]].append(entry)
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def questions(self) -> List[str]:
+        """Recorded user questions in recording order"""
+        entries = sorted((e for group in self._entries.values() for e in group), key=lambda e: e["seq"])
+        return [e["question"] for e in entries if e.get("question")]
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            entry["seq"] = len(self)
+            self._entries[entry["key"]].append(entry)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # One gzip member per call: crash-safe appends, still readable as one stream
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            self.stats["recorded"] += 1
+
+    def next(self, key: str) -> Optional[Dict[str, Any]]:
+        """Recorded entries for a key in order; the last one repeats once exhausted"""
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.stats["misses"] += 1
+                return None
+            index = min(self._cursors[key], len(entries) - 1)
+            self._cursors[key] += 1
+            self.stats["replayed"] += 1
+            return entries[index]
+
+
+class _CassetteResponses:
+    def __init__(self, client: "CassetteClient"):
+        self._client = client
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client._inner.responses, name)
+
+    def create(self, **kwargs) -> Any:
+        client = self._client
+        key = request_key(kwargs)
+        if client.mode == "replay":
+            entry = client.cassette.next(key)
+            if entry is None:
+                raise CassetteMissError(key)
+            return client._replay(entry)
+
+        started = time.perf_counter()
+        result = client._inner.responses.create(**kwargs)
+        entry = {"key": key, "question": last_user_message(kwargs), "model": kwargs.get("model"),
+                 "stream": bool(kwargs.get("stream"))}
+        if not entry["stream"]:
+            entry["elapsed"] = round(time.perf_counter() - started, 3)
+            entry["response"] = _dump(result)
+            client.cassette.append(entry)
+            return result
+        return client._record_stream(result, entry, started)
+
+
+class _RecordingStream:
+    """Passes a live stream through while recording it; close() (or an early exit) closes the live stream too"""
+
+    def __init__(self, cassette: Cassette, stream: Any, entry: Dict[str, Any], started: float):
+        self.cassette = cassette
+        self.stream = stream
+        # The live HTTP response, so a cancelled turn can still disconnect it (assistant.close_on_cancel)
+        self.response = getattr(stream, "response", None)
+        self._events = self._record(entry, started)
+
+    def __iter__(self) -> Iterator[Any]:
+        return self._events
+
+    def close(self) -> None:
+        self._events.close()
+        self._close_stream()
+
+    def _record(self, entry: Dict[str, Any], started: float) -> Iterator[Any]:
+        events = []
+        try:
+            for event in self.stream:
+                offset = round(time.perf_counter() - started, 3)
+                if getattr(event, "type", None) == "response.output_text.delta":
+                    events.append([offset, event.delta])
+                else:
+                    events.append([offset, _dump(event)])
+                yield event
+        finally:
+            # Closing early disconnects upstream instead of leaving the call running
+            self._close_stream()
+        # Only complete streams are saved; an abandoned stream can't be replayed faithfully
+        entry["events"] = events
+        self.cassette.append(entry)
+
+    def _close_stream(self) -> None:
+        close = getattr(self.stream, "close", None)
+        if close is not None:
+            close()
+
+
+class CassetteClient:
+    """Wraps an OpenAI client; only responses.create is recorded/replayed, the rest passes through"""
+
+    def __init__(self, inner: Any, cassette: Cassette, mode: str = "replay", latency: str = "original"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self._inner = inner
+        self.cassette = cassette
+        self.mode = mode
+        self.latency = latency  # "original" or "zero"
+        self.responses = _CassetteResponses(self)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._inner, name)
+
+    def _record_stream(self, stream: Any, entry: Dict[str, Any], started: float) -> "_RecordingStream":
+        return _RecordingStream(self.cassette, stream, entry, started)
+
+    def _replay(self, entry: Dict[str, Any]) -> Any:
+        if not entry["stream"]:
+            if self.latency == "original":
+                time.sleep(entry.get("elapsed", 0))
+            return Record(entry["response"])
+        return self._replay_stream(entry["events"])
+
+    def _replay_stream(self, events: List[List[Any]]) -> Iterator[Any]:
+        started = time.perf_counter()
+        for offset, payload in events:
+            if self.latency == "original":
+                delay = offset - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            if isinstance(payload, str):
+                yield Record({"type": "response.output_text.delta", "delta": payload})
+            else:
+                yield Record(payload)
+
+
+def wrap_client(client: Any, mode: str, path: Path, latency: str = "original") -> Any:
+    """Apply cassette mode "record" or "replay"; any other mode returns the client unchanged"""
+    if mode not in ("record", "replay"):
+        return client
+    cassette = Cassette(path)
+    if mode == "replay":
+        print(f"📼 Replaying {len(cassette)} recorded calls from {path} ({latency} latency)")
+    else:
+        print(f"📼 Recording model calls to {path}")
+    return CassetteClient(client, cassette, mode, latency)
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Optional asyncio chat backend, with the Streamlit app as a thin client
+
+The backend serves the model side of a turn over local HTTP: POST /v1/turns
+takes either a ready responses.create request (what the app builds, with
+its routing, compaction and retrieval already applied) or a bare question
+plus previous_response_id, and answers with the response JSON or the
+upstream SSE stream relayed byte for byte (parsing every event into SDK
+models would cost more CPU than the rest of the turn). Every upstream call
+runs on one event loop through a bounded number of slots, a shared rate
+limit, the scheduler's retry policy and circuit breaker, and a pooled
+AsyncOpenAI client, so one backend can serve several Streamlit replicas
+without a thread per waiting user. Requests beyond the queue limit are
+shed with 503.
+
+Run it, then point the app at it:
+    python chat_backend.py --port 8600
+    CHAT_BACKEND_URL=http://127.0.0.1:8600 streamlit run streamlit_app.py
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional
+
+import assistant
+import config
+from cassette import Record
+from scheduler import (
+    CircuitBreaker, DeadlineExceededError, RequestScheduler, UpstreamUnavailableError,
+)
+
+
+class AsyncGate:
+    """The RequestScheduler's rate limit, retry policy and breaker for coroutines, with bounded slots"""
+
+    def __init__(self, scheduler: RequestScheduler, max_concurrency: int, max_queue: int):
+        self.scheduler = scheduler
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._waiting = 0
+        self._active = 0
+        self._stats = Counter()
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    async def acquire(self, deadline: float) -> None:
+        """Wait for a slot and a rate limit token; sheds when the queue is full"""
+        if not self.scheduler.breaker.allow():
+            self._stats["rejected_open_circuit"] += 1
+            raise UpstreamUnavailableError("Circuit breaker open")
+        if self._waiting >= self.max_queue:
+            self._stats["shed"] += 1
+            raise UpstreamUnavailableError(f"Backend queue full ({self.max_queue} waiting)")
+        enqueued = time.monotonic()
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=max(0.0, deadline - enqueued))
+        except asyncio.TimeoutError:
+            self._stats["deadline_exceeded"] += 1
+            raise DeadlineExceededError("Deadline exceeded while queued") from None
+        finally:
+            self._waiting -= 1
+        self._active += 1
+        try:
+            while True:
+                delay = self.scheduler.bucket.reserve()
+                if not delay:
+                    break
+                if time.monotonic() + delay > deadline:
+                    self._stats["deadline_exceeded"] += 1
+                    raise DeadlineExceededError("Deadline exceeded waiting for rate limit budget")
+                await asyncio.sleep(delay)
+        except BaseException:
+            self.release()
+            raise
+        waited = time.monotonic() - enqueued
+        self._stats["granted"] += 1
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+
+    def release(self) -> None:
+        self._active -= 1
+        self._slots.release()
+
+    async def call(self, fn: Callable[[float], Awaitable[Any]], deadline: float) -> Any:
+        """Await fn(timeout) with the scheduler's retry policy; timeout is the time left before the deadline"""
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._stats["deadline_exceeded"] += 1
+                raise DeadlineExceededError("Deadline exceeded before the request could be sent")
+            try:
+                result = await fn(remaining)
+            except Exception as e:
+                delay = self.scheduler.retry_delay(e, attempt, deadline)
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            self.scheduler.breaker.record_success()
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        scheduler = self.scheduler.stats()
+        granted = self._stats["granted"]
+        return {
+            "queue_depth": self._waiting,
+            "active": self._active,
+            "max_concurrency": self.max_concurrency,
+            "granted": granted,
+            "avg_wait_s": round(self._wait_total / granted, 3) if granted else 0.0,
+            "max_wait_s": round(self._wait_max, 3),
+            "shed": self._stats["shed"],
+            "retries": scheduler["retries"],
+            "gave_up": scheduler["gave_up"],
+            "deadline_exceeded": scheduler["deadline_exceeded"] + self._stats["deadline_exceeded"],
+            "rejected_open_circuit": self._stats["rejected_open_circuit"],
+            "circuit": scheduler["circuit"],
+        }
+
+
+def response_json(response: Any) -> Dict[str, Any]:
+    data = response.model_dump(mode="json", exclude_none=True)
+    # output_text is a computed property on the SDK response model
+    data["output_text"] = response.output_text
+    return data
+
+
+def _sse(data: Dict[str, Any]) -> bytes:
+    return f"event: {data['type']}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+class ChatBackend:
+    """Turn handling for the HTTP app: request building, gating and the upstream call"""
+
+    def __init__(self, client, gate: AsyncGate, vector_store_id: Optional[str] = None,
+                 turn_timeout: float = config.TURN_DEADLINE_SECONDS):
+        self.client = client
+        self.gate = gate
+        self.vector_store_id = vector_store_id
+        self.turn_timeout = turn_timeout
+        self.stats = Counter()
+
+    def turn_request(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """The app's prepared request, or one built like a first turn or a previous_response_id follow-up"""
+        if body.get("request"):
+            return body["request"]
+        return assistant.build_request(
+            body["question"], body.get("vector_store_id") or self.vector_store_id,
+            previous_response_id=body.get("previous_response_id"),
+            model=body.get("model") or config.DEFAULT_MODEL,
+            verbosity=body.get("verbosity") or assistant.DEFAULT_VERBOSITY,
+            history=body.get("history"),
+        )
+
+    async def open(self, body: Dict[str, Any]):
+        """Gate and send one turn; returns (response or upstream stream, release) with the slot held"""
+        request = self.turn_request(body)
+        stream = bool(body.get("stream"))
+        timeout = min(float(body.get("timeout") or self.turn_timeout), self.turn_timeout)
+        deadline = time.monotonic() + timeout
+        await self.gate.acquire(deadline)
+        released = False
+
+        async def release(upstream=None):
+            nonlocal released
+            if released:
+                return
+            released = True
+            self.gate.release()
+            if upstream is not None:
+                await upstream.aclose()
+
+        try:
+            if stream:
+                # Raw: status errors still raise (and are retried) before the body is read
+                raw = await self.gate.call(
+                    lambda remaining: self.client.responses.with_raw_response.create(
+                        stream=True, timeout=remaining, **request),
+                    deadline,
+                )
+                result = raw.http_response
+            else:
+                result = await self.gate.call(
+                    lambda remaining: self.client.responses.create(timeout=remaining, **request), deadline
+                )
+        except BaseException:
+            await release()
+            raise
+        self.stats["streamed" if stream else "completed"] += 1
+        return result, release
+
+    async def events(self, upstream, release) -> AsyncIterator[bytes]:
+        """Relay the upstream SSE body unchanged; a failure mid-stream becomes an error event"""
+        try:
+            async for chunk in upstream.aiter_raw():
+                yield chunk
+        except Exception as e:
+            self.stats["stream_errors"] += 1
+            # Blank lines first: the failure may have cut an event in half
+            yield b"\n\n" + _sse({"type": "error", "message": f"{type(e).__name__}: {e}"})
+        finally:
+            await release(upstream)
+
+
+def create_app(backend: ChatBackend):
+    """Starlette app (Starlette and uvicorn ship with Streamlit)"""
+    from starlette.applications import Starlette
+    from starlette.background import BackgroundTask
+    from starlette.responses import JSONResponse, StreamingResponse
+    from starlette.routing import Route
+
+    def error(status: int, e: BaseException) -> JSONResponse:
+        body = {"error": {"message": str(e), "type": type(e).__name__}}
+        if isinstance(e, UpstreamUnavailableError):
+            body["error"]["user_message"] = e.user_message
+        return JSONResponse(body, status_code=status)
+
+    async def turns(request):
+        try:
+            body = await request.json()
+            if not isinstance(body, dict) or not (body.get("request") or body.get("question")):
+                raise ValueError("Expected a JSON object with a request or a question")
+        except ValueError as e:
+            # Malformed body (json.JSONDecodeError is a ValueError): the caller's fault, not upstream's
+            return error(400, e)
+        try:
+            result, release = await backend.open(body)
+        except UpstreamUnavailableError as e:
+            return error(503, e)
+        except Exception as e:
+            # Upstream rejected the request (e.g. 400): pass its status through
+            return error(getattr(e, "status_code", None) or 502, e)
+        if not body.get("stream"):
+            await release()
+            return JSONResponse(response_json(result))
+        # The background task also runs when the client disconnects mid-stream, so the slot is always returned
+        return StreamingResponse(backend.events(result, release), media_type="text/event-stream",
+                                 background=BackgroundTask(release, result))
+
+    async def stats(request):
+        return JSONResponse({**backend.stats, "gate": backend.gate.stats()})
+
+    async def health(request):
+        return JSONResponse({"ok": True, "circuit": backend.gate.scheduler.breaker.state})
+
+    return Starlette(routes=[
+        Route("/v1/turns", turns, methods=["POST"]),
+        Route("/v1/stats", stats),
+        Route("/healthz", health),
+    ])
+
+
+def build_backend(base_url: Optional[str] = None, max_concurrency: int = config.CHAT_BACKEND_MAX_CONCURRENCY,
+                  max_queue: int = config.CHAT_BACKEND_MAX_QUEUE,
+                  requests_per_minute: float = config.REQUESTS_PER_MINUTE) -> ChatBackend:
+    import httpx
+    from openai import AsyncOpenAI
+
+    client = AsyncOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"), base_url=base_url, max_retries=0,
+        http_client=httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_concurrency,
+                                max_keepalive_connections=max_concurrency,
+                                keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY),
+            timeout=httpx.Timeout(config.HTTP_TIMEOUT, connect=10.0),
+        ),
+    )
+    scheduler = RequestScheduler(
+        max_concurrency=max_concurrency,
+        requests_per_minute=requests_per_minute,
+        burst=config.RATE_LIMIT_BURST,
+        max_retries=config.MAX_RETRIES,
+        base_delay=config.RETRY_BASE_DELAY,
+        max_delay=config.RETRY_MAX_DELAY,
+        breaker=CircuitBreaker(config.CIRCUIT_FAILURE_THRESHOLD, config.CIRCUIT_RESET_SECONDS),
+    )
+    return ChatBackend(client, AsyncGate(scheduler, max_concurrency, max_queue), os.getenv("VECTOR_STORE_ID"))
+
+
+class BackendClient:
+    """Stands in for the OpenAI client in the app: responses.create goes to the chat backend
+
+    Responses and stream events come back as cassette Records, which read
+    like the SDK models (resp.output_text, event.type, event.delta,
+    event.response.usage.input_tokens). Backend rejections raise
+    UpstreamUnavailableError, which the app's scheduler does not retry.
+    """
+
+    def __init__(self, base_url: str, http_client=None):
+        import httpx
+
+        self.base_url = base_url.rstrip("/")
+        self._http = http_client or httpx.Client(timeout=httpx.Timeout(config.HTTP_TIMEOUT, connect=5.0))
+        self.responses = self
+
+    def create(self, stream: bool = False, timeout: Optional[float] = None, **request) -> Any:
+        import httpx
+
+        body = {"request": request, "stream": stream, "timeout": timeout}
+        http_timeout = httpx.Timeout(None if timeout is None else timeout + 5.0, connect=5.0)
+        try:
+            response = self._http.send(
+                self._http.build_request("POST", f"{self.base_url}/v1/turns", json=body, timeout=http_timeout),
+                stream=stream,
+            )
+        except httpx.TransportError as e:
+            raise UpstreamUnavailableError(f"Chat backend unreachable: {e}") from e
+        if response.status_code != 200:
+            response.read()
+            response.close()
+            self._raise(response)
+        if not stream:
+            return Record(response.json())
+        return BackendStream(response)
+
+    def health(self) -> Dict[str, Any]:
+        return self._http.get(f"{self.base_url}/healthz").json()
+
+    @staticmethod
+    def _raise(response) -> None:
+        try:
+            error = response.json()["error"]
+        except (ValueError, KeyError):
+            error = {"message": response.text}
+        if response.status_code == 503:
+            if "user_message" in error:
+                raise UpstreamUnavailableError(error["message"], error["user_message"])
+            raise UpstreamUnavailableError(error["message"])
+        raise RuntimeError(f"Chat backend error {response.status_code}: {error['message']}")
+
+
+class BackendStream:
+    """Stream events of one turn from the chat backend
+
+    Like the SDK's Stream it exposes the HTTP response, so the app can
+    disconnect it mid-read when a turn is cancelled (assistant.close_on_cancel).
+    """
+
+    def __init__(self, response):
+        self.response = response
+        self._events = self._read()
+
+    def __iter__(self) -> Iterator[Record]:
+        return self._events
+
+    def close(self) -> None:
+        self._events.close()
+        self.response.close()
+
+    def _read(self) -> Iterator[Record]:
+        deltas = []
+        try:
+            for line in self.response.iter_lines():
+                if not line.startswith("data: "):
+                    continue
+                event = json.loads(line[len("data: "):])
+                if event["type"] == "response.output_text.delta":
+                    deltas.append(event["delta"])
+                elif event["type"] == "response.completed":
+                    # output_text is computed by the SDK, not sent upstream
+                    event["response"].setdefault("output_text", "".join(deltas))
+                yield Record(event)
+        finally:
+            # Closing early (the user stopped reading) disconnects, which cancels the upstream call
+            self.response.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Async chat backend for the Streamlit app")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--base-url", help="Upstream API base URL, e.g. a local mock")
+    parser.add_argument("--max-concurrency", type=int, default=config.CHAT_BACKEND_MAX_CONCURRENCY)
+    parser.add_argument("--max-queue", type=int, default=config.CHAT_BACKEND_MAX_QUEUE)
+    parser.add_argument("--requests-per-minute", type=float, default=config.REQUESTS_PER_MINUTE)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    backend = build_backend(args.base_url, args.max_concurrency, args.max_queue, args.requests_per_minute)
+    print(f"🛰️ Chat backend on http://{args.host}:{args.port} "
+          f"({args.max_concurrency} upstream slots, queue {args.max_queue})", flush=True)
+    uvicorn.run(create_app(backend), host=args.host, port=args.port, log_level="warning",
+                backlog=2048, timeout_keep_alive=30)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Bounded per-session chat history with spill to disk
+
+Each session keeps only its most recent messages in memory as compact
+__slots__ records. Older messages are written to a shared SQLite (WAL)
+store and read back a page at a time when the user scrolls up. The total
+kept per session, in memory and on disk, is capped at MAX_MESSAGES, and
+spilled rows are pruned after a retention period.
+"""
+
+import sqlite3
+import sys
+import threading
+import time
+import weakref
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class ChatMessage:
+    """One chat message; __slots__ keeps it to a few dozen bytes plus its text"""
+
+    __slots__ = ("seq", "role", "content", "created_at")
+
+    def __init__(self, seq: int, role: str, content: str, created_at: float):
+        self.seq = seq
+        self.role = role
+        self.content = content
+        self.created_at = created_at
+
+    def __repr__(self) -> str:
+        return f"ChatMessage({self.seq}, {self.role!r}, {self.content[:30]!r})"
+
+
+class HistoryStore:
+    """Process-wide SQLite table of spilled messages, keyed by (session, seq)"""
+
+    def __init__(self, path: Path, retention_seconds: float):
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chat_messages (
+                session_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (session_id, seq)
+            ) WITHOUT ROWID
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS chat_messages_created ON chat_messages (created_at)")
+        self._db.commit()
+        self.prune()
+
+    def append(self, session_id: str, message: ChatMessage) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO chat_messages VALUES (?, ?, ?, ?, ?)",
+                (session_id, message.seq, message.role, message.content, message.created_at),
+            )
+            self._db.commit()
+
+    def page(self, session_id: str, before_seq: int, limit: int) -> List[ChatMessage]:
+        """Up to limit messages older than before_seq, oldest first"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, role, content, created_at FROM chat_messages "
+                "WHERE session_id = ? AND seq < ? ORDER BY seq DESC LIMIT ?",
+                (session_id, before_seq, limit),
+            ).fetchall()
+        return [ChatMessage(*row) for row in reversed(rows)]
+
+    def drop_oldest(self, session_id: str, count: int) -> None:
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM chat_messages WHERE session_id = ? AND seq IN "
+                "(SELECT seq FROM chat_messages WHERE session_id = ? ORDER BY seq LIMIT ?)",
+                (session_id, session_id, count),
+            )
+            self._db.commit()
+
+    def delete_session(self, session_id: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM chat_messages WHERE session_id = ?", (session_id,))
+            self._db.commit()
+
+    def prune(self) -> int:
+        """Drop spilled messages past the retention period (sessions that are long gone)"""
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM chat_messages WHERE created_at < ?", (time.time() - self.retention_seconds,)
+            )
+            self._db.commit()
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            sessions, messages = self._db.execute(
+                "SELECT COUNT(DISTINCT session_id), COUNT(*) FROM chat_messages"
+            ).fetchone()
+        return {"spilled_sessions": sessions, "spilled_messages": messages}
+
+
+# Live histories, for process-wide resident memory gauges; sessions drop out when Streamlit discards them
+_live_histories: "weakref.WeakSet[ChatHistory]" = weakref.WeakSet()
+
+
+class ChatHistory:
+    """A session's messages: a bounded in-memory window over a spill store"""
+
+    def __init__(self, session_id: str, store: Optional[HistoryStore], window: int, max_messages: int):
+        self.session_id = session_id
+        self.store = store
+        self.max_messages = max_messages
+        self.window = min(window, max_messages)
+        self._resident: deque = deque()
+        self._spilled = 0
+        self._next_seq = 0
+        _live_histories.add(self)
+
+    def __len__(self) -> int:
+        return len(self._resident) + self._spilled
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __iter__(self) -> Iterator[ChatMessage]:
+        """Resident (most recent) messages, oldest first"""
+        return iter(self._resident)
+
+    def __getitem__(self, index: int) -> ChatMessage:
+        return self._resident[index]
+
+    @property
+    def spilled(self) -> int:
+        return self._spilled
+
+    def append(self, role: str, content: str) -> ChatMessage:
+        message = ChatMessage(self._next_seq, role, content, time.time())
+        self._next_seq += 1
+        self._resident.append(message)
+        if len(self._resident) > self.window:
+            oldest = self._resident.popleft()
+            if self.store is not None:
+                self.store.append(self.session_id, oldest)
+                self._spilled += 1
+        overflow = len(self) - self.max_messages
+        if overflow > 0:
+            self.store.drop_oldest(self.session_id, overflow)
+            self._spilled -= overflow
+        return message
+
+    def older(self, count: int) -> List[ChatMessage]:
+        """The count spilled messages just before the resident window, oldest first"""
+        if not self._spilled or count <= 0 or not self._resident:
+            return []
+        return self.store.page(self.session_id, self._resident[0].seq, count)
+
+    def clear(self) -> None:
+        self._resident.clear()
+        if self._spilled and self.store is not None:
+            self.store.delete_session(self.session_id)
+        self._spilled = 0
+
+    def resident_bytes(self) -> int:
+        """Approximate memory held by the in-memory window (records plus their text)"""
+        size = sys.getsizeof(self._resident)
+        for message in self._resident:
+            size += sys.getsizeof(message) + sys.getsizeof(message.content)
+        return size
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "resident_messages": len(self._resident),
+            "spilled_messages": self._spilled,
+            "resident_kb": round(self.resident_bytes() / 1024, 1),
+        }
+
+
+def live_stats() -> Dict[str, Any]:
+    """Resident history memory across all live sessions in this process"""
+    histories = list(_live_histories)
+    total = sum(history.resident_bytes() for history in histories)
+    return {
+        "sessions": len(histories),
+        "resident_kb_total": round(total / 1024, 1),
+        "resident_kb_per_session": round(total / 1024 / len(histories), 1) if histories else 0.0,
+    }
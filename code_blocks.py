@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Server-side highlighting of the code blocks in assistant answers
+
+Code answers are the largest messages. Each complete fenced block is
+replaced by ready-made HTML: highlighted by Pygments (escaped, with
+token classes styled in styles.css) and memoized by content in a bounded
+LRU, so a block is highlighted once per process however often the history
+reruns or a streamed answer repaints. The block is written as a single
+line (newlines inside <pre> become &#10;), so Streamlit's markdown parser
+keeps it as one raw HTML block even when the code has blank lines, and
+never highlights it again in the browser.
+
+The Copy button holds no code: COPY_SCRIPT, installed once per page,
+copies the text of the <pre> next to whichever button was clicked.
+"""
+
+import functools
+import html
+import re
+from typing import Optional
+
+import config
+
+# A complete fenced block: opening fence with optional info string, code, a closing line of the same fence
+FENCE = re.compile(
+    r"^(?P<indent>[ \t]*)(?P<fence>`{3,}|~{3,})[ \t]*(?P<info>[^\n`]*)\n"
+    r"(?P<code>.*?)"
+    r"^[ \t]*(?P=fence)[ \t]*$",
+    re.MULTILINE | re.DOTALL,
+)
+
+COPY_SCRIPT = """
+<script>
+(() => {
+  // Inside a components iframe (older Streamlit) the chat lives in the parent document
+  const doc = window.frameElement ? window.parent.document : document;
+  if (doc.tsaCodeCopy) return;
+  doc.tsaCodeCopy = true;
+  doc.addEventListener("click", (event) => {
+    const button = event.target.closest(".code-copy");
+    if (!button) return;
+    const code = button.closest(".code-block").querySelector("pre");
+    navigator.clipboard.writeText(code.innerText).then(() => {
+      button.textContent = "✅ Copied";
+      setTimeout(() => { button.textContent = "📋 Copy"; }, 1500);
+    });
+  });
+})();
+</script>
+"""
+
+
+def highlight(code: str, language: str = "") -> str:
+    """Escaped, highlighted <pre> for code; plain escaped text if Pygments or the language is unavailable"""
+    try:
+        from pygments import highlight as pygments_highlight
+        from pygments.formatters import HtmlFormatter
+        from pygments.lexers import get_lexer_by_name
+        from pygments.util import ClassNotFound
+    except ImportError:
+        return f'<pre class="highlight"><code>{html.escape(code)}</code></pre>'
+    try:
+        lexer = get_lexer_by_name(language or "text", stripnl=False)
+    except ClassNotFound:
+        lexer = get_lexer_by_name("text", stripnl=False)
+    body = pygments_highlight(code, lexer, HtmlFormatter(nowrap=True))
+    return f'<pre class="highlight"><code>{body.rstrip(chr(10))}</code></pre>'
+
+
+@functools.lru_cache(maxsize=config.CODE_RENDER_CACHE_SIZE)
+def code_block_html(code: str, language: str = "", filename: Optional[str] = None) -> str:
+    """One line of HTML for a code block with its label and Copy button, memoized by content"""
+    label = html.escape(filename or language or "code")
+    block = (
+        '<div class="code-block"><div class="code-header">'
+        f'<span class="code-label">{label}</span>'
+        '<button class="code-copy" type="button" title="Copy code">📋 Copy</button>'
+        f"</div>{highlight(code, language)}</div>"
+    )
+    # Blank lines would end the markdown HTML block, so the newlines are written as character references
+    return block.replace("\n", "&#10;")
+
+
+def _replace(match: re.Match) -> str:
+    indent = match.group("indent")
+    language = match.group("info").split(" ", 1)[0].strip().lower()
+    code = match.group("code")
+    if code.endswith("\n"):
+        code = code[:-1]
+    if indent:
+        # Fences indented inside a list item: the code lines carry the same indent
+        code = "\n".join(line[len(indent):] if line.startswith(indent) else line.lstrip()
+                         for line in code.split("\n"))
+    # A blank line after the block, so the text that follows is parsed as markdown again
+    return f"{indent}{code_block_html(code, language)}\n"
+
+
+def render_code_blocks(markdown: str) -> str:
+    """markdown with every complete fenced code block replaced by its highlighted HTML
+
+    An unclosed fence (a streamed answer still writing its code) is left as
+    it is until the closing fence arrives.
+    """
+    if "```" not in markdown and "~~~" not in markdown:
+        return markdown
+    return FENCE.sub(_replace, markdown)
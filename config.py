@@ -6,9 +6,14 @@ Configuration file for Time Series Course Assistant
 import os
 from pathlib import Path
 
+from dotenv import load_dotenv
+
 # Base directory
 BASE_DIR = Path(__file__).parent
 
+# Every setting below is read once, at import; .env fills in what the environment doesn't set
+load_dotenv(BASE_DIR / ".env")
+
 # Vector store configuration
 # Vector store ID is loaded from Streamlit secrets
 VECTOR_STORE_ID = None  # Will be loaded from secrets
@@ -30,9 +35,13 @@ PAGE_ICON = "🚀"
 LAYOUT = "wide"
 
 # Chat Configuration
-MAX_MESSAGES = 100  # Maximum messages to keep in history
+MAX_MESSAGES = int(os.getenv("MAX_MESSAGES", "100"))  # Maximum messages kept per session (memory + disk)
 CHAT_INPUT_PLACEHOLDER = "Ask me anything about Time Series!"
 
+# Streaming Configuration
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "true").lower() == "true"
+STREAM_RENDER_INTERVAL = 0.05  # Seconds between incremental bubble updates
+
 # Styling
 PRIMARY_COLOR = "#1f77b4"
 SECONDARY_COLOR = "#9c27b0"
@@ -51,3 +60,139 @@ EXAMPLE_QUESTIONS = [
     "What's the difference between MAE and RMSE?",
     "How do we add exogenous variables to SARIMAX?"
 ]
+
+# HTTP connection pool for the model API (shared by every session in the process)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = 120.0  # Seconds an idle pooled connection stays open
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "120"))
+WARM_CONNECTIONS = os.getenv("WARM_CONNECTIONS", "true").lower() == "true"
+
+# Static assets
+STYLES_PATH = BASE_DIR / "styles.css"
+
+# Answer cache for first-turn questions
+CACHE_DIR = Path(os.getenv("CACHE_DIR", BASE_DIR / ".cache"))
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_PATH = CACHE_DIR / "answers.sqlite3"
+ANSWER_CACHE_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(24 * 3600)))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2000"))
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.9"))
+
+# Show cache/latency counters in the sidebar
+SHOW_PERF_STATS = os.getenv("SHOW_PERF_STATS", "false").lower() == "true"
+
+# Pre-warming of EXAMPLE_QUESTIONS into the answer cache
+PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "true").lower() == "true"
+PREWARM_MAX_WORKERS = int(os.getenv("PREWARM_MAX_WORKERS", "4"))
+PREWARM_REFRESH_SECONDS = int(os.getenv("PREWARM_REFRESH_SECONDS", str(6 * 3600)))  # Keep below the cache TTL
+
+# Conversation compaction (previous_response_id chains)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "12000"))  # Input tokens per turn before compacting; 0 disables
+CONTEXT_KEEP_TURNS = int(os.getenv("CONTEXT_KEEP_TURNS", "2"))  # Recent turns carried over verbatim
+CONTEXT_SUMMARY_CHARS = 1500  # Size cap for the summary of older turns
+
+# Retrieval backend: "hosted" (OpenAI file_search) or "local" (local_retrieval.py)
+RETRIEVAL_BACKEND = os.getenv("RETRIEVAL_BACKEND", "hosted").lower()
+COURSE_MATERIALS_DIR = Path(os.getenv("COURSE_MATERIALS_DIR", BASE_DIR / "course_materials"))
+LOCAL_INDEX_DIR = Path(os.getenv("LOCAL_INDEX_DIR", CACHE_DIR / "local_index"))
+LOCAL_RETRIEVAL_TOP_K = int(os.getenv("LOCAL_RETRIEVAL_TOP_K", "6"))
+EMBEDDING_DIM = 1024  # Hashed n-gram embedding width
+HYBRID_ALPHA = 0.5  # Weight of BM25 vs dense similarity
+STEM_BOOST = 0.3  # Bonus for files whose name stem the question mentions
+
+# Course-part shards (course_shards.py): questions routed to the parts or lecture file they are about. Hosted
+# file_search gets an attribute filter (the store must be synced by vector_store_sync.py, which tags each file
+# with its part); the local backend keeps one index per part and searches the routed ones in parallel
+SHARD_ROUTING_ENABLED = os.getenv("SHARD_ROUTING_ENABLED", "false").lower() == "true"
+SHARD_MAX_PARTS = int(os.getenv("SHARD_MAX_PARTS", "2"))  # A question touching more parts searches them all
+SHARD_SEARCH_WORKERS = int(os.getenv("SHARD_SEARCH_WORKERS", "4"))  # Local part indexes searched at once
+
+# Follow-ups answered from the previous turn's file_search results when a local check allows (hosted retrieval)
+RETRIEVAL_REUSE_ENABLED = os.getenv("RETRIEVAL_REUSE_ENABLED", "true").lower() == "true"
+RETRIEVAL_REUSE_MAX_TURNS = int(os.getenv("RETRIEVAL_REUSE_MAX_TURNS", "2"))  # Follow-ups in a row served by one search
+RETRIEVAL_REUSE_TTL_SECONDS = float(os.getenv("RETRIEVAL_REUSE_TTL_SECONDS", "900"))
+RETRIEVAL_REUSE_MIN_COVERAGE = float(os.getenv("RETRIEVAL_REUSE_MIN_COVERAGE", "0.6"))  # Share of the follow-up's terms the snippets must contain
+RETRIEVAL_REUSE_TOP_K = int(os.getenv("RETRIEVAL_REUSE_TOP_K", "6"))  # Cached snippets put in the prompt
+RETRIEVAL_REUSE_MAX_SESSIONS = int(os.getenv("RETRIEVAL_REUSE_MAX_SESSIONS", "5000"))
+
+# Optional asyncio chat backend (chat_backend.py); when set, the app sends model calls there instead of upstream
+CHAT_BACKEND_URL = os.getenv("CHAT_BACKEND_URL", "")
+CHAT_BACKEND_MAX_CONCURRENCY = int(os.getenv("CHAT_BACKEND_MAX_CONCURRENCY", "256"))  # Upstream calls in flight
+CHAT_BACKEND_MAX_QUEUE = int(os.getenv("CHAT_BACKEND_MAX_QUEUE", "1024"))  # Turns waiting for a slot before 503s
+
+# batch_eval.py: scripts run at once (their model calls still go through the scheduler's limits)
+BATCH_EVAL_WORKERS = int(os.getenv("BATCH_EVAL_WORKERS", "8"))
+
+# vector_store_sync.py: uploads in parallel and a manifest per store of what was uploaded
+VECTOR_STORE_SYNC_WORKERS = int(os.getenv("VECTOR_STORE_SYNC_WORKERS", "4"))
+VECTOR_STORE_MANIFEST_DIR = Path(os.getenv("VECTOR_STORE_MANIFEST_DIR", CACHE_DIR / "vector_store_sync"))
+
+# Share one upstream call between identical concurrent first-turn questions
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+
+# Request scheduler (all model calls): concurrency, rate limit, retries, breaker
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "16"))
+REQUESTS_PER_MINUTE = float(os.getenv("REQUESTS_PER_MINUTE", "500"))  # Match your API tier
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "20"))
+MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))
+RETRY_BASE_DELAY = 0.5  # Seconds; doubled per attempt with full jitter
+RETRY_MAX_DELAY = 20.0
+TURN_DEADLINE_SECONDS = float(os.getenv("TURN_DEADLINE_SECONDS", "90"))  # Whole turn: queueing, retries and streaming
+CIRCUIT_FAILURE_THRESHOLD = 5  # Consecutive upstream failures before failing fast
+CIRCUIT_RESET_SECONDS = 30.0
+
+# Model routing (per-request model/verbosity from local question features)
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "true").lower() == "true"
+ROUTER_PRIMARY_MODEL = os.getenv("ROUTER_PRIMARY_MODEL", DEFAULT_MODEL)
+ROUTER_FAST_MODEL = os.getenv("ROUTER_FAST_MODEL", DEFAULT_MODEL)  # Used when the primary breaches the SLO
+MODEL_LATENCY_SLO_SECONDS = float(os.getenv("MODEL_LATENCY_SLO_SECONDS", "20"))  # p95 per turn
+# Latency samples older than this are dropped, so a primary in fallback is tried again once its samples age out
+ROUTER_SAMPLE_MAX_AGE_SECONDS = float(os.getenv("ROUTER_SAMPLE_MAX_AGE_SECONDS", "300"))
+
+# Local instrumentation: Prometheus-style endpoint and rotating JSONL turn log
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))  # 0 disables the endpoint
+LOG_DIR = Path(os.getenv("LOG_DIR", BASE_DIR / "logs"))
+METRICS_LOG_PATH = LOG_DIR / "turns.jsonl"
+
+# Record/replay of model calls: "off", "record" or "replay" (no network needed)
+CASSETTE_MODE = os.getenv("CASSETTE_MODE", "off").lower()
+CASSETTE_PATH = Path(os.getenv("CASSETTE_PATH", CACHE_DIR / "cassettes" / "default.jsonl.gz"))
+CASSETTE_LATENCY = os.getenv("CASSETTE_LATENCY", "original").lower()  # "original" or "zero"
+
+# Chat history: recent messages stay in memory, older ones spill to SQLite
+HISTORY_WINDOW = int(os.getenv("HISTORY_WINDOW", "20"))  # Messages kept in memory per session
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "20"))  # Older messages loaded per "load earlier" click
+HISTORY_PATH = CACHE_DIR / "chat_history.sqlite3"
+HISTORY_RETENTION_SECONDS = int(os.getenv("HISTORY_RETENTION_SECONDS", str(24 * 3600)))
+
+# Chat rendering: memoized bubble HTML, history drawn in blocks of messages
+RENDER_CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", "4096"))  # Rendered messages/blocks kept per process
+RENDER_BLOCK_MIN_BYTES = int(os.getenv("RENDER_BLOCK_MIN_BYTES", "10000"))  # Streamlit's minCachedMessageSize
+CODE_RENDER_CACHE_SIZE = int(os.getenv("CODE_RENDER_CACHE_SIZE", "1024"))  # Highlighted code blocks kept per process
+
+# Speculative prefetch of the follow-up question each answer ends with (opt-in: costs extra tokens)
+SPECULATION_ENABLED = os.getenv("SPECULATION_ENABLED", "false").lower() == "true"
+SPECULATION_BUDGET_PER_SESSION = int(os.getenv("SPECULATION_BUDGET_PER_SESSION", "5"))  # Speculative calls per session
+SPECULATION_MAX_WORKERS = int(os.getenv("SPECULATION_MAX_WORKERS", "2"))
+SPECULATION_TTL_SECONDS = float(os.getenv("SPECULATION_TTL_SECONDS", "600"))
+SPECULATION_SIMILARITY = float(os.getenv("SPECULATION_SIMILARITY", "0.8"))  # Match threshold after normalization
+
+# System prompt: core plus only the course map sections a first question touches, instead of the whole
+# map. Off by default: the core alone is under the 1024-token minimum for upstream prompt caching, so
+# this only pays off when the cache is mostly cold (see benchmarks/prompt_benchmark.py)
+TOPIC_PROMPT_ENABLED = os.getenv("TOPIC_PROMPT_ENABLED", "false").lower() == "true"
+TOPIC_PROMPT_MAX_MODULES = int(os.getenv("TOPIC_PROMPT_MAX_MODULES", "3"))
+
+# Tracing: "buffered" times spans in-process and exports them in batches from a background thread, off the
+# turn's path; "langsmith" traces inline with @traceable and wrap_openai; "off" disables both
+TRACING_BACKEND = os.getenv("TRACING_BACKEND", "buffered")
+TRACE_SINK = os.getenv("TRACE_SINK", "auto")  # auto (LangSmith when configured, else file), langsmith, file
+TRACE_FILE = Path(os.getenv("TRACE_FILE", LOG_DIR / "traces.jsonl"))
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))  # Head sampling; errors and slow turns always kept
+TRACE_SLOW_SECONDS = float(os.getenv("TRACE_SLOW_SECONDS", "10"))
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "10000"))  # Traces held for export; oldest dropped when full
+TRACE_BATCH_SIZE = int(os.getenv("TRACE_BATCH_SIZE", "100"))  # Spans per export call
+TRACE_FLUSH_SECONDS = float(os.getenv("TRACE_FLUSH_SECONDS", "2"))
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Token-budgeted conversation manager
+
+Follow-ups are chained with previous_response_id, so the server-side context
+(system prompt, retrieved chunks, every answer) grows with each turn. The
+manager tracks per-turn usage and, once the latest turn's input tokens cross
+the budget, asks for a fresh chain seeded with a compact local summary of the
+older turns plus the last few turns verbatim.
+"""
+
+import re
+from dataclasses import dataclass, asdict
+from typing import Dict, Any, List, Optional, Tuple
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+@dataclass
+class TurnStats:
+    turn: int
+    chain: int
+    input_tokens: int
+    cached_tokens: int
+    output_tokens: int
+    latency_s: float
+    compacted: bool
+
+
+def _first_sentence(text: str, limit: int = 160) -> str:
+    text = " ".join(text.split())
+    sentence = _SENTENCE_END.split(text, maxsplit=1)[0]
+    return sentence if len(sentence) <= limit else sentence[:limit - 1] + "…"
+
+
+class ConversationManager:
+    """Per-session turn history, usage accounting and compaction policy"""
+
+    def __init__(self, token_budget: int, keep_turns: int = 2, summary_chars: int = 1500):
+        self.token_budget = token_budget
+        self.keep_turns = keep_turns
+        self.summary_chars = summary_chars
+        self.reset()
+
+    def reset(self) -> None:
+        self.turns: List[Tuple[str, str]] = []
+        self.stats: List[TurnStats] = []
+        self.chain = 1
+        self.chain_input_tokens = 0
+
+    @property
+    def depth(self) -> int:
+        """Number of completed turns in this conversation"""
+        return len(self.turns)
+
+    def needs_compaction(self) -> bool:
+        return self.token_budget > 0 and self.chain_input_tokens >= self.token_budget
+
+    def compacted_history(self) -> List[Dict[str, str]]:
+        """Seed messages for a fresh chain: summary of older turns + the last N turns"""
+        older = self.turns[:-self.keep_turns] if self.keep_turns else self.turns
+        recent = self.turns[-self.keep_turns:] if self.keep_turns else []
+
+        messages = []
+        if older:
+            lines, used = [], 0
+            # Most recent first so the budget keeps the freshest context
+            for question, answer in reversed(older):
+                line = f"- Q: {_first_sentence(question)} → A: {_first_sentence(answer)}"
+                if used + len(line) > self.summary_chars:
+                    break
+                lines.append(line)
+                used += len(line)
+            summary = "\n".join(reversed(lines))
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"})
+        for question, answer in recent:
+            messages.append({"role": "user", "content": question})
+            messages.append({"role": "assistant", "content": answer})
+        return messages
+
+    def record_turn(self, question: str, answer: str, usage: Optional[Any],
+                    latency_s: float, compacted: bool = False) -> TurnStats:
+        """Store a completed turn and its resp.usage numbers"""
+        if compacted:
+            self.chain += 1
+
+        input_tokens = getattr(usage, "input_tokens", 0) or 0
+        details = getattr(usage, "input_tokens_details", None)
+        stats = TurnStats(
+            turn=len(self.turns) + 1,
+            chain=self.chain,
+            input_tokens=input_tokens,
+            cached_tokens=getattr(details, "cached_tokens", 0) or 0,
+            output_tokens=getattr(usage, "output_tokens", 0) or 0,
+            latency_s=round(latency_s, 3),
+            compacted=compacted,
+        )
+        self.turns.append((question, answer))
+        self.stats.append(stats)
+        self.chain_input_tokens = input_tokens
+        return stats
+
+    def report(self) -> List[Dict[str, Any]]:
+        """Per-turn token and latency numbers, oldest first"""
+        return [asdict(stats) for stats in self.stats]
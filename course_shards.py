@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Course-part shards for retrieval and the local query router
+
+Every transcript and script belongs to one part of the course: the topic
+modules the course map is split into (prompt_topics), picked from the
+file's path, or "general" when none matches. vector_store_sync.py tags
+each file in the vector store with its part (next to its filename stem),
+and local_retrieval.py can build one index per part.
+
+The router sends a question only to the parts it is about: the parts its
+keywords hit, if there are at most max_parts of them, plus "general" (whose
+files could be about anything), otherwise (or when it hits none) every part. A question that names a lecture by its filename
+stem ("04_sarimax_exogenous", "the sarimax exogenous script") goes to that
+file alone. For the hosted file_search tool a route is an attribute
+filter on the one vector store; the local backend searches the routed
+part indexes in parallel and merges their results.
+"""
+
+import json
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import config
+from prompt_topics import TOPIC_MODULES, classify_topics
+
+GENERAL = "general"
+PARTS = [name for name, _, _ in TOPIC_MODULES] + [GENERAL]
+_WORD = re.compile(r"[a-z0-9]+")
+_store_routers: Dict[str, Optional["QueryRouter"]] = {}
+_store_routers_lock = threading.Lock()
+
+
+def part_of(rel_path: str) -> str:
+    """Course part of a file from its folders and name, e.g. 'Part 2/06_prophet_cv.py' -> 'prophet'"""
+    topics = classify_topics(" ".join(_WORD.findall(rel_path.lower())), 1)
+    return topics[0] if topics else GENERAL
+
+
+def stem_phrase(stem: str) -> str:
+    """A filename stem as words without its lecture number: '04_sarimax_exogenous' -> 'sarimax exogenous'"""
+    words = _WORD.findall(stem.lower())
+    while words and words[0].isdigit():
+        words.pop(0)
+    return " ".join(words)
+
+
+@dataclass
+class Route:
+    parts: List[str] = field(default_factory=list)  # Empty: every part
+    stems: List[str] = field(default_factory=list)  # Lecture files the question names
+
+    def filters(self) -> Optional[Dict[str, Any]]:
+        """file_search attribute filter for the route (None searches the whole store)"""
+        if self.stems:
+            clauses = [{"type": "eq", "key": "stem", "value": stem} for stem in self.stems]
+        elif self.parts:
+            clauses = [{"type": "eq", "key": "part", "value": part} for part in self.parts]
+        else:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"type": "or", "filters": clauses}
+
+
+class QueryRouter:
+    """Routes questions to course parts and lecture files; stems maps each known filename stem to its part"""
+
+    def __init__(self, stems: Dict[str, str], max_parts: int = config.SHARD_MAX_PARTS):
+        self.stems = stems
+        self.max_parts = max_parts
+        self._general = GENERAL in stems.values()
+        # Stems and their phrases match on whole words, and only when they are two words or more: "prophet"
+        # alone names a topic, not a file, and "arima" must not match inside "sarima"
+        self._names = {}
+        for stem in stems:
+            names = {" ".join(_WORD.findall(stem.lower())), stem_phrase(stem)}
+            self._names[stem] = [f" {name} " for name in names if " " in name]
+        self._lock = threading.Lock()
+        self._stats = Counter()
+
+    @classmethod
+    def from_paths(cls, rel_paths: Iterable[str], max_parts: int = config.SHARD_MAX_PARTS) -> "QueryRouter":
+        return cls({Path(rel_path).stem: part_of(rel_path) for rel_path in rel_paths}, max_parts)
+
+    def route(self, question: str) -> Route:
+        words = f" {' '.join(_WORD.findall(question.lower()))} "
+        named = [stem for stem, names in self._names.items() if any(name in words for name in names)]
+        if named:
+            route = Route(sorted({self.stems[stem] for stem in named}), named)
+        else:
+            parts = classify_topics(question, len(TOPIC_MODULES))
+            if len(parts) > self.max_parts:
+                parts = []
+            elif parts and self._general:
+                parts.append(GENERAL)
+            route = Route(parts)
+        with self._lock:
+            self._stats["stem" if route.stems else "parts" if route.parts else "all"] += 1
+        return route
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            routed = sum(self._stats.values())
+            return {
+                "stems": len(self.stems),
+                "routed_to_file": self._stats["stem"],
+                "routed_to_parts": self._stats["parts"],
+                "searched_all": self._stats["all"],
+                "narrowed_rate": round((routed - self._stats["all"]) / routed, 3) if routed else 0.0,
+            }
+
+
+def store_router(vector_store_id: str, manifest_dir: Path = config.VECTOR_STORE_MANIFEST_DIR) -> Optional[QueryRouter]:
+    """Router for a vector store synced by vector_store_sync.py, read once from its manifest
+
+    None when there is no manifest or some file in it has no part tag yet:
+    filtering on part would then silently skip those files.
+    """
+    with _store_routers_lock:
+        if vector_store_id not in _store_routers:
+            _store_routers[vector_store_id] = _load_store_router(vector_store_id, Path(manifest_dir))
+        return _store_routers[vector_store_id]
+
+
+def _load_store_router(vector_store_id: str, manifest_dir: Path) -> Optional[QueryRouter]:
+    path = manifest_dir / f"{vector_store_id}.json"
+    try:
+        files = json.loads(path.read_text(encoding="utf-8")).get("files", {})
+    except (OSError, ValueError):
+        print(f"⚠️ Shard routing off: no sync manifest for {vector_store_id} in {manifest_dir}")
+        return None
+    if not files or any("part" not in entry for entry in files.values()):
+        print(f"⚠️ Shard routing off: run vector_store_sync.py to tag the files of {vector_store_id} with their part")
+        return None
+    return QueryRouter({Path(rel_path).stem: entry["part"] for rel_path, entry in files.items()})
+
+
+def search_filters(question: str, vector_store_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    """file_search filter routing question to its parts of vector_store_id, or None to search it all"""
+    router = store_router(vector_store_id) if vector_store_id else None
+    return router.route(question).filters() if router is not None else None
+
+
+def routing_stats() -> Dict[str, Any]:
+    """Routing counts of every vector store's router, by store id"""
+    with _store_routers_lock:
+        routers = dict(_store_routers)
+    return {store: router.stats() if router is not None else {"enabled": False} for store, router in routers.items()}
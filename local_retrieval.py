@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Local hybrid retrieval over the course transcripts and .py files
+
+An alternative to the hosted file_search tool: course files are chunked into
+a BM25 index plus a hashed n-gram embedding matrix stored as a memory-mapped
+NumPy file. Queries are scored with both, boosted when they mention a
+lecture filename stem, and the top snippets are injected into the prompt.
+With --shards there is one index per course part (see course_shards.py)
+and each query searches only the parts it is routed to, in parallel.
+
+Build an index:
+    python local_retrieval.py build --materials course_materials
+    python local_retrieval.py build --materials course_materials --shards
+Query it:
+    python local_retrieval.py search "How is CV implemented for Prophet?"
+"""
+
+import argparse
+import hashlib
+import heapq
+import json
+import math
+import re
+import zlib
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Collection, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import config
+from course_shards import QueryRouter, part_of
+
+SUPPORTED_SUFFIXES = (".txt", ".srt", ".vtt", ".md", ".py")
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by do does for from how i in is it of on or show that the this to "
+    "we what when where which why with you your code lecture section part".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def chunk_text(text: str, max_chars: int = 1200, overlap_lines: int = 3) -> List[str]:
+    """Split on line boundaries into ~max_chars chunks with a few lines of overlap"""
+    lines = text.splitlines()
+    chunks, current, size = [], [], 0
+    for line in lines:
+        if current and size + len(line) > max_chars:
+            chunks.append("\n".join(current).strip())
+            current = current[-overlap_lines:] if overlap_lines else []
+            size = sum(len(kept) for kept in current)
+        current.append(line)
+        size += len(line)
+    if current:
+        chunks.append("\n".join(current).strip())
+    return [chunk for chunk in chunks if chunk]
+
+
+def embed(texts: Sequence[str], dim: int) -> np.ndarray:
+    """Hashed unigram+bigram vectors (sublinear tf, L2-normalized), shape (len(texts), dim)"""
+    matrix = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        tokens = tokenize(text)
+        features = Counter(tokens)
+        features.update(f"{a}_{b}" for a, b in zip(tokens, tokens[1:]))
+        for feature, count in features.items():
+            # crc32 rather than hash() so vectors are stable across processes
+            matrix[row, zlib.crc32(feature.encode("utf-8")) % dim] += 1.0 + math.log(count)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def stem_tokens(filename: str) -> frozenset:
+    """Distinctive words of a filename stem, e.g. '03_sarimax_exogenous.py' -> {03, sarimax, exogenous}"""
+    return frozenset(t for t in tokenize(Path(filename).stem) if t not in _STOPWORDS)
+
+
+@dataclass
+class SearchResult:
+    filename: str
+    snippet: str
+    score: float
+
+
+class LocalIndex:
+    """BM25 + dense hybrid index persisted under index_dir"""
+
+    def __init__(self, index_dir: Path, filenames: List[str], texts: List[str],
+                 embeddings: np.ndarray, fingerprint: str, k1: float = 1.5, b: float = 0.75):
+        self.index_dir = Path(index_dir)
+        self.filenames = filenames
+        self.texts = texts
+        self.embeddings = embeddings
+        self.fingerprint = fingerprint
+        self.k1 = k1
+        self.b = b
+        self._build_bm25()
+        self._stems = [stem_tokens(name) for name in filenames]
+        self._file_stems = [Path(name).stem for name in filenames]
+
+    @property
+    def scope(self) -> str:
+        """Identifies this index in cache keys, like a vector store ID"""
+        return f"local:{self.fingerprint}"
+
+    @classmethod
+    def build(cls, materials_dir: Path, index_dir: Path, dim: int = config.EMBEDDING_DIM,
+              paths: Optional[Sequence[Path]] = None) -> "LocalIndex":
+        """Chunk and embed every supported file under materials_dir (or just paths)"""
+        materials_dir, index_dir = Path(materials_dir), Path(index_dir)
+        filenames, texts = [], []
+        digest = hashlib.sha256()
+        if paths is None:
+            paths = course_files(materials_dir)
+        for path in sorted(paths):
+            content = path.read_text(encoding="utf-8", errors="ignore")
+            digest.update(path.name.encode("utf-8"))
+            digest.update(content.encode("utf-8"))
+            for chunk in chunk_text(content):
+                filenames.append(path.name)
+                texts.append(chunk)
+
+        index_dir.mkdir(parents=True, exist_ok=True)
+        np.save(index_dir / "embeddings.npy", embed(texts, dim))
+        with open(index_dir / "chunks.jsonl", "w", encoding="utf-8") as f:
+            for filename, text in zip(filenames, texts):
+                f.write(json.dumps({"filename": filename, "text": text}) + "\n")
+        fingerprint = digest.hexdigest()[:16]
+        (index_dir / "manifest.json").write_text(
+            json.dumps({"fingerprint": fingerprint, "dim": dim, "chunks": len(texts)}), encoding="utf-8"
+        )
+        return cls.load(index_dir)
+
+    @classmethod
+    def load(cls, index_dir: Path) -> "LocalIndex":
+        """Open an existing index; the embedding matrix is memory-mapped, not read into RAM"""
+        index_dir = Path(index_dir)
+        manifest = json.loads((index_dir / "manifest.json").read_text(encoding="utf-8"))
+        filenames, texts = [], []
+        with open(index_dir / "chunks.jsonl", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                filenames.append(record["filename"])
+                texts.append(record["text"])
+        embeddings = np.load(index_dir / "embeddings.npy", mmap_mode="r")
+        return cls(index_dir, filenames, texts, embeddings, manifest["fingerprint"])
+
+    def _build_bm25(self) -> None:
+        self._postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        lengths = np.zeros(len(self.texts), dtype=np.float32)
+        for doc, text in enumerate(self.texts):
+            tokens = tokenize(text)
+            lengths[doc] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                self._postings[term].append((doc, tf))
+        self._length_norm = self.k1 * (1 - self.b + self.b * lengths / max(float(lengths.mean()), 1.0)) \
+            if len(self.texts) else lengths
+        n_docs = len(self.texts)
+        self._idf = {
+            term: math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self._postings.items()
+        }
+
+    def _bm25_scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(len(self.texts), dtype=np.float32)
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for doc, tf in self._postings[term]:
+                scores[doc] += idf * tf * (self.k1 + 1) / (tf + self._length_norm[doc])
+        return scores
+
+    def _stem_boost(self, query: str) -> np.ndarray:
+        """Fraction of a file's stem words that the query mentions"""
+        query_tokens = set(tokenize(query))
+        return np.fromiter(
+            (len(stem & query_tokens) / len(stem) if stem else 0.0 for stem in self._stems),
+            dtype=np.float32, count=len(self._stems),
+        )
+
+    def search(self, query: str, k: int = config.LOCAL_RETRIEVAL_TOP_K) -> List[SearchResult]:
+        return self.search_batch([query], k)[0]
+
+    def search_batch(self, queries: Sequence[str], k: int = config.LOCAL_RETRIEVAL_TOP_K,
+                     alpha: float = config.HYBRID_ALPHA,
+                     stem_boost: float = config.STEM_BOOST,
+                     stems: Optional[Collection[str]] = None) -> List[List[SearchResult]]:
+        """Top-k hybrid search for several queries with one dense matrix product
+
+        stems restricts the results to files with those filename stems.
+        """
+        if not self.texts:
+            return [[] for _ in queries]
+        dense = embed(queries, self.embeddings.shape[1]) @ np.asarray(self.embeddings).T
+        allowed = None
+        if stems is not None:
+            allowed = np.fromiter((stem in stems for stem in self._file_stems), dtype=bool,
+                                  count=len(self._file_stems))
+        results = []
+        for row, query in enumerate(queries):
+            lexical = self._bm25_scores(query)
+            top = float(lexical.max())
+            if top > 0:
+                lexical /= top
+            scores = alpha * lexical + (1 - alpha) * np.clip(dense[row], 0.0, None)
+            scores += stem_boost * self._stem_boost(query)
+            if allowed is not None:
+                scores[~allowed] = 0.0
+            count = min(k, len(scores))
+            best = np.argpartition(-scores, count - 1)[:count]
+            best = best[np.argsort(-scores[best])]
+            results.append([
+                SearchResult(self.filenames[doc], self.texts[doc], float(scores[doc]))
+                for doc in best if scores[doc] > 0
+            ])
+        return results
+
+    def context_for(self, query: str, k: int = config.LOCAL_RETRIEVAL_TOP_K) -> str:
+        """Prompt block with the top-k snippets for a question"""
+        return format_context(self.search(query, k))
+
+
+class ShardedIndex:
+    """One LocalIndex per course part; a query searches the parts it is routed to, in parallel
+
+    The parts' results are merged by score. Each part normalizes its BM25
+    scores on its own best match, so scores from different parts are only
+    roughly comparable; with routing a query rarely spans more than two.
+    """
+
+    def __init__(self, index_dir: Path, shards: Dict[str, LocalIndex], router: QueryRouter,
+                 max_workers: int = config.SHARD_SEARCH_WORKERS):
+        self.index_dir = Path(index_dir)
+        self.shards = shards
+        self.router = router
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="shard-search")
+
+    @property
+    def scope(self) -> str:
+        digest = hashlib.sha256("".join(f"{part}:{index.fingerprint}" for part, index in sorted(self.shards.items()))
+                                .encode("utf-8"))
+        return f"local-shards:{digest.hexdigest()[:16]}"
+
+    @classmethod
+    def build(cls, materials_dir: Path, index_dir: Path, dim: int = config.EMBEDDING_DIM) -> "ShardedIndex":
+        """A LocalIndex under index_dir/<part> for the files of each course part"""
+        materials_dir, index_dir = Path(materials_dir), Path(index_dir)
+        by_part: Dict[str, List[Path]] = defaultdict(list)
+        for path in course_files(materials_dir):
+            by_part[part_of(path.relative_to(materials_dir).as_posix())].append(path)
+        for part, paths in by_part.items():
+            LocalIndex.build(materials_dir, index_dir / part, dim, paths)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        (index_dir / "shards.json").write_text(json.dumps({"parts": sorted(by_part)}), encoding="utf-8")
+        return cls.load(index_dir)
+
+    @classmethod
+    def load(cls, index_dir: Path) -> "ShardedIndex":
+        index_dir = Path(index_dir)
+        parts = json.loads((index_dir / "shards.json").read_text(encoding="utf-8"))["parts"]
+        shards = {part: LocalIndex.load(index_dir / part) for part in parts}
+        stems = {Path(filename).stem: part for part, index in shards.items() for filename in index.filenames}
+        return cls(index_dir, shards, QueryRouter(stems))
+
+    def search(self, query: str, k: int = config.LOCAL_RETRIEVAL_TOP_K) -> List[SearchResult]:
+        route = self.router.route(query)
+        parts = [part for part in route.parts if part in self.shards] or list(self.shards)
+        stems = set(route.stems) or None
+        if len(parts) == 1:
+            return self.shards[parts[0]].search_batch([query], k, stems=stems)[0]
+        per_part = self._pool.map(lambda part: self.shards[part].search_batch([query], k, stems=stems)[0], parts)
+        return heapq.nlargest(k, (result for results in per_part for result in results),
+                              key=lambda result: result.score)
+
+    def search_batch(self, queries: Sequence[str], k: int = config.LOCAL_RETRIEVAL_TOP_K) -> List[List[SearchResult]]:
+        return [self.search(query, k) for query in queries]
+
+    def context_for(self, query: str, k: int = config.LOCAL_RETRIEVAL_TOP_K) -> str:
+        return format_context(self.search(query, k))
+
+
+def course_files(materials_dir: Path) -> List[Path]:
+    return sorted(p for p in Path(materials_dir).rglob("*") if p.suffix.lower() in SUPPORTED_SUFFIXES)
+
+
+def format_context(results: List[SearchResult]) -> str:
+    """Render retrieved snippets as a prompt block with filenames for citation"""
+    if not results:
+        return "Course excerpts: no matching course files were found."
+    blocks = [f"[{result.filename}]\n{result.snippet}" for result in results]
+    return "Course excerpts (retrieved from the course files):\n\n" + "\n\n---\n\n".join(blocks)
+
+
+def load_or_build(index_dir: Path, materials_dir: Optional[Path], sharded: bool = config.SHARD_ROUTING_ENABLED):
+    """Open the index (one per course part when sharded), building it from materials_dir on first use"""
+    index_cls, index_dir = (ShardedIndex, Path(index_dir) / "shards") if sharded else (LocalIndex, Path(index_dir))
+    if (index_dir / ("shards.json" if sharded else "manifest.json")).exists():
+        return index_cls.load(index_dir)
+    if materials_dir is None or not Path(materials_dir).is_dir():
+        raise FileNotFoundError(
+            f"No local index in {index_dir} and no course materials directory to build one from"
+        )
+    return index_cls.build(materials_dir, index_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the local course retrieval index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Index every transcript and script in a directory")
+    build.add_argument("--materials", type=Path, default=config.COURSE_MATERIALS_DIR)
+    build.add_argument("--index-dir", type=Path, default=config.LOCAL_INDEX_DIR)
+    build.add_argument("--shards", action="store_true", help="One index per course part")
+    search = sub.add_parser("search", help="Run a query against an existing index")
+    search.add_argument("query")
+    search.add_argument("--index-dir", type=Path, default=config.LOCAL_INDEX_DIR)
+    search.add_argument("--shards", action="store_true", help="Search the per-part indexes")
+    search.add_argument("-k", type=int, default=config.LOCAL_RETRIEVAL_TOP_K)
+    args = parser.parse_args()
+
+    if args.command == "build" and args.shards:
+        index = ShardedIndex.build(args.materials, args.index_dir / "shards")
+        sizes = ", ".join(f"{part} {len(shard.texts)}" for part, shard in sorted(index.shards.items()))
+        print(f"✅ Indexed chunks per course part into {index.index_dir}: {sizes}")
+    elif args.command == "build":
+        index = LocalIndex.build(args.materials, args.index_dir)
+        print(f"✅ Indexed {len(index.texts)} chunks from {len(set(index.filenames))} files into {args.index_dir}")
+    else:
+        index = ShardedIndex.load(args.index_dir / "shards") if args.shards else LocalIndex.load(args.index_dir)
+        for result in index.search(args.query, args.k):
+            print(f"{result.score:.3f}  {result.filename}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+In-process latency instrumentation for Time Series Course Assistant
+
+Times each stage of a turn (queueing, upstream call, time to first token,
+rendering, the whole Streamlit rerun) into fixed-bucket histograms, counts
+tokens from resp.usage, and exposes everything as Prometheus text on a
+local HTTP endpoint plus a rotating JSONL log of per-turn records.
+"""
+
+import json
+import logging
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+_METRIC_NAME = re.compile(r"[^a-zA-Z0-9_]")
+
+
+class Histogram:
+    """Cumulative-bucket histogram plus a rolling window for quick percentiles"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, window: int = 1000):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+        self.recent.append(value)
+
+    def percentile(self, pct: float) -> float:
+        ordered = sorted(self.recent)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class MetricsRegistry:
+    """Stage histograms, counters and gauge collectors for one process"""
+
+    def __init__(self, namespace: str = "tsa", log_path: Optional[Path] = None,
+                 log_max_bytes: int = 10 * 1024 * 1024, log_backups: int = 5):
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._collectors: List[Tuple[str, Callable[[], Dict[str, Any]]]] = []
+        self._logger = None
+        if log_path is not None:
+            Path(log_path).parent.mkdir(parents=True, exist_ok=True)
+            self._logger = logging.getLogger(f"{namespace}.turns")
+            self._logger.propagate = False
+            self._logger.setLevel(logging.INFO)
+            if not self._logger.handlers:
+                handler = RotatingFileHandler(log_path, maxBytes=log_max_bytes, backupCount=log_backups,
+                                              encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                self._logger.addHandler(handler)
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """Record one duration for a stage"""
+        with self._lock:
+            self._histograms.setdefault(stage, Histogram()).observe(seconds)
+
+    @contextmanager
+    def timer(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def register_collector(self, prefix: str, collect: Callable[[], Dict[str, Any]]) -> None:
+        """Export numeric values of collect() (e.g. a component's stats()) as gauges"""
+        self._collectors.append((prefix, collect))
+
+    def log_turn(self, record: Dict[str, Any]) -> None:
+        """Append one per-turn record to the rotating JSONL log"""
+        if self._logger is not None:
+            self._logger.info(json.dumps({"ts": time.time(), **record}, default=str))
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """p50/p95/count per stage, for display"""
+        with self._lock:
+            return {
+                stage: {
+                    "count": hist.count,
+                    "p50_s": round(hist.percentile(50), 4),
+                    "p95_s": round(hist.percentile(95), 4),
+                }
+                for stage, hist in sorted(self._histograms.items())
+            }
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format"""
+        ns = self.namespace
+        lines = [f"# TYPE {ns}_stage_seconds histogram"]
+        with self._lock:
+            for stage, hist in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, count in zip(hist.buckets, hist.counts):
+                    cumulative += count
+                    lines.append(f'{ns}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{ns}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {hist.count}')
+                lines.append(f'{ns}_stage_seconds_sum{{stage="{stage}"}} {hist.sum:.6f}')
+                lines.append(f'{ns}_stage_seconds_count{{stage="{stage}"}} {hist.count}')
+
+            declared = set()
+            for (name, labels), value in sorted(self._counters.items()):
+                metric = f"{ns}_{name}_total"
+                if metric not in declared:
+                    lines.append(f"# TYPE {metric} counter")
+                    declared.add(metric)
+                label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+                lines.append(f"{metric}{{{label_text}}} {value}" if label_text else f"{metric} {value}")
+
+        for prefix, collect in self._collectors:
+            try:
+                values = collect()
+            except Exception:
+                continue
+            for key, value in _flatten(values):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                metric = _METRIC_NAME.sub("_", f"{ns}_{prefix}_{key}")
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, host: str, port: int) -> Optional[ThreadingHTTPServer]:
+        """Serve /metrics from a daemon thread; returns None if the port is taken"""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            server = ThreadingHTTPServer((host, port), Handler)
+        except OSError as e:
+            print(f"⚠️ Metrics endpoint not started on {host}:{port}: {e}")
+            return None
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        print(f"📊 Metrics available at http://{host}:{port}/metrics")
+        return server
+
+
+def _flatten(values: Dict[str, Any], prefix: str = ""):
+    for key, value in values.items():
+        name = f"{prefix}_{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            yield from _flatten(value, name)
+        else:
+            yield name, value
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Latency-aware model and verbosity routing
+
+Picks the model and verbosity for each turn from cheap local features:
+question length, detected intent ("show the code", "X vs Y", "what is")
+and conversation depth. Short definitional questions go to the fast model,
+long multi-part questions get medium verbosity, everything else keeps the
+primary model at low verbosity. When the primary model's observed p95
+latency exceeds the SLO, requests fall back to the fast model (or, if that
+is the same model, to low verbosity). Latency samples expire after
+max_sample_age_s: a primary that gets no traffic while in fallback runs out
+of samples and is tried again, and recent samples decide whether it stays.
+Decisions and per-model latency and token stats are kept in-process.
+"""
+
+import re
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+INTENT_PATTERNS = [
+    ("code", re.compile(r"\bcode\b|\bsnippet\b|\bimplement|\bscript\b|\bin python\b|\bsyntax\b", re.I)),
+    ("compare", re.compile(r"\bvs\.?\b|\bversus\b|\bdifference\b|\bcompare\b|\bwhen (to|should)\b|\bpros\b", re.I)),
+    ("definition", re.compile(r"^\s*(what is|what's|what are|define|meaning of)\b", re.I)),
+]
+
+
+def detect_intent(question: str) -> str:
+    for intent, pattern in INTENT_PATTERNS:
+        if pattern.search(question):
+            return intent
+    return "general"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+@dataclass
+class RouteDecision:
+    model: str
+    verbosity: str
+    intent: str
+    reason: str
+
+
+class ModelRouter:
+    """Per-request model/verbosity choice plus rolling per-model latency stats"""
+
+    def __init__(self, primary_model: str, fast_model: str, latency_slo_s: float,
+                 window: int = 200, min_samples: int = 20, max_sample_age_s: float = 300.0):
+        self.primary_model = primary_model
+        self.fast_model = fast_model
+        self.latency_slo_s = latency_slo_s
+        self.min_samples = min_samples
+        self.max_sample_age_s = max_sample_age_s
+        self._window = window
+        self._latencies: Dict[str, deque] = {}
+        self._tokens: Dict[str, Counter] = {}
+        self._decisions = Counter()
+        self._lock = threading.Lock()
+
+    def route(self, question: str, depth: int = 0, allow_fallback: bool = True) -> RouteDecision:
+        """Choose model and verbosity for one turn"""
+        intent = detect_intent(question)
+        words = len(question.split())
+
+        # Short definitional questions don't need the primary model
+        if intent == "definition" or (intent == "general" and words <= 6 and depth == 0):
+            model, reason = self.fast_model, "simple_question"
+        else:
+            model, reason = self.primary_model, intent
+
+        # Low verbosity keeps answers scannable; long multi-part questions get more room
+        verbosity = "low"
+        if words > 40 and depth < 4:
+            verbosity, reason = "medium", "long_question"
+
+        if allow_fallback and model == self.primary_model and self.slo_breached(self.primary_model):
+            if self.fast_model != self.primary_model:
+                model, reason = self.fast_model, "slo_fallback"
+            else:
+                verbosity, reason = "low", "slo_fallback"
+
+        decision = RouteDecision(model=model, verbosity=verbosity, intent=intent, reason=reason)
+        with self._lock:
+            self._decisions[(model, verbosity, reason)] += 1
+        return decision
+
+    def observe(self, model: str, latency_s: float, usage: Optional[Any] = None) -> None:
+        """Record one upstream call's latency and token usage"""
+        with self._lock:
+            self._latencies.setdefault(model, deque(maxlen=self._window)).append((time.monotonic(), latency_s))
+            tokens = self._tokens.setdefault(model, Counter())
+            tokens["calls"] += 1
+            tokens["input_tokens"] += getattr(usage, "input_tokens", 0) or 0
+            tokens["output_tokens"] += getattr(usage, "output_tokens", 0) or 0
+
+    def p95(self, model: str) -> Optional[float]:
+        with self._lock:
+            samples = self._recent(model)
+        return percentile(samples, 95) if len(samples) >= self.min_samples else None
+
+    def _recent(self, model: str) -> List[float]:
+        """Latencies of model younger than max_sample_age_s; older ones are dropped (caller holds the lock)"""
+        samples = self._latencies.get(model)
+        if not samples:
+            return []
+        cutoff = time.monotonic() - self.max_sample_age_s
+        while samples and samples[0][0] < cutoff:
+            samples.popleft()
+        return [latency for _, latency in samples]
+
+    def slo_breached(self, model: str) -> bool:
+        p95 = self.p95(model)
+        return p95 is not None and p95 > self.latency_slo_s
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            models = {}
+            for model in self._latencies:
+                samples = self._recent(model)
+                tokens = self._tokens[model]
+                calls = tokens["calls"] or 1
+                models[model] = {
+                    "calls": tokens["calls"],
+                    "p50_s": round(percentile(samples, 50), 3) if samples else None,
+                    "p95_s": round(percentile(samples, 95), 3) if samples else None,
+                    "avg_input_tokens": round(tokens["input_tokens"] / calls),
+                    "avg_output_tokens": round(tokens["output_tokens"] / calls),
+                }
+            decisions = {"/".join(key): count for key, count in self._decisions.most_common()}
+        return {"slo_s": self.latency_slo_s, "models": models, "decisions": decisions}
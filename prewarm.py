@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Background pre-warming of the sidebar example questions
+
+Answers every question in config.EXAMPLE_QUESTIONS with the same request
+shape as a live first turn (assistant.answer_first_turn), stores the results
+in the shared answer cache and refreshes them on a schedule, so clicking an
+example (or typing it) is served instantly.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+
+import assistant
+from answer_cache import AnswerCache
+
+
+class ExampleQuestionPrewarmer:
+    """Periodically answers a fixed list of questions into the answer cache"""
+
+    def __init__(self, client, cache: AnswerCache, questions: List[str], vector_store_id: str,
+                 model: str, verbosity: str, max_workers: int = 4, refresh_seconds: float = 6 * 3600,
+                 retriever=None, scheduler=None, router=None):
+        self.client = client
+        self.cache = cache
+        self.questions = list(questions)
+        self.vector_store_id = vector_store_id
+        self.model = model
+        self.verbosity = verbosity
+        self.max_workers = max_workers
+        self.refresh_seconds = refresh_seconds
+        self.retriever = retriever
+        self.scheduler = scheduler
+        # With a router, each question gets the model/verbosity a live first turn would
+        self.router = router
+        # Cache scope: the hosted vector store, or the local index it stands in for
+        self.scope = retriever.scope if retriever is not None else vector_store_id
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._status: Dict[str, Any] = {"runs": 0, "warmed": 0, "failed": 0, "last_run": None}
+
+    def start(self) -> None:
+        """Warm once now (in the background) and then every refresh_seconds"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="example-prewarm", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def status(self) -> Dict[str, Any]:
+        return dict(self._status, questions=len(self.questions), scope=self.scope)
+
+    def warm_all(self, force: bool = True) -> int:
+        """Answer all questions with a bounded pool; returns how many were stored"""
+        pending = [
+            q for q in self.questions
+            if force or not self.cache.contains(q, *self._route(q), self.scope, max_age=self.refresh_seconds)
+        ]
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="prewarm") as pool:
+            results = list(pool.map(self._warm_one, pending))
+
+        warmed = sum(results)
+        self._status["runs"] += 1
+        self._status["warmed"] += warmed
+        self._status["failed"] += len(results) - warmed
+        self._status["last_run"] = time.strftime("%Y-%m-%d %H:%M:%S")
+        return warmed
+
+    def _route(self, question: str):
+        """(model, cache verbosity) for a question"""
+        if self.router is None:
+            model, verbosity = self.model, self.verbosity
+        else:
+            decision = self.router.route(question, depth=0, allow_fallback=False)
+            model, verbosity = decision.model, decision.verbosity
+        return model, verbosity if assistant.supports_verbosity(model) else "default"
+
+    def _warm_one(self, question: str) -> bool:
+        if self._stop.is_set():
+            return False
+        model, verbosity = self._route(question)
+        try:
+            answer, response_id = assistant.answer_first_turn(
+                self.client, question, self.vector_store_id, model=model, verbosity=verbosity,
+                retriever=self.retriever, scheduler=self.scheduler,
+            )
+        except Exception as e:
+            print(f"⚠️ Pre-warm failed for {question!r}: {e}")
+            return False
+        self.cache.put(question, answer, response_id, model, verbosity, self.scope)
+        return True
+
+    def _loop(self) -> None:
+        # Entries still fresh from a previous process are reused on the first pass
+        self.warm_all(force=False)
+        while not self._stop.wait(self.refresh_seconds):
+            self.warm_all(force=True)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Topic modules for the system prompt
+
+The course map used to travel in full with every new conversation. It is
+now split into one module per course part, and a keyword classifier picks
+the modules a question touches (at most a few, chosen by number of
+keyword hits). The selected modules go in their own system message after
+the fixed prefix, in course order, so the core prompt stays byte-identical
+across conversations and upstream prompt caching keeps matching it.
+"""
+
+import re
+from typing import List, Sequence, Tuple
+
+# (name, keywords, course map section) in course order
+TOPIC_MODULES: List[Tuple[str, re.Pattern, str]] = [
+    (
+        "analysis",
+        re.compile(r"\beda\b|\bexploratory\b|\bp?acf\b|autocorrelation|decompos|visuali[sz]|\bplot|"
+                   r"time index|datetime|resampl|rolling|\blags?\b|seasonality|\btrend", re.I),
+        "- Part 1: Time Series Analysis (EDA, time index, data manipulation, visualization, decomposition, "
+        "ACF/PACF, role play, \"useful functions\" script, section recap, pitfalls case study).",
+    ),
+    (
+        "exponential_smoothing",
+        re.compile(r"\bses\b|\bdes\b|\btes\b|holt|winters|smoothing|air ?miles|\bmae\b|\brmse\b|\bmape\b|"
+                   r"\bmetrics?\b", re.I),
+        "- Exponential Smoothing & Holt-Winters: SES, DES, TES; train/test split; metrics (MAE, RMSE, MAPE); "
+        "daily data; \"predicting the future\"; pros/cons; capstone \"Air miles\".",
+    ),
+    (
+        "arima",
+        re.compile(r"s?arima|\bsarimax\b|stationar|\bar\b|\bma\b|\baic\b|\bbic\b|exogenous|differencing", re.I),
+        "- ARIMA/SARIMA/SARIMAX: stationarity, AR/MA/ARIMA, AIC/BIC, SARIMA, SARIMAX with exogenous "
+        "regressors, CV, parameter tuning (setup, results), future prediction setup, Q&A highlight on future "
+        "data; pros/cons.",
+    ),
+    (
+        "prophet",
+        re.compile(r"prophet|holiday|changepoint|structural", re.I),
+        "- Part 2: Modern Forecasting — Prophet: structural TS, holidays/regressors, CV, metrics, fixing "
+        "anomalies, feature engineering, tuning, forecasting, visualization; pros/cons; capstone challenges.",
+    ),
+    (
+        "lstm",
+        re.compile(r"lstm|\brnn\b|recurrent|deep learning|neural|\bm4\b", re.I),
+        "- Part 3: Deep Learning — LSTM: RNN/LSTM basics, data prep/time covariates/scaling, model/training, "
+        "CV, parameter grids/tuning rounds, multi-series (M4), visualization of results, forecasting; "
+        "pros/cons.",
+    ),
+    (
+        "tft",
+        re.compile(r"\btft\b|temporal fusion|transformer|covariate|interpretab", re.I),
+        "- TFT (Temporal Fusion Transformers): covariates (past/future/static), scaling, model params, "
+        "training/CV, tuning, forecasting/interpretability, key takeaways; multi-series TFT capstone.",
+    ),
+    (
+        "nbeats",
+        re.compile(r"n-?beats", re.I),
+        "- N-BEATS: architecture, series/covariates/scaling, params, model training, CV, tuning and best "
+        "params, forecasting; pros/cons and learnings.",
+    ),
+    (
+        "chronos",
+        re.compile(r"chronos|gen ?ai|foundation model|pre-?trained|\bllm", re.I),
+        "- GenAI for Time Series: Amazon Chronos — setup, params, model, CV, tuning, visualization; "
+        "pros/cons and learnings.",
+    ),
+    (
+        "tsmixer",
+        re.compile(r"ts ?mixer|mixer", re.I),
+        "- Google TSMixer: setup, data processing, params, model, CV, tuning, forecasting, key learnings.",
+    ),
+    (
+        "silverkite",
+        re.compile(r"silverkite|greykite|linkedin", re.I),
+        "- LinkedIn Silverkite: model components (growth, seasonality, changepoints, regressors/lagged), CV, "
+        "tuning, visualization; Prophet vs Silverkite notes; warnings/changes.",
+    ),
+    (
+        "capstones",
+        re.compile(r"capstone|project|challenge|pipeline|automat|multiple series|multi-series", re.I),
+        "- Capstones: Holt-Winters (Air miles), Prophet, Multiple Series with TFT, Automated TS Forecasting "
+        "pipeline.",
+    ),
+    (
+        "appendix",
+        re.compile(r"pandas|dataframe|refresher|\bpython basics\b|\bloops?\b|\bdict|\blabs?\b|read_csv|"
+                   r"\bcleaning\b", re.I),
+        "- Appendix: Python & Pandas refreshers (I/O, cleaning, manipulation, analysis, viz) and fundamentals "
+        "(types, ops, loops, dicts, functions), plus challenges and labs.",
+    ),
+]
+
+COURSE_MAP = "\n".join(section for _, _, section in TOPIC_MODULES)
+
+
+def classify_topics(text: str, max_topics: int) -> List[str]:
+    """Course topics the text mentions, most keyword hits first, at most max_topics"""
+    scored = []
+    for order, (name, pattern, _) in enumerate(TOPIC_MODULES):
+        hits = len(pattern.findall(text))
+        if hits:
+            scored.append((-hits, order, name))
+    return [name for _, _, name in sorted(scored)[:max_topics]]
+
+
+def topic_context(topics: Sequence[str]) -> str:
+    """The course map sections for topics, always in course order (same topics, same bytes)"""
+    selected = set(topics)
+    sections = [section for name, _, section in TOPIC_MODULES if name in selected]
+    return "Relevant part of the course map:\n" + "\n".join(sections) if sections else ""
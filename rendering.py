@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Chat bubble HTML for Time Series Course Assistant
+
+Bubbles are built once per distinct message and memoized process-wide, so a
+rerun only builds HTML for messages it hasn't seen. The history is grouped
+into blocks that close once they reach RENDER_BLOCK_MIN_BYTES (Streamlit's
+minCachedMessageSize): a closed block's HTML never changes, which makes it a
+cache hit here and lets Streamlit send it to the browser by hash only.
+Fenced code in assistant answers is highlighted on the way in (see
+code_blocks.py).
+"""
+
+import functools
+import re
+from typing import List, Optional, Sequence, Tuple
+
+import config
+from code_blocks import render_code_blocks
+
+# Raw and escaped <br> variants, stripped from user messages in one pass
+BR_TAGS = re.compile(r"<br ?/?>|&lt;br ?/?&gt;")
+
+
+def build_message_html(role: str, content: str, timestamp: Optional[str] = None) -> str:
+    """Build the styled HTML bubble for a chat message"""
+    stamp = f' <small style="color:#666;">{timestamp}</small>' if timestamp else ''
+    if role == "user":
+        safe = BR_TAGS.sub("", content).strip()
+        return f"""
+        <div class="user-message">
+            <strong>You</strong>{stamp}
+            <br>{safe}
+        </div>
+        """
+    # Assistant content can include HTML formatting—keep as is; code blocks arrive highlighted
+    return f"""
+        <div class="assistant-message">
+            <strong>Assistant</strong>{stamp}
+            <br>{render_code_blocks(content)}
+        </div>
+        """
+
+
+@functools.lru_cache(maxsize=config.RENDER_CACHE_SIZE)
+def render_message_html(role: str, content: str, timestamp: Optional[str] = None) -> str:
+    """Memoized bubble HTML, shared by every session (keyed by the message text's hash)"""
+    return build_message_html(role, content, timestamp)
+
+
+@functools.lru_cache(maxsize=config.RENDER_CACHE_SIZE)
+def render_block_html(messages: Tuple[Tuple[str, str], ...]) -> str:
+    """One HTML element for a closed block of (role, content) messages"""
+    return "".join(render_message_html(role, content) for role, content in messages)
+
+
+def history_html(messages: Sequence, timestamp: Optional[str] = None) -> List[str]:
+    """HTML elements for a history of ChatMessage records: one per block, then the newest message alone"""
+    if not messages:
+        return []
+    *earlier, last = messages
+    elements, block, block_bytes = [], [], 0
+    for message in earlier:
+        block.append((message.role, message.content))
+        block_bytes += len(render_message_html(message.role, message.content))
+        # Boundaries depend only on the messages before them, so they don't move as the chat grows
+        if block_bytes >= config.RENDER_BLOCK_MIN_BYTES:
+            elements.append(render_block_html(tuple(block)))
+            block, block_bytes = [], 0
+    if block:
+        elements.append(render_block_html(tuple(block)))
+    elements.append(render_message_html(last.role, last.content, timestamp))
+    return elements
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Process-wide shared resources for Time Series Course Assistant
+
+Streamlit re-executes the app script on every interaction. Everything in this
+module is built once per process with st.cache_resource and shared by all
+sessions: environment settings, the pooled OpenAI client and static assets.
+The OpenAI SDK, httpx and LangSmith are imported inside the getters that need
+them, so a cold start paints the page before paying for them.
+"""
+
+import atexit
+import importlib.util
+import os
+import threading
+from typing import Dict, Any, List, Optional
+
+import streamlit as st
+
+import config
+import course_shards
+from answer_cache import AnswerCache
+from cassette import wrap_client
+from chat_history import HistoryStore, live_stats
+from metrics import MetricsRegistry
+from model_router import ModelRouter
+from prewarm import ExampleQuestionPrewarmer
+from retrieval_cache import RetrievalCache
+from scheduler import CircuitBreaker, RequestScheduler
+from single_flight import SingleFlight
+from speculation import Speculator
+from tracing import FileSink, LangSmithSink, Tracer, configure as configure_tracing
+
+# Checked without importing: langsmith pulls in its client and the OpenAI SDK
+LANGSMITH_AVAILABLE = importlib.util.find_spec("langsmith") is not None
+
+
+@st.cache_resource(show_spinner=False)
+def get_settings() -> Dict[str, Any]:
+    """API key, vector store and tracing configuration (.env is loaded by config), once per process"""
+    from tracing_config import get_langsmith_config, is_langsmith_configured
+
+    langsmith_config = get_langsmith_config()
+    return {
+        "openai_api_key": os.getenv("OPENAI_API_KEY"),
+        "vector_store_id": os.getenv("VECTOR_STORE_ID"),
+        "langsmith": langsmith_config,
+        "langsmith_enabled": LANGSMITH_AVAILABLE and is_langsmith_configured(),
+    }
+
+
+def _build_http_client():
+    """Keep-alive connection pool shared by every session"""
+    import httpx
+
+    return httpx.Client(
+        limits=httpx.Limits(
+            max_connections=config.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(config.HTTP_TIMEOUT, connect=10.0),
+    )
+
+
+def warm_client(client) -> None:
+    """Open pooled connections ahead of the first question (TLS handshake, DNS)"""
+    def _warm():
+        try:
+            client.models.list()
+        except Exception as e:
+            print(f"⚠️ Connection warm-up failed: {e}")
+
+    threading.Thread(target=_warm, name="openai-warmup", daemon=True).start()
+
+
+@st.cache_resource(show_spinner=False)
+def get_client():
+    """Single pooled OpenAI client per process, wrapped for tracing when configured
+
+    Built on first use (the first question, or the prewarmer after the first paint).
+    With CHAT_BACKEND_URL set, this is a thin client for chat_backend.py, which
+    holds the upstream connection pool, rate limit and retries instead.
+    """
+    if config.CHAT_BACKEND_URL:
+        from chat_backend import BackendClient
+
+        print(f"🛰️ Sending model calls to the chat backend at {config.CHAT_BACKEND_URL}")
+        client = BackendClient(config.CHAT_BACKEND_URL, _build_http_client())
+        return wrap_client(client, config.CASSETTE_MODE, config.CASSETTE_PATH, config.CASSETTE_LATENCY)
+
+    from openai import OpenAI
+
+    settings = get_settings()
+    # Retries are handled by the request scheduler, not the SDK
+    api_key = settings["openai_api_key"]
+    if config.CASSETTE_MODE == "replay" and not api_key:
+        api_key = "sk-replay"  # Replay never reaches the network
+    client = OpenAI(api_key=api_key, http_client=_build_http_client(), max_retries=0)
+
+    if settings["langsmith_enabled"] and config.TRACING_BACKEND == "langsmith":
+        from langsmith.wrappers import wrap_openai
+
+        # Wrap the client for automatic tracing
+        client = wrap_openai(client)
+        print("✅ LangSmith tracing enabled for OpenAI client")
+    elif config.TRACING_BACKEND != "langsmith":
+        pass  # See get_tracer
+    elif LANGSMITH_AVAILABLE:
+        print("⚠️ LangSmith available but not configured - check environment variables")
+    else:
+        print("ℹ️ LangSmith not available - using regular OpenAI client")
+
+    # Outermost, so replayed calls skip the network and the tracing wrapper alike
+    client = wrap_client(client, config.CASSETTE_MODE, config.CASSETTE_PATH, config.CASSETTE_LATENCY)
+
+    if config.WARM_CONNECTIONS and config.CASSETTE_MODE != "replay":
+        warm_client(client)
+    return client
+
+
+@st.cache_resource(show_spinner=False)
+def get_tracer() -> Optional[Tracer]:
+    """Background-exported span tracer (TRACING_BACKEND=buffered), installed for tracing.span()"""
+    if config.TRACING_BACKEND != "buffered":
+        return None
+    settings = get_settings()
+    sink_name = config.TRACE_SINK
+    if sink_name == "auto":
+        sink_name = "langsmith" if settings["langsmith_enabled"] else "file"
+    if sink_name == "langsmith":
+        langsmith_config = settings["langsmith"]
+
+        def make_client():
+            from langsmith import Client
+
+            # We batch ourselves, so the client's own background batching is off
+            return Client(api_url=langsmith_config["endpoint"], api_key=langsmith_config["api_key"],
+                          auto_batch_tracing=False)
+
+        sink = LangSmithSink(make_client, langsmith_config["project"], langsmith_config["tags"])
+        print(f"✅ Tracing: buffered export to LangSmith project {langsmith_config['project']}")
+    else:
+        sink = FileSink(config.TRACE_FILE)
+        print(f"ℹ️ Tracing: buffered export to {config.TRACE_FILE}")
+    tracer = Tracer(
+        sink,
+        sample_rate=config.TRACE_SAMPLE_RATE,
+        slow_seconds=config.TRACE_SLOW_SECONDS,
+        buffer_size=config.TRACE_BUFFER_SIZE,
+        batch_size=config.TRACE_BATCH_SIZE,
+        flush_seconds=config.TRACE_FLUSH_SECONDS,
+    )
+    configure_tracing(tracer)
+    atexit.register(tracer.close)
+    return tracer
+
+
+@st.cache_resource(show_spinner=False)
+def get_css() -> str:
+    """Custom CSS block, read from disk once per process"""
+    return f"<style>\n{config.STYLES_PATH.read_text(encoding='utf-8')}\n</style>"
+
+
+@st.cache_resource(show_spinner=False)
+def get_answer_cache() -> AnswerCache:
+    """Persistent first-turn answer cache shared by all sessions"""
+    return AnswerCache(
+        config.ANSWER_CACHE_PATH,
+        ttl_seconds=config.ANSWER_CACHE_TTL_SECONDS,
+        max_entries=config.ANSWER_CACHE_MAX_ENTRIES,
+        similarity_threshold=config.ANSWER_CACHE_SIMILARITY,
+    )
+
+
+# Prewarmers for superseded vector stores / models are stopped when replaced
+_prewarmers: List[ExampleQuestionPrewarmer] = []
+
+
+@st.cache_resource(show_spinner=False)
+def get_scheduler() -> RequestScheduler:
+    """Process-wide gateway every model call goes through"""
+    return RequestScheduler(
+        max_concurrency=config.MAX_CONCURRENT_REQUESTS,
+        requests_per_minute=config.REQUESTS_PER_MINUTE,
+        burst=config.RATE_LIMIT_BURST,
+        max_retries=config.MAX_RETRIES,
+        base_delay=config.RETRY_BASE_DELAY,
+        max_delay=config.RETRY_MAX_DELAY,
+        breaker=CircuitBreaker(config.CIRCUIT_FAILURE_THRESHOLD, config.CIRCUIT_RESET_SECONDS),
+        on_wait=lambda waited: get_metrics().observe("queue_wait", waited),
+    )
+
+
+def get_call_scheduler() -> Optional[RequestScheduler]:
+    """The scheduler model calls go through, or None for a thin client (CHAT_BACKEND_URL)
+
+    The chat backend already queues, rate-limits and retries every call, so
+    a second local gate would only add waiting and retry a retried call.
+    """
+    return None if config.CHAT_BACKEND_URL else get_scheduler()
+
+
+@st.cache_resource(show_spinner=False)
+def get_router() -> ModelRouter:
+    """Process-wide model router; latency stats are shared by all sessions"""
+    for model in (config.ROUTER_PRIMARY_MODEL, config.ROUTER_FAST_MODEL):
+        if model not in config.AVAILABLE_MODELS:
+            print(f"⚠️ Routed model {model!r} is not listed in AVAILABLE_MODELS")
+    return ModelRouter(
+        primary_model=config.ROUTER_PRIMARY_MODEL,
+        fast_model=config.ROUTER_FAST_MODEL,
+        latency_slo_s=config.MODEL_LATENCY_SLO_SECONDS,
+        max_sample_age_s=config.ROUTER_SAMPLE_MAX_AGE_SECONDS,
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def get_history_store() -> HistoryStore:
+    """Spill store for chat messages that fall out of each session's in-memory window"""
+    return HistoryStore(config.HISTORY_PATH, config.HISTORY_RETENTION_SECONDS)
+
+
+@st.cache_resource(show_spinner=False)
+def get_speculator() -> Speculator:
+    """Background answers for the follow-up questions answers suggest (opt-in)"""
+    return Speculator(
+        max_workers=config.SPECULATION_MAX_WORKERS,
+        ttl_seconds=config.SPECULATION_TTL_SECONDS,
+        similarity_threshold=config.SPECULATION_SIMILARITY,
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def get_retrieval_cache() -> RetrievalCache:
+    """Each session's last file_search results, for follow-ups that can be answered from them"""
+    return RetrievalCache(
+        max_sessions=config.RETRIEVAL_REUSE_MAX_SESSIONS,
+        max_reuses=config.RETRIEVAL_REUSE_MAX_TURNS,
+        ttl_seconds=config.RETRIEVAL_REUSE_TTL_SECONDS,
+        min_coverage=config.RETRIEVAL_REUSE_MIN_COVERAGE,
+        top_k=config.RETRIEVAL_REUSE_TOP_K,
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def get_single_flight() -> SingleFlight:
+    """Process-wide registry of in-flight first-turn requests"""
+    return SingleFlight()
+
+
+@st.cache_resource(show_spinner=False)
+def get_local_index():
+    """Local BM25 + embedding index (one per course part with SHARD_ROUTING_ENABLED), built on first use"""
+    from local_retrieval import load_or_build
+    return load_or_build(config.LOCAL_INDEX_DIR, config.COURSE_MATERIALS_DIR)
+
+
+def get_retriever():
+    """Local retrieval index when RETRIEVAL_BACKEND=local, else None (hosted file_search)"""
+    return get_local_index() if config.RETRIEVAL_BACKEND == "local" else None
+
+
+@st.cache_resource(show_spinner=False)
+def get_prewarmer(scope: str, model: str, verbosity: str) -> ExampleQuestionPrewarmer:
+    """Background job answering EXAMPLE_QUESTIONS; one per retrieval scope/model/verbosity"""
+    for previous in _prewarmers:
+        previous.stop()
+    _prewarmers.clear()
+
+    retriever = get_retriever()
+    prewarmer = ExampleQuestionPrewarmer(
+        get_client(),
+        get_answer_cache(),
+        config.EXAMPLE_QUESTIONS,
+        None if retriever is not None else scope,
+        model=model,
+        verbosity=verbosity,
+        max_workers=config.PREWARM_MAX_WORKERS,
+        refresh_seconds=config.PREWARM_REFRESH_SECONDS,
+        retriever=retriever,
+        scheduler=get_call_scheduler(),
+        router=get_router() if config.ROUTER_ENABLED else None,
+    )
+    prewarmer.start()
+    _prewarmers.append(prewarmer)
+    return prewarmer
+
+
+@st.cache_resource(show_spinner=False)
+def get_metrics() -> MetricsRegistry:
+    """Stage histograms, token counters and the local /metrics endpoint"""
+    metrics = MetricsRegistry(log_path=config.METRICS_LOG_PATH if config.METRICS_ENABLED else None)
+    metrics.register_collector("answer_cache", get_answer_cache().stats)
+    scheduler = get_call_scheduler()
+    if scheduler is not None:
+        # A thin client has no local scheduler; the chat backend reports its own
+        metrics.register_collector("scheduler", scheduler.stats)
+    metrics.register_collector("single_flight", get_single_flight().stats)
+    metrics.register_collector("router", get_router().stats)
+    metrics.register_collector("speculation", get_speculator().stats)
+    metrics.register_collector("retrieval_cache", get_retrieval_cache().stats)
+    if config.SHARD_ROUTING_ENABLED:
+        retriever = get_retriever()
+        metrics.register_collector("shard_routing", retriever.router.stats if retriever is not None
+                                   else course_shards.routing_stats)
+    tracer = get_tracer()
+    if tracer is not None:
+        metrics.register_collector("tracing", tracer.stats)
+    metrics.register_collector("chat_history", lambda: {**live_stats(), **get_history_store().stats()})
+    if config.METRICS_ENABLED and config.METRICS_PORT:
+        metrics.serve(config.METRICS_HOST, config.METRICS_PORT)
+    return metrics
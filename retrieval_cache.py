@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Reuse of file_search results across follow-up turns
+
+Follow-ups such as "show the code for that" or "explain line 3" are about
+what the previous turn retrieved, yet with the file_search tool attached
+every turn searches the vector store again before its first token. The
+results of each searched turn (file ids, filenames, scores and snippets,
+returned because the request asks for include=["file_search_call.results"])
+are kept per session. Before the next turn a local check decides whether
+the question can be answered from them: it must refer back to the last
+answer, bring no course topic, lecture file or other terms of its own that
+the snippets don't cover, and the results must not have been reused too
+often or for too long. On a hit the snippets travel in the prompt instead
+of the tool, the way local retrieval does; otherwise the turn searches.
+
+Hit rate, misses by reason and the latency of follow-ups with and without
+a search (hence an estimate of the time reuse saved) are in stats().
+"""
+
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, List, Optional
+
+from prompt_topics import TOPIC_MODULES, classify_topics
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can could did do does for from give how i if in is it its me my of on or our "
+    "please show so tell than the then to us was we what when where which why will with would you your "
+    "about also any just more some want need see get let use using used make "
+    "lecture section video script notebook file".split()  # Lecture references are checked against the filenames
+)
+# Words that point back at the last answer rather than at new course content
+_BACK_REFERENCE = frozenset(
+    "that this it those these them there above previous earlier same again last line lines snippet code "
+    "example answer yes yeah yep sure ok okay".split()
+)
+# Words about the form of the answer or the reasoning behind it, not its subject
+_PRESENTATION = frozenset(
+    "explain elaborate expand clarify summarize summarise summary simpler simply shorter short detail "
+    "details bullet bullets point points step steps walk through break down rewrite briefly one two three "
+    "four five choose chose chosen pick picked decide decided".split()
+)
+# "lecture 3", "the sarimax_cv script", "03_prophet_cv.py"
+_FILE_REFERENCE = re.compile(
+    r"\b([\w-]+)\.(?:py|ipynb|txt|srt|vtt|md)\b|\b(?:lecture|section|video|script|notebook|file)\s+([\w-]+)",
+    re.I,
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def stem_words(text: str) -> FrozenSet[str]:
+    """Words of a filename or lecture reference, numbers without leading zeros ("03" matches "lecture 3")"""
+    return frozenset(token.lstrip("0") or "0" if token.isdigit() else token for token in tokenize(text))
+
+
+@dataclass
+class RetrievedChunk:
+    file_id: str
+    filename: str
+    score: float
+    snippet: str
+
+
+def search_results(response) -> List[RetrievedChunk]:
+    """The file_search results carried by a response, best first (empty if it didn't search)"""
+    chunks: Dict[tuple, RetrievedChunk] = {}
+    for item in getattr(response, "output", None) or []:
+        if getattr(item, "type", None) != "file_search_call":
+            continue
+        for result in getattr(item, "results", None) or []:
+            file_id = getattr(result, "file_id", None) or ""
+            snippet = getattr(result, "text", None) or ""
+            chunk = RetrievedChunk(file_id, getattr(result, "filename", None) or file_id,
+                                   float(getattr(result, "score", None) or 0.0), snippet)
+            # Several searches in one turn can return the same chunk
+            chunks.setdefault((file_id, snippet), chunk)
+    return sorted(chunks.values(), key=lambda chunk: -chunk.score)
+
+
+@dataclass
+class Retrieval:
+    """One searched turn's results, as kept for the session's follow-ups"""
+    question: str
+    chunks: List[RetrievedChunk]
+    vocabulary: FrozenSet[str] = field(repr=False, default=frozenset())
+    stems: FrozenSet[str] = field(repr=False, default=frozenset())
+    topics: FrozenSet[str] = field(repr=False, default=frozenset())
+    created_at: float = field(default_factory=time.monotonic)
+    reuses: int = 0
+
+
+class RetrievalCache:
+    """The last file_search results of each session, bounded to max_sessions (least recently used go first)"""
+
+    def __init__(self, max_sessions: int, max_reuses: int, ttl_seconds: float, min_coverage: float,
+                 top_k: int):
+        self.max_sessions = max_sessions
+        self.max_reuses = max_reuses
+        self.ttl_seconds = ttl_seconds
+        self.min_coverage = min_coverage
+        self.top_k = top_k
+        self._entries: "OrderedDict[str, Retrieval]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = Counter()
+        self._latency = {True: [0, 0.0], False: [0, 0.0]}  # Searched? -> [follow-up turns, seconds]
+
+    def store(self, session_id: str, question: str, chunks: List[RetrievedChunk]) -> None:
+        """Keep a searched turn's results; a search that found nothing drops the session's old ones"""
+        with self._lock:
+            if not chunks:
+                # The answer wasn't about the older results, so "that" no longer refers to them
+                self._entries.pop(session_id, None)
+                return
+            text = " ".join([question, *(chunk.filename for chunk in chunks), *(chunk.snippet for chunk in chunks)])
+            self._entries[session_id] = Retrieval(
+                question=question,
+                chunks=chunks,
+                vocabulary=frozenset(tokenize(text)),
+                stems=frozenset().union(*(stem_words(chunk.filename) for chunk in chunks)),
+                topics=frozenset(classify_topics(text, len(TOPIC_MODULES))),
+            )
+            self._entries.move_to_end(session_id)
+            self._stats["stored"] += 1
+            while len(self._entries) > self.max_sessions:
+                self._entries.popitem(last=False)
+
+    def lookup(self, session_id: str, question: str, record: bool = True) -> Optional[Retrieval]:
+        """The session's last results if question can be answered from them, else None (search again)
+
+        With record=False (a speculative request) nothing is counted and the
+        results don't age.
+        """
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                if record:
+                    self._stats["no_results"] += 1
+                return None
+            outcome = self.check(entry, question)
+            if record:
+                self._stats["hits" if outcome == "hit" else f"miss_{outcome}"] += 1
+                if outcome == "hit":
+                    entry.reuses += 1
+            return entry if outcome == "hit" else None
+
+    def check(self, entry: Retrieval, question: str) -> str:
+        """Why the question needs a new search, or "hit" if the entry can answer it"""
+        if entry.reuses >= self.max_reuses or time.monotonic() - entry.created_at > self.ttl_seconds:
+            return "expired"
+        for match in _FILE_REFERENCE.finditer(question):
+            if not stem_words(match.group(1) or match.group(2)) <= entry.stems:
+                return "lecture"
+        if not set(classify_topics(question, len(TOPIC_MODULES))) <= entry.topics:
+            return "topic"
+        tokens = tokenize(question)
+        terms = [token for token in tokens if not token.isdigit()
+                 and token not in _STOPWORDS and token not in _BACK_REFERENCE and token not in _PRESENTATION]
+        if not terms:
+            # "Why?", "yes please", "show the code for that"
+            return "hit"
+        if not _BACK_REFERENCE.intersection(tokens):
+            return "not_follow_up"
+        covered = sum(term in entry.vocabulary for term in terms) / len(terms)
+        return "hit" if covered >= self.min_coverage else "new_terms"
+
+    def context(self, entry: Retrieval) -> str:
+        """Prompt block with the reused snippets, in place of the file_search tool"""
+        blocks = [f"[{chunk.filename}]\n{chunk.snippet}" for chunk in entry.chunks[:self.top_k]]
+        return ("Course excerpts (retrieved from the course files for the previous question, "
+                "reused for this follow-up):\n\n" + "\n\n---\n\n".join(blocks))
+
+    def observe(self, searched: bool, seconds: float) -> None:
+        """Latency of a follow-up turn that searched or reused results"""
+        with self._lock:
+            self._latency[searched][0] += 1
+            self._latency[searched][1] += seconds
+
+    def discard(self, session_id: str) -> None:
+        """Drop the session's results (e.g. on reset)"""
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            misses = {name[len("miss_"):]: count for name, count in self._stats.items() if name.startswith("miss_")}
+            checked = self._stats["hits"] + sum(misses.values())
+            (searched, searched_s), (reused, reused_s) = self._latency[True], self._latency[False]
+            saved = None
+            if searched and reused:
+                # Mean follow-up latency with a search minus without, for every reuse
+                saved = round(max(searched_s / searched - reused_s / reused, 0.0) * self._stats["hits"], 3)
+            return {
+                "sessions": len(self._entries),
+                "stored": self._stats["stored"],
+                "hits": self._stats["hits"],
+                "misses": misses,
+                "no_results": self._stats["no_results"],
+                "hit_rate": round(self._stats["hits"] / checked, 3) if checked else 0.0,
+                "searched_follow_up_ms": round(searched_s / searched * 1000, 1) if searched else None,
+                "reused_follow_up_ms": round(reused_s / reused * 1000, 1) if reused else None,
+                "latency_saved_s": saved,
+            }
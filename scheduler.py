@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Rate-limit-aware scheduler for model API calls
+
+Every upstream call goes through one process-wide RequestScheduler:
+- a global concurrency cap, granted round-robin across sessions (fair queue)
+- a token bucket sized to the API tier's requests-per-minute limit
+- jittered exponential backoff on 408/409/429/5xx and connection errors,
+  honoring Retry-After
+- a per-call deadline covering queueing, retries and the request itself
+- a circuit breaker that fails fast while upstream is degraded
+- cancellation: a cancelled call leaves the queue, stops retrying and
+  gives its slot back at once; callers disconnect its open stream in the
+  same step, so the slot really is free upstream too
+"""
+
+import random
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+RETRYABLE_STATUS = {408, 409, 429}
+FRIENDLY_MESSAGE = (
+    "⚠️ The course assistant is very busy right now. "
+    "Please try again in a minute — your question wasn't lost, just resend it."
+)
+
+
+class UpstreamUnavailableError(Exception):
+    """Raised when a call is rejected or gives up; user_message is safe to show on the page"""
+
+    def __init__(self, message: str, user_message: str = FRIENDLY_MESSAGE):
+        super().__init__(message)
+        self.user_message = user_message
+
+
+class DeadlineExceededError(UpstreamUnavailableError):
+    """The call's deadline passed while queued, backing off or in flight"""
+
+
+class RequestCancelledError(Exception):
+    """The call was cancelled through its CancelToken; reason says why (e.g. "stopped", "deadline")"""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Request cancelled: {reason}")
+        self.reason = reason
+
+
+class CancelToken:
+    """Cancels one turn's upstream work from any thread
+
+    Callbacks registered with on_cancel run once, on the cancelling thread
+    (or straight away if the token is already cancelled): the scheduler uses
+    them to give a slot back and callers to disconnect an open stream.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+        self._callbacks = []
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled") -> bool:
+        """Cancel with reason; False if it was already cancelled (the first reason stands)"""
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"⚠️ Cancel callback failed: {e}")
+        return True
+
+    def on_cancel(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        """Sleep up to timeout; True as soon as the token is cancelled"""
+        return self._event.wait(timeout)
+
+    def check(self) -> None:
+        if self._event.is_set():
+            raise RequestCancelledError(self.reason)
+
+
+def is_retryable(error: BaseException) -> bool:
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS or status >= 500
+    # openai.APIConnectionError / APITimeoutError carry no status code
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError") or isinstance(error, TimeoutError)
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Server-requested delay from retry-after-ms / retry-after headers, if any"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+class TokenBucket:
+    """Classic token bucket: rate tokens per second, up to capacity"""
+
+    def __init__(self, rate_per_second: float, capacity: float):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take one token if there is one (returns 0.0), else return the seconds until there will be"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, deadline: Optional[float] = None) -> float:
+        """Take one token, sleeping as needed; returns seconds waited"""
+        started = time.monotonic()
+        while True:
+            delay = self.reserve()
+            if not delay:
+                return time.monotonic() - started
+            if deadline is not None and time.monotonic() + delay > deadline:
+                raise DeadlineExceededError("Deadline exceeded waiting for rate limit budget")
+            time.sleep(delay)
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures, then lets one probe through every reset_seconds"""
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half_open" if time.monotonic() - self._opened_at >= self.reset_seconds else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at < self.reset_seconds:
+                return False
+            # A probe that never reported back (cancelled, deadline) expires after reset_seconds
+            if self._probe_at is not None and now - self._probe_at < self.reset_seconds:
+                return False
+            self._probe_at = now
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probe_at = None
+            if self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+class RequestScheduler:
+    """Fair, rate-limited, retrying gateway for upstream model calls"""
+
+    def __init__(self, max_concurrency: int, requests_per_minute: float, burst: int,
+                 max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 20.0,
+                 breaker: Optional[CircuitBreaker] = None,
+                 on_wait: Optional[Callable[[float], None]] = None):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.bucket = TokenBucket(requests_per_minute / 60.0, burst)
+        self.breaker = breaker or CircuitBreaker(failure_threshold=5, reset_seconds=30.0)
+        self.on_wait = on_wait  # Called with the queue + rate-limit wait of each granted slot
+        self._cond = threading.Condition()
+        self._waiting: "OrderedDict[str, deque]" = OrderedDict()
+        self._active = 0
+        self._stats = Counter()
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    @contextmanager
+    def slot(self, session_id: str, deadline: Optional[float] = None, cancel: Optional[CancelToken] = None):
+        """Hold one of the concurrency slots; queued fairly across sessions
+
+        Cancelling the token takes the call out of the queue, or gives a held
+        slot back immediately rather than when the caller's thread unwinds;
+        callers disconnect the call's stream on the same token (see
+        assistant.close_on_cancel), so it stops upstream as well.
+        """
+        if not self.breaker.allow():
+            self._count("rejected_open_circuit")
+            raise UpstreamUnavailableError("Circuit breaker open")
+
+        ticket = object()
+        enqueued = time.monotonic()
+        if cancel is not None:
+            cancel.on_cancel(self._wake)
+        with self._cond:
+            self._waiting.setdefault(session_id, deque()).append(ticket)
+            try:
+                while not (self._active < self.max_concurrency and self._next_ticket() is ticket):
+                    if cancel is not None and cancel.cancelled:
+                        self._stats["cancelled"] += 1
+                        raise RequestCancelledError(cancel.reason)
+                    timeout = None if deadline is None else deadline - time.monotonic()
+                    if timeout is not None and timeout <= 0:
+                        self._stats["deadline_exceeded"] += 1
+                        raise DeadlineExceededError("Deadline exceeded while queued")
+                    self._cond.wait(timeout)
+            except BaseException:
+                self._discard(session_id, ticket)
+                self._cond.notify_all()
+                raise
+            self._discard(session_id, ticket)
+            # Round robin: the session just served goes to the back of the line
+            if session_id in self._waiting:
+                self._waiting.move_to_end(session_id)
+            self._active += 1
+
+        held = [True]
+
+        def release(cancelled: bool = False):
+            with self._cond:
+                if held[0]:
+                    held[0] = False
+                    self._active -= 1
+                    if cancelled:
+                        self._stats["cancelled"] += 1
+                    self._cond.notify_all()
+
+        if cancel is not None:
+            cancel.on_cancel(lambda: release(cancelled=True))
+        try:
+            if cancel is not None:
+                cancel.check()
+            self.bucket.acquire(deadline)
+            waited = time.monotonic() - enqueued
+            with self._cond:
+                self._stats["granted"] += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            if self.on_wait is not None:
+                self.on_wait(waited)
+            yield waited
+        finally:
+            release()
+
+    def run_with_retries(self, fn: Callable[[Optional[float]], Any], deadline: Optional[float] = None,
+                         cancel: Optional[CancelToken] = None) -> Any:
+        """Call fn(timeout) with jittered exponential backoff; timeout is the time left before the deadline"""
+        attempt = 0
+        while True:
+            if cancel is not None:
+                cancel.check()
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                self._count("deadline_exceeded")
+                raise DeadlineExceededError("Deadline exceeded before the request could be sent")
+            try:
+                result = fn(remaining)
+            except Exception as e:
+                if cancel is not None and cancel.cancelled:
+                    raise RequestCancelledError(cancel.reason) from e
+                delay = self.retry_delay(e, attempt, deadline)
+                attempt += 1
+                if cancel is not None:
+                    cancel.wait(delay)
+                else:
+                    time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+    def retry_delay(self, error: Exception, attempt: int, deadline: Optional[float] = None) -> float:
+        """Backoff before retrying a failed attempt (0-based), or raise if the call should give up
+
+        Shared with the asyncio chat backend, which sleeps on the event loop instead.
+        """
+        if not is_retryable(error):
+            if getattr(error, "status_code", None) is not None:
+                # Upstream answered (e.g. 400), so it is healthy
+                self.breaker.record_success()
+            raise error
+        self.breaker.record_failure()
+        if attempt >= self.max_retries:
+            self._count("gave_up")
+            raise UpstreamUnavailableError(f"Upstream failed after {attempt + 1} attempts: {error}") from error
+        # Full jitter, unless the server told us how long to wait
+        delay = retry_after_seconds(error)
+        if delay is None:
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            self._count("deadline_exceeded")
+            raise DeadlineExceededError("Deadline exceeded while backing off") from error
+        self._count("retries")
+        return delay
+
+    def call(self, fn: Callable[[Optional[float]], Any], session_id: str,
+             timeout: Optional[float] = None, cancel: Optional[CancelToken] = None) -> Any:
+        """Queue, rate-limit and retry one upstream call"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.slot(session_id, deadline, cancel):
+            return self.run_with_retries(fn, deadline, cancel)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            granted = self._stats["granted"]
+            return {
+                "queue_depth": sum(len(tickets) for tickets in self._waiting.values()),
+                "active": self._active,
+                "granted": granted,
+                "avg_wait_s": round(self._wait_total / granted, 3) if granted else 0.0,
+                "max_wait_s": round(self._wait_max, 3),
+                **{name: self._stats[name] for name in
+                   ("retries", "gave_up", "deadline_exceeded", "rejected_open_circuit", "cancelled")},
+                "circuit": self.breaker.state,
+            }
+
+    def _wake(self) -> None:
+        with self._cond:
+            self._cond.notify_all()
+
+    def _next_ticket(self):
+        for tickets in self._waiting.values():
+            if tickets:
+                return tickets[0]
+        return None
+
+    def _discard(self, session_id: str, ticket) -> None:
+        tickets = self._waiting.get(session_id)
+        if tickets is None:
+            return
+        try:
+            tickets.remove(ticket)
+        except ValueError:
+            pass
+        if not tickets:
+            del self._waiting[session_id]
+
+    def _count(self, name: str) -> None:
+        with self._cond:
+            self._stats[name] += 1
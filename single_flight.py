@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Single-flight coalescing of identical in-flight requests
+
+When several sessions ask the same first-turn question at once, the first
+caller (the leader) makes the upstream call and every concurrent caller with
+the same key waits for and shares its result.
+"""
+
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class Flight:
+    """One in-flight upstream call shared by its leader and waiters"""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block up to timeout for the leader; True once it has finished"""
+        return self._done.wait(timeout)
+
+
+class SingleFlight:
+    """Registry of in-flight calls keyed by request identity"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, Flight] = {}
+        self._stats = Counter()
+
+    def begin(self, key: Hashable) -> Tuple[Flight, bool]:
+        """Join the flight for key; returns (flight, is_leader)"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self._stats["coalesced"] += 1
+                return flight, False
+            flight = self._flights[key] = Flight()
+            self._stats["leaders"] += 1
+            return flight, True
+
+    def finish(self, key: Hashable, flight: Flight, result: Any = None,
+               error: Optional[BaseException] = None) -> None:
+        """Publish the leader's outcome and release waiters (idempotent)"""
+        with self._lock:
+            if flight.done:
+                return
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            flight.result, flight.error = result, error
+            if error is not None:
+                self._stats["failed"] += 1
+            flight._done.set()
+
+    def wait(self, flight: Flight, timeout: Optional[float] = None) -> Any:
+        """Block until the leader finishes and return its result (or raise its error)"""
+        if not flight._done.wait(timeout):
+            with self._lock:
+                self._stats["wait_timeouts"] += 1
+            raise TimeoutError("Timed out waiting for an identical in-flight request")
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        """Run fn once per concurrent key; returns (result, shared) where shared means another caller ran it"""
+        flight, leader = self.begin(key)
+        if not leader:
+            return self.wait(flight, timeout), True
+        try:
+            result = fn()
+        except BaseException as e:
+            self.finish(key, flight, error=e)
+            raise
+        self.finish(key, flight, result=result)
+        return result, False
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                **{name: self._stats[name] for name in ("leaders", "coalesced", "failed", "wait_timeouts")},
+                "in_flight": len(self._flights),
+            }
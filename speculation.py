@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Speculative prefetch of the follow-up question an answer suggests
+
+Every answer ends by offering the user a next question ("Want to see the
+SARIMAX code?"). After a turn completes, the suggested question is pulled
+out of the answer and answered in the background, chained on the same
+previous_response_id. If the user's next message matches it after
+normalization, or simply accepts the offer ("yes please"), the precomputed
+answer is served at once. A speculation is
+discarded (and its tokens counted as wasted) when the user asks something
+else, the conversation moves on or it ages out.
+"""
+
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from answer_cache import cosine, ngram_vector, normalize_question
+
+_SENTENCE = re.compile(r"[^.!?\n]*\?")
+# "Want me to show the code?" -> "show the code"
+_OFFER_PREFIX = re.compile(
+    r"^\s*(?:do you |would you )?(?:want|like|wanna)(?: me)? to\s+|^\s*(?:should|shall) i\s+|^\s*how about\s+",
+    re.I,
+)
+# Replies that accept the offer rather than rephrasing it
+_AFFIRMATIVE = re.compile(
+    r"^(?:yes|yeah|yep|sure|ok|okay|please|go ahead|do it|sounds good)(?: (?:please|thanks|thank you|sure))*$"
+)
+
+
+def extract_follow_up(answer: str, tail_chars: int = 400) -> Optional[str]:
+    """The question the answer ends with, phrased as the user would ask it"""
+    questions = _SENTENCE.findall(answer[-tail_chars:])
+    if not questions:
+        return None
+    question = re.sub(r"[*_`#>]+", "", questions[-1]).strip(" -–—:\t")
+    question = _OFFER_PREFIX.sub("", question).strip()
+    if len(question.split()) < 3:
+        return None
+    return question[0].upper() + question[1:]
+
+
+@dataclass
+class Speculation:
+    question: str
+    parent_response_id: str
+    future: Future
+    vector: Dict[str, float] = field(repr=False, default_factory=dict)
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class Speculator:
+    """One background speculation per session, run on a small shared pool"""
+
+    def __init__(self, max_workers: int, ttl_seconds: float, similarity_threshold: float):
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculate")
+        self._pending: Dict[str, Speculation] = {}
+        self._lock = threading.Lock()
+        self._stats = Counter()
+
+    def launch(self, session_id: str, question: str, parent_response_id: str,
+               fn: Callable[[], Any]) -> None:
+        """Start answering question in the background; replaces the session's previous speculation"""
+        spec = Speculation(question=question, parent_response_id=parent_response_id,
+                           future=self._pool.submit(fn), vector=ngram_vector(normalize_question(question)))
+        with self._lock:
+            previous = self._pending.pop(session_id, None)
+            self._pending[session_id] = spec
+            self._stats["launched"] += 1
+            stale = self._pop_expired()
+        if previous is not None:
+            stale.append(previous)
+        for old in stale:
+            self._discard(old, "stale")
+
+    def take(self, session_id: str, question: str, parent_response_id: Optional[str],
+             timeout: Optional[float] = None) -> Optional[Any]:
+        """The precomputed response if question matches this session's speculation, else None
+
+        Any speculation for the session is consumed: a mismatch discards it.
+        """
+        future = self.claim(session_id, question, parent_response_id)
+        return None if future is None else self.result(future, timeout)
+
+    def claim(self, session_id: str, question: str, parent_response_id: Optional[str]) -> Optional[Future]:
+        """The future of this session's speculation if question matches it, whether or not it is done
+
+        Like take(), but returns straight away so the caller can wait on its own terms.
+        """
+        with self._lock:
+            spec = self._pending.pop(session_id, None)
+        if spec is None:
+            return None
+        if spec.parent_response_id != parent_response_id or time.monotonic() - spec.created_at > self.ttl_seconds:
+            self._discard(spec, "stale")
+            return None
+        if not self.matches(spec, question):
+            self._discard(spec, "missed")
+            return None
+        return spec.future
+
+    def result(self, future: Future, timeout: Optional[float] = None) -> Optional[Any]:
+        """A claimed speculation's response, or None if it failed or isn't done within timeout"""
+        try:
+            # Usually done by now; otherwise it still has a head start on a fresh request
+            result = future.result(timeout)
+        except Exception:
+            with self._lock:
+                self._stats["failed"] += 1
+            return None
+        with self._lock:
+            self._stats["hits"] += 1
+        return result
+
+    def matches(self, spec: Speculation, question: str) -> bool:
+        normalized = normalize_question(question)
+        if _AFFIRMATIVE.match(normalized) or normalized == normalize_question(spec.question):
+            return True
+        return cosine(ngram_vector(normalized), spec.vector) >= self.similarity_threshold
+
+    def discard(self, session_id: str) -> None:
+        """Drop the session's speculation (e.g. on reset)"""
+        with self._lock:
+            spec = self._pending.pop(session_id, None)
+        if spec is not None:
+            self._discard(spec, "stale")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            launched = self._stats["launched"]
+            settled = self._stats["hits"] + self._stats["missed"] + self._stats["stale"]
+            return {
+                **{name: self._stats[name] for name in
+                   ("launched", "hits", "missed", "stale", "cancelled", "failed", "skipped_budget")},
+                "pending": len(self._pending),
+                "hit_rate": round(self._stats["hits"] / settled, 3) if settled else 0.0,
+                "wasted_input_tokens": self._stats["wasted_input_tokens"],
+                "wasted_output_tokens": self._stats["wasted_output_tokens"],
+                "wasted_calls_per_hit": round((launched - self._stats["hits"]) / self._stats["hits"], 2)
+                if self._stats["hits"] else None,
+            }
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def _discard(self, spec: Speculation, reason: str) -> None:
+        with self._lock:
+            self._stats[reason] += 1
+        if spec.future.cancel():
+            # Never started: no tokens spent
+            with self._lock:
+                self._stats["cancelled"] += 1
+            return
+        spec.future.add_done_callback(self._count_waste)
+
+    def _count_waste(self, future: Future) -> None:
+        if future.cancelled() or future.exception() is not None:
+            return
+        usage = getattr(future.result(), "usage", None)
+        with self._lock:
+            self._stats["wasted_input_tokens"] += getattr(usage, "input_tokens", 0) or 0
+            self._stats["wasted_output_tokens"] += getattr(usage, "output_tokens", 0) or 0
+
+    def _pop_expired(self) -> List[Speculation]:
+        """Remove speculations past their TTL (caller holds the lock and discards them after)"""
+        now = time.monotonic()
+        expired = [sid for sid, spec in self._pending.items() if now - spec.created_at > self.ttl_seconds]
+        return [self._pending.pop(sid) for sid in expired]
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Startup profiling for the first script run of a process
+
+With STARTUP_PROFILE=true the app marks each phase of its first run
+(module imports, shared resources, header, sidebar, chat panel) and
+records, per phase, the wall time and the top-level packages imported
+during it. The breakdown is printed once and written to
+logs/startup.json. parse_importtime() turns `python -X importtime`
+output into per-package totals for the cold-start benchmark.
+"""
+
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ENABLED = os.getenv("STARTUP_PROFILE", "false").lower() == "true"
+
+
+def _top_level_modules() -> set:
+    return {name.partition(".")[0] for name in list(sys.modules)}
+
+
+class StartupProfile:
+    """Phase marks for one script run: (phase, seconds since the last mark, packages newly imported)"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self._seen = _top_level_modules()
+        self.phases: List[Dict[str, Any]] = []
+        self.done = False
+
+    def mark(self, phase: str) -> None:
+        now = time.perf_counter()
+        loaded = _top_level_modules()
+        self.phases.append({
+            "phase": phase,
+            "ms": round((now - self._last) * 1000, 1),
+            "imported": sorted(loaded - self._seen),
+        })
+        self._last, self._seen = now, loaded
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "total_ms": round((self._last - self.started) * 1000, 1),
+            "phases": self.phases,
+            "heavy_modules_loaded": {name: name in sys.modules for name in ("openai", "langsmith.client",
+                                                                           "streamlit_extras", "httpx")},
+        }
+
+    def finish(self, path: Optional[Path] = None) -> Dict[str, Any]:
+        self.done = True
+        report = self.report()
+        print("⏱️ Startup profile: " + ", ".join(f"{p['phase']} {p['ms']}ms" for p in self.phases)
+              + f" (total {report['total_ms']}ms)")
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        return report
+
+
+def parse_importtime(stderr: str, top: int = 15) -> Dict[str, float]:
+    """Cumulative import time per top-level package (ms) from `-X importtime` output, largest first"""
+    totals: Dict[str, float] = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        if not cumulative.strip().isdigit() or name.startswith("  "):
+            continue  # Header line, or a nested import already counted in its parent
+        # Direct imports have one space of indent; deeper ones are counted by their parent
+        totals[name.strip().partition(".")[0]] += int(cumulative) / 1000
+    ranked = sorted(totals.items(), key=lambda item: -item[1])[:top]
+    return {name: round(ms, 1) for name, ms in ranked}
+
+
+# The profile of this process's first script run; later reruns leave it alone
+_profile: Optional[StartupProfile] = None
+
+
+def begin() -> None:
+    """Start profiling if enabled and this is the process's first script run"""
+    global _profile
+    if ENABLED and _profile is None:
+        _profile = StartupProfile()
+
+
+def mark(phase: str) -> None:
+    if _profile is not None and not _profile.done:
+        _profile.mark(phase)
+
+
+def finish(path: Optional[Path] = None) -> Optional[Dict[str, Any]]:
+    """Print and save the breakdown once, at the end of the first run"""
+    if _profile is None or _profile.done:
+        return None
+    return _profile.finish(path)
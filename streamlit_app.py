@@ -4,52 +4,75 @@ Time Series Course Assistant - Streamlit App
 Cyber Diogo's AI-powered course helper
 """
 
+import time
+
+# Start of this script run, for the whole-rerun timing
+RERUN_STARTED = time.perf_counter()
+
+import startup_profile
+
+# Phase timings for the first run in this process (STARTUP_PROFILE=true)
+startup_profile.begin()
+
 import streamlit as st
 import json
 import os
 from pathlib import Path
+from concurrent import futures
+from contextlib import nullcontext
 from typing import Optional
-import time
+import uuid
 from datetime import datetime
-from dotenv import load_dotenv
-from openai import OpenAI
-from streamlit_extras.buy_me_a_coffee import button
+from streamlit.errors import StreamlitAPIException
+
+import assistant
+import config
+from assistant import DEFAULT_VERBOSITY
+from answer_cache import normalize_question
+from code_blocks import COPY_SCRIPT
+from chat_history import ChatHistory
+from conversation_manager import ConversationManager
+from rendering import build_message_html, history_html, render_message_html
+from retrieval_cache import search_results
+from speculation import extract_follow_up
+import tracing
+from resources import (
+    get_settings, get_client, get_css, get_answer_cache, get_prewarmer, get_retriever, get_call_scheduler,
+    get_single_flight, get_router, get_metrics, get_history_store, get_speculator, get_tracer, get_retrieval_cache,
+    LANGSMITH_AVAILABLE,
+)
+from scheduler import CancelToken, DeadlineExceededError, RequestCancelledError, UpstreamUnavailableError
+from turn_worker import TurnWorker
 
-# LangSmith tracing
-try:
-    from langsmith.wrappers import wrap_openai
-    from langsmith import traceable
-    LANGSMITH_AVAILABLE = True
-except ImportError:
-    LANGSMITH_AVAILABLE = False
+# LangSmith tracing (its SDK is only imported for the inline backend)
+if not LANGSMITH_AVAILABLE:
     print("⚠️ LangSmith not available - install langsmith for tracing")
 
-# Import our tracing config
-try:
-    from tracing_config import get_langsmith_config, is_langsmith_configured
-    CONFIG_AVAILABLE = True
-except ImportError:
-    CONFIG_AVAILABLE = False
-    print("⚠️ Tracing config not available")
-
-# Load environment variables from .env file
-load_dotenv(override=True)
-
-# Debug: Check what API key is loaded
-api_key = os.getenv("OPENAI_API_KEY")
-
-# Configure OpenAI client with LangSmith tracing
-if LANGSMITH_AVAILABLE and is_langsmith_configured():
-    # Wrap the client for automatic tracing
-    client = wrap_openai(OpenAI(api_key=api_key))
-    print("✅ LangSmith tracing enabled for OpenAI client")
+if config.TRACING_BACKEND == "langsmith" and LANGSMITH_AVAILABLE:
+    from langsmith import traceable
+
+    # Inline: runs are built and queued on the turn's own thread
+    trace_turn, trace_stream = traceable, traceable(reduce_fn="".join)
 else:
-    # Use regular client without tracing
-    client = OpenAI(api_key=api_key)
-    if LANGSMITH_AVAILABLE:
-        print("⚠️ LangSmith available but not configured - check environment variables")
-    else:
-        print("ℹ️ LangSmith not available - using regular OpenAI client")
+    # Buffered (or off): spans are recorded in-process and exported from a background thread
+    trace_turn, trace_stream = tracing.traced("ask_bot"), tracing.traced("ask_bot_stream")
+
+startup_profile.mark("imports")
+
+# Environment, tracing config and the pooled OpenAI client are built once per
+# process and shared by every session (see resources.py). The client is fetched
+# with get_client() where a turn needs it, so the first paint doesn't wait for the SDK.
+settings = get_settings()
+tracer = get_tracer()
+answer_cache = get_answer_cache()
+retriever = get_retriever()
+single_flight = get_single_flight()
+scheduler = get_call_scheduler()  # None in thin-client mode (CHAT_BACKEND_URL)
+router = get_router()
+speculator = get_speculator()
+retrieval_cache = get_retrieval_cache()
+metrics = get_metrics()
+startup_profile.mark("resources")
 
 # Page configuration
 st.set_page_config(
@@ -59,237 +82,34 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Custom CSS for better styling
-st.markdown("""
-<style>
-    /* optional: tighten section gaps */
-    section.main > div { padding-top: 0.25rem; }
-    .main-header {
-        /* Main title - largest and most prominent */
-        font-size: clamp(2.5rem, 6vw, 3rem) !important;
-        font-weight: 900;
-        color: #0074FF;
-        text-align: center;
-        margin-bottom: 1.5rem;
-        word-wrap: break-word;
-        overflow-wrap: break-word;
-        max-width: 100%;
-        line-height: 1.1;
-        padding: 0 0.5rem;
-        white-space: normal;
-        overflow: visible;
-        letter-spacing: -0.02em;
-    }
-    
-    /* Tagline styling */
-    .tagline {
-        font-size: clamp(1.1rem, 2.5vw, 1.3rem) !important;
-        font-weight: 400;
-        color: #666666;
-        text-align: center;
-        margin-bottom: 2.5rem;
-        line-height: 1.4;
-    }
-    
-    /* Welcome section styling */
-    .welcome-section {
-        margin-bottom: 2rem;
-    }
-    
-    .welcome-title {
-        font-size: clamp(1.6rem, 3.5vw, 2rem) !important;
-        font-weight: 700;
-        color: #373435;
-        margin-bottom: 1rem;
-        line-height: 1.3;
-    }
-    
-    .welcome-intro {
-        font-size: clamp(1rem, 2vw, 1.1rem) !important;
-        font-weight: 400;
-        color: #555555;
-        margin-bottom: 1.5rem;
-        line-height: 1.5;
-    }
-    
-    .capabilities-list {
-        font-size: clamp(0.95rem, 1.8vw, 1rem) !important;
-        line-height: 1.6;
-        margin-bottom: 1.5rem;
-        color: #373435;
-    }
-    
-    .capabilities-list strong {
-        font-weight: 600;
-        color: #373435;
-    }
-    
-    .capabilities-list ul {
-        margin: 0;
-        padding-left: 1.5rem;
-    }
-    
-    .capabilities-list li {
-        margin-bottom: 0.5rem;
-        padding-left: 0.5rem;
-    }
-    
-    .call-to-action {
-        font-size: clamp(1rem, 2vw, 1.1rem) !important;
-        font-weight: 500;
-        color: #000000;
-        font-style: italic;
-        margin-top: 1.5rem;
-    }
-    
-    /* Enhanced message styling */
-    .user-message {
-        background: linear-gradient(135deg, rgba(255, 255, 51, 0.2), rgba(0, 116, 255, 0.15));
-        border-radius: 15px;
-        padding: 10px 14px;
-        margin: 4px 0;
-        border-left: 4px solid #0074FF;
-        text-align: right;
-        margin-left: 20%;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-        color: #373435;
-        backdrop-filter: blur(5px);
-        border: none;
-        outline: none;
-    }
-    
-    .assistant-message {
-        background: linear-gradient(135deg, rgba(112, 95, 254, 0.2), rgba(255, 255, 51, 0.15));
-        border-radius: 15px;
-        padding: 10px 14px;
-        margin: 4px 0;
-        border-left: 4px solid #705FFE;
-        text-align: left;
-        margin-right: 20%;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-        color: #373435;
-        border: 1px solid rgba(112, 95, 254, 0.3);
-        backdrop-filter: blur(5px);
-    }
-    
-    /* Code block styling */
-    .code-block {
-        background-color: #f8f9fa;
-        border: 1px solid #e9ecef;
-        border-radius: 8px;
-        padding: 12px;
-        font-family: 'Courier New', monospace;
-        margin: 8px 0;
-        position: relative;
-    }
-    
-    /* Quick action buttons */
-    .quick-action-btn {
-        background-color: #007bff;
-        color: white;
-        border: none;
-        border-radius: 20px;
-        padding: 8px 16px;
-        margin: 4px;
-        cursor: pointer;
-        font-size: 14px;
-        transition: all 0.3s ease;
-    }
-    
-    .quick-action-btn:hover {
-        background-color: #0056b3;
-        transform: translateY(-1px);
-    }
-    
-    /* Better button styling */
-    .stButton > button {
-        border-radius: 15px;
-        font-weight: 600;
-        transition: all 0.3s ease;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-        background-color: #0074FF !important;
-        color: white !important;
-        border: none !important;
-    }
-    
-    .stButton > button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 4px 8px rgba(0,0,0,0.2);
-        background-color: #0049DC !important;
-    }
-    
-    /* Override Streamlit's primary button colors */
-    .stButton > button[data-baseweb="button"],
-    .stButton > button[data-testid="stFormSubmitButton"],
-    .stButton > button[type="submit"] {
-        background-color: #0074FF !important;
-        color: white !important;
-        background-image: none !important;
-    }
-    
-    /* Electric blue send button - target form submit buttons specifically */
-    .stFormSubmitButton > button,
-    .stFormSubmitButton button,
-    form button[type="submit"],
-    .stButton > button[data-testid="stFormSubmitButton"] {
-        background-color: #0074FF !important;
-        color: white !important;
-        border: none !important;
-        background-image: none !important;
-    }
-    
-    /* Override any Streamlit default button colors */
-    button[data-baseweb="button"] {
-        background-color: #0074FF !important;
-        color: white !important;
-    }
-    
-    /* Improved text input */
-    .stTextArea > div > div > textarea {
-        border-radius: 15px;
-        border: 3px solid #E0E0E0;
-        transition: border-color 0.0s ease;
-    }
-    
-    .stTextArea > div > div > textarea:focus {
-        border-color: #0074FF;
-        box-shadow: 0 0 0 2px rgba(0, 116, 255, 0.2);
-    }
-    
-    /* Kill ALL borders and shadows around the text area wrapper */
-    .stTextArea, 
-    .stTextArea > div, 
-    .stTextArea > div > div {
-        border: none !important;
-        outline: none !important;
-        box-shadow: none !important;
-        background: transparent !important; /* or white if you prefer */
-    }
-            
-    .stTextArea > div > div > textarea {
-        font-family: 'Montserrat', sans-serif !important;
-        color: #373435 !important;  /* dark gray body text */
-        background-color: #FFFFFF !important; /* clean white input */
-        border-radius: 15px !important;
-        border: 2px solid #E0E0E0 !important; /* soft gray border */
-    }
-    .stTextArea > div > div > textarea:focus {
-        border-color: #0074FF !important;  /* brand blue focus */
-        box-shadow: 0 0 0 2px rgba(0, 116, 255, 0.2) !important;
-    }
-
-    
-
-</style>
-""", unsafe_allow_html=True)
+# Custom CSS for better styling (loaded once per process)
+st.markdown(get_css(), unsafe_allow_html=True)
 
 # Initialize session state
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 if "messages" not in st.session_state:
-    st.session_state.messages = []
+    # Bounded window in memory; older messages spill to disk (see chat_history.py)
+    st.session_state.messages = ChatHistory(
+        st.session_state.session_id, get_history_store(), config.HISTORY_WINDOW, config.MAX_MESSAGES
+    )
+if "history_pages" not in st.session_state:
+    st.session_state.history_pages = 0  # Pages of spilled messages the user has scrolled back to
 if "last_response_id" not in st.session_state:
     st.session_state.last_response_id = None
 if "vector_store_id" not in st.session_state:
     st.session_state.vector_store_id = None
+if "conversation" not in st.session_state:
+    st.session_state.conversation = ConversationManager(
+        token_budget=config.CONTEXT_TOKEN_BUDGET,
+        keep_turns=config.CONTEXT_KEEP_TURNS,
+        summary_chars=config.CONTEXT_SUMMARY_CHARS,
+    )
+if "pending_question" not in st.session_state:
+    st.session_state.pending_question = None
+if "speculations_left" not in st.session_state:
+    st.session_state.speculations_left = config.SPECULATION_BUDGET_PER_SESSION
+startup_profile.mark("page_setup")
 
 
 # Load vector store metadata
@@ -297,7 +117,7 @@ def load_vector_store():
     """Load vector store ID from .env file first, then fall back to Streamlit secrets"""
     try:
         # First try to load from .env file (for local development)
-        vector_store_id = os.getenv("VECTOR_STORE_ID")
+        vector_store_id = settings["vector_store_id"]
         
         if not vector_store_id:
             # Fall back to Streamlit secrets (for production deployment)
@@ -318,167 +138,505 @@ def load_vector_store():
 # Get API key from .env file
 def get_api_key():
     """Get API key from .env file."""
-    return os.getenv("OPENAI_API_KEY")
+    return settings["openai_api_key"]
 
 def display_message(role, content, timestamp=None):
     """Display a message with proper styling and metadata"""
-    def clean(txt: str) -> str:
-        # remove both raw and escaped <br> variants
-        replacements = [
-            '<br>', '<br/>', '<br />',
-            '&lt;br&gt;', '&lt;br/&gt;', '&lt;br /&gt;'
-        ]
-        for r in replacements:
-            txt = txt.replace(r, '')
-        return txt.strip()
-
-    safe = clean(content)
-
-    if role == "user":
-        st.markdown(f"""
-        <div class="user-message">
-            <strong>You</strong>{f' <small style="color:#666;">{timestamp}</small>' if timestamp else ''}
-            <br>{safe}
-        </div>
-        """, unsafe_allow_html=True)
-    else:
-        # Assistant content can include HTML formatting—keep as is
-        st.markdown(f"""
-        <div class="assistant-message">
-            <strong>Assistant</strong>{f' <small style="color:#666;">{timestamp}</small>' if timestamp else ''}
-            <br>{content}
-        </div>
-        """, unsafe_allow_html=True)
+    with metrics.timer("render"):
+        st.markdown(render_message_html(role, content, timestamp), unsafe_allow_html=True)
+
+def display_history(messages, timestamp=None):
+    """Render the history as memoized blocks of messages (see rendering.py)"""
+    with metrics.timer("render"):
+        for html in history_html(messages, timestamp):
+            st.markdown(html, unsafe_allow_html=True)
 
+def rerun_chat():
+    """Redraw the chat: just the chat fragment when running inside it, else the whole app"""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        # Called during a full run (e.g. a sidebar example question)
+        st.rerun()
+
+def load_earlier_messages():
+    st.session_state.history_pages += 1
 
 
-def display_code_snippet(code, language="python", filename=None):
-    """Display code with syntax highlighting and copy button"""
-    st.markdown(f"""
-    <div class="code-block">
-        <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 8px;">
-            <strong>{filename or 'Code Snippet'}</strong>
-            <button onclick="navigator.clipboard.writeText(`{code}`)" class="quick-action-btn">
-                📋 Copy
-            </button>
-        </div>
-        <pre><code class="language-{language}">{code}</code></pre>
-    </div>
-    """, unsafe_allow_html=True)
 
-def process_user_input(user_input):
-    """Process user input and generate response"""
+def enable_code_copy():
+    """Install the page's single click handler behind every code block's Copy button"""
+    try:
+        st.html(COPY_SCRIPT, unsafe_allow_javascript=True)
+    except TypeError:
+        # Older Streamlit releases strip scripts from st.html; a zero-height component can still run one
+        import streamlit.components.v1 as components
+        components.html(COPY_SCRIPT, height=0)
+
+def render_stream(placeholder, chunks, received=None):
+    """Render streamed text chunks into an assistant bubble and return the full text
+
+    Empty chunks only keep the bubble repainting while nothing arrives: each
+    repaint is where Streamlit can stop the run. Chunks also go to received,
+    so the caller still has the partial answer if it does.
+    """
+    thinking = render_message_html("assistant", "🤔 Thinking...")
+    placeholder.markdown(thinking, unsafe_allow_html=True)
+    text = ""
+    last_paint = 0.0
+    for chunk in chunks:
+        if chunk and received is not None:
+            received.append(chunk)
+        text += chunk
+        now = time.perf_counter()
+        # Throttle repaints so fast streams don't flood the websocket
+        if now - last_paint >= config.STREAM_RENDER_INTERVAL:
+            # Partial text: built fresh, kept out of the render cache
+            html = build_message_html("assistant", text + " ▌") if text else thinking
+            placeholder.markdown(html, unsafe_allow_html=True)
+            last_paint = now
+    placeholder.markdown(render_message_html("assistant", text), unsafe_allow_html=True)
+    return text
+
+def process_user_input(user_input, container=None):
+    """Process user input and generate response
+
+    A turn can be cut short: the stop and reset buttons and a closed tab
+    interrupt the run at its next repaint, and TURN_DEADLINE_SECONDS bounds
+    it as a whole. The upstream call is then cancelled and whatever part of
+    the answer had arrived is kept.
+    """
+    # Once the session is stopping, every session_state access raises again: keep references
+    messages, session_id = st.session_state.messages, st.session_state.session_id
+
     # Add user message to chat history
-    st.session_state.messages.append({"role": "user", "content": user_input})
+    messages.append("user", user_input)
         
     # Get bot response
-    with st.spinner("🤔 Thinking..."):
-        response = ask_bot(user_input)
+    cancel = CancelToken()
+    chunks = None
+    received = []
+    try:
+        if config.STREAM_RESPONSES:
+            # Show the question right away and fill the answer bubble as tokens arrive
+            with container if container is not None else st.container():
+                display_message("user", user_input)
+                placeholder = st.empty()
+            chunks = ask_bot_stream(user_input, cancel=cancel)
+            response = render_stream(placeholder, chunks, received)
+        else:
+            with st.spinner("🤔 Thinking..."):
+                response = ask_bot(user_input, cancel=cancel, heartbeat=st.empty().empty)
+    except UpstreamUnavailableError as e:
+        # Overloaded or degraded upstream: tell the user instead of showing a traceback
+        print(f"⚠️ Upstream unavailable: {e}")
+        response = e.user_message
+    except RequestCancelledError as e:
+        response = cancelled_turn(session_id, "".join(received), e.reason)
+    except BaseException as e:
+        if isinstance(e, Exception):
+            raise
+        # Streamlit stopping this run: StopException when the session goes away,
+        # RerunException for a click outside the chat (stop, reset, an example question)
+        reason = "disconnected" if type(e).__name__ == "StopException" else "stopped"
+        cancel.cancel(reason)
+        if chunks is not None:
+            chunks.close()
+        messages.append("assistant", cancelled_turn(session_id, "".join(received), reason))
+        raise
     
     # Add assistant response to chat history
-    st.session_state.messages.append({"role": "assistant", "content": response})
+    messages.append("assistant", response)
     
     # Rerun to show new messages
-    st.rerun()
+    rerun_chat()
+
+def cancelled_turn(session_id: str, partial: str, reason: str) -> str:
+    """Count a turn that was cut short; returns what the history keeps of it
+
+    The conversation isn't advanced: the next question chains from the last
+    complete answer.
+    """
+    metrics.inc("cancelled_turns", reason=reason)
+    metrics.log_turn({"session": session_id, "cancelled": reason, "partial_chars": len(partial)})
+    if reason == "deadline":
+        note = f"⏱️ *Stopped: no complete answer within {config.TURN_DEADLINE_SECONDS:g}s. Please try again.*"
+    else:
+        note = "⏹️ *Stopped.*"
+    return f"{partial}\n\n{note}" if partial else note
+
+def retrieval_scope():
+    """Identifies the retrieval corpus in cache keys: vector store ID or local index"""
+    return retriever.scope if retriever is not None else st.session_state.vector_store_id
+
+def retrieval_context(user_question: str, record: bool = True) -> Optional[str]:
+    """Snippets to send in place of the file_search tool, or None to search
+
+    From the local index, or from this session's last file_search results
+    when the question is a follow-up they can answer (see retrieval_cache.py).
+    """
+    if retriever is not None:
+        return retriever.context_for(user_question)
+    if not config.RETRIEVAL_REUSE_ENABLED or not st.session_state.conversation.depth:
+        return None
+    retrieval = retrieval_cache.lookup(st.session_state.session_id, user_question, record)
+    return retrieval_cache.context(retrieval) if retrieval is not None else None
+
+def remember_retrieval(user_question: str, request: Optional[dict], response):
+    """Keep a turn's file_search results for the follow-ups that can reuse them
+
+    request is None when it isn't known whether the turn searched (a
+    speculated answer): then only results found are kept.
+    """
+    if retriever is not None or not config.RETRIEVAL_REUSE_ENABLED:
+        return
+    results = search_results(response)
+    if results or (request is not None and "tools" in request):
+        retrieval_cache.store(st.session_state.session_id, user_question, results)
+
+def begin_turn(user_question: str, verbosity: Optional[str] = None, speculative: bool = False):
+    """Build the request for the current turn; returns (request, compacted)
+
+    The model and verbosity come from the router unless verbosity is given.
+    A speculative request isn't counted in the retrieval reuse stats.
+    """
+    conversation = st.session_state.conversation
+    if config.ROUTER_ENABLED:
+        decision = router.route(user_question, depth=conversation.depth)
+        model, verbosity = decision.model, verbosity or decision.verbosity
+    else:
+        model, verbosity = config.DEFAULT_MODEL, verbosity or DEFAULT_VERBOSITY
+
+    previous_response_id = st.session_state.last_response_id
+    history = None
+    if previous_response_id and conversation.needs_compaction():
+        # Start a fresh chain seeded with a summary instead of the whole server-side context
+        history = conversation.compacted_history()
+        previous_response_id = None
+
+    request = assistant.build_request(
+        user_question,
+        st.session_state.vector_store_id,
+        previous_response_id=previous_response_id,
+        model=model,
+        verbosity=verbosity,
+        history=history,
+        context=retrieval_context(user_question, record=not speculative),
+    )
+    return request, history is not None
+
+def finish_turn(user_question: str, request: dict, answer: str, response_id: str,
+                usage=None, started: float = None, compacted: bool = False, cached: bool = False,
+                first_token_s: float = None):
+    """Update session state once a turn's answer is complete"""
+    st.session_state.last_response_id = response_id
+    latency = time.perf_counter() - started if started is not None else 0.0
+    if not cached:
+        store_cached_answer(user_question, request, answer, response_id)
+        router.observe(request["model"], latency, usage)
+        if retriever is None and st.session_state.conversation.depth:
+            # Follow-ups with and without a search, for the latency reusing results saves
+            retrieval_cache.observe("tools" in request, latency)
+    stats = st.session_state.conversation.record_turn(user_question, answer, usage, latency, compacted)
+
+    metrics.observe("turn", latency)
+    metrics.inc("turns", cached=str(cached).lower())
+    metrics.inc("tokens", stats.input_tokens, kind="input")
+    metrics.inc("tokens", stats.cached_tokens, kind="cached")
+    metrics.inc("tokens", stats.output_tokens, kind="output")
+    tracing.annotate_trace(
+        inputs={"user_question": user_question}, outputs={"answer": answer},
+        session=st.session_state.session_id, model=request["model"], turn=stats.turn, cached=cached,
+        response_id=response_id, input_tokens=stats.input_tokens, cached_tokens=stats.cached_tokens,
+        output_tokens=stats.output_tokens,
+    )
+    metrics.log_turn({
+        "session": st.session_state.session_id,
+        "model": request["model"],
+        "verbosity": assistant.request_verbosity(request),
+        "prompt_topics": assistant.request_topics(request),
+        "turn": stats.turn,
+        "cached": cached,
+        "compacted": compacted,
+        "retrieval_reused": retriever is None and "tools" not in request,
+        "latency_s": stats.latency_s,
+        "first_token_s": first_token_s,
+        "input_tokens": stats.input_tokens,
+        "cached_tokens": stats.cached_tokens,
+        "output_tokens": stats.output_tokens,
+        "history_resident_kb": st.session_state.messages.stats()["resident_kb"],
+    })
+    speculate_follow_up(answer, response_id)
+
+def speculate_follow_up(answer: str, response_id: str):
+    """Answer the follow-up question this answer suggests, in the background"""
+    if not config.SPECULATION_ENABLED or not response_id:
+        return
+    question = extract_follow_up(answer)
+    if question is None:
+        return
+    if st.session_state.speculations_left <= 0:
+        speculator.count("skipped_budget")
+        return
+    st.session_state.speculations_left -= 1
+    request, _ = begin_turn(question, speculative=True)
+    client = get_client()
+    # All speculative calls share one lane of the fair queue, so they never crowd out real turns
+    speculator.launch(
+        st.session_state.session_id, question, response_id,
+        lambda: assistant.create_response(client, request, scheduler, "speculation"),
+    )
+
+def claim_speculation(user_question: str):
+    """The speculation matching this follow-up, done or still running (a Future), or None"""
+    if not config.SPECULATION_ENABLED:
+        return None
+    return speculator.claim(st.session_state.session_id, user_question, st.session_state.last_response_id)
 
-# System instructions
-SYSTEM_INSTRUCTIONS = """
-You are Cyber Diogo, the assistant for the best "Time Series Course" in the world.
-Be concise, direct, and practical. Use active voice. No fluff.
-
-Primary objective
-- Answer questions about the course content and code using the attached Vector Store (transcripts and .py files).
-- Prefer retrieved facts over memory. If the files don't cover it, say so.
-
-Retrieval & citations
-- Always use File Search first.
-- Ground every substantive answer in retrieved snippets.
-- If nothing relevant is found, say: "I don't see this in the course files." Then propose the most likely Sections.
-
-Answer style
-- Keep outputs scannable: short paragraphs, bullets for steps, and minimal runnable code blocks for Python.
-- If "how to do X in Python", show a small snippet with imports and comments.
-- End by asking a question to the user that could be asked in the future.
-- write like talking to a friend. Be approachable, friendly, fun.
-
-Boundaries
-- Don't invent references or numbers.
-- If the question is off-scope (not time series/Python/this curriculum), ask a brief clarifying question or answer at a high level and flag it as outside the course corpus.
-
-Context: Course map & typical intents
-- Part 1: Time Series Analysis (EDA, time index, data manipulation, visualization, decomposition, ACF/PACF, role play, "useful functions" script, section recap, pitfalls case study).
-- Exponential Smoothing & Holt-Winters: SES, DES, TES; train/test split; metrics (MAE, RMSE, MAPE); daily data; "predicting the future"; pros/cons; capstone "Air miles".
-- ARIMA/SARIMA/SARIMAX: stationarity, AR/MA/ARIMA, AIC/BIC, SARIMA, SARIMAX with exogenous regressors, CV, parameter tuning (setup, results), future prediction setup, Q&A highlight on future data; pros/cons.
-- Part 2: Modern Forecasting — Prophet: structural TS, holidays/regressors, CV, metrics, fixing anomalies, feature engineering, tuning, forecasting, visualization; pros/cons; capstone challenges.
-- Part 3: Deep Learning — LSTM: RNN/LSTM basics, data prep/time covariates/scaling, model/training, CV, parameter grids/tuning rounds, multi-series (M4), visualization of results, forecasting; pros/cons.
-- TFT (Temporal Fusion Transformers): covariates (past/future/static), scaling, model params, training/CV, tuning, forecasting/interpretability, key takeaways; multi-series TFT capstone.
-- N-BEATS: architecture, series/covariates/scaling, params, model training, CV, tuning and best params, forecasting; pros/cons and learnings.
-- GenAI for Time Series: Amazon Chronos — setup, params, model, CV, tuning, visualization; pros/cons and learnings.
-- Google TSMixer: setup, data processing, params, model, CV, tuning, forecasting, key learnings.
-- LinkedIn Silverkite: model components (growth, seasonality, changepoints, regressors/lagged), CV, tuning, visualization; Prophet vs Silverkite notes; warnings/changes.
-- Capstones: Holt-Winters (Air miles), Prophet, Multiple Series with TFT, Automated TS Forecasting pipeline.
-- Appendix: Python & Pandas refreshers (I/O, cleaning, manipulation, analysis, viz) and fundamentals (types, ops, loops, dicts, functions), plus challenges and labs.
-
-What to prioritize per topic
-- Definitions & when-to-use: ARIMA vs SARIMA vs SARIMAX; SES/DES/TES selection; Prophet vs Silverkite; LSTM/TFT/N-BEATS differences.
-- Practical steps: train/test split for TS, cross-validation methods, parameter grids, evaluation (MAE/RMSE/MAPE), handling seasonality/holidays/regressors, dealing with future covariates.
-- Code pointers: "Show the Holt-Winters code", "Where do we compute MAPE?", "How is CV implemented?", "How are exogenous regressors added in SARIMAX?", "How do we scale/features for LSTM/TFT?"
-
-If the user references a lecture/section by name/number, search for files whose names contain that stem and focus your answer there.
-NEVER use specific lecture numbers or titles in your answers as they change.
-If you don't have the answer, or the user is talking about something that is not in the course, say so.
-"""
+def speculation_settled(speculation, deadline: float) -> bool:
+    """Wait up to one repaint interval for a claimed speculation; True once it's done or out of time"""
+    futures.wait([speculation], timeout=config.STREAM_RENDER_INTERVAL)
+    return speculation.done() or time.monotonic() >= deadline
 
-INITIAL_ASSISTANT_MESSAGE = """
-I'm Cyber Diogo, your Time Series assistant! 🚀
-Ask me anything about the course or code—models, tuning, or "why did we do X here?"
-Try: "ARIMA vs SARIMA—when to use each?", "Show the LSTM code we used", or "When to use NBEATS vs TFT?"
-"""
+def serve_speculation(speculation, user_question: str, request: dict, started: float, compacted: bool):
+    """Serve a settled speculation's answer; returns the text, or None to make the call after all"""
+    resp = speculator.result(speculation, timeout=0)
+    if resp is None:
+        return None
+    remember_retrieval(user_question, None, resp)
+    finish_turn(user_question, request, resp.output_text, resp.id, resp.usage, started, compacted, cached=True)
+    return resp.output_text
+
+def record_first_token(seconds: float):
+    """Record time-to-first-token and attach it to the active trace, if any"""
+    metrics.observe("first_token", seconds)
+    tracing.annotate_trace(time_to_first_token_s=round(seconds, 3))
+    if not LANGSMITH_AVAILABLE or config.TRACING_BACKEND != "langsmith":
+        return
+    from langsmith import get_current_run_tree
+
+    run_tree = get_current_run_tree()
+    if run_tree is None:
+        return
+    # LangSmith derives first-token latency from the first "new_token" event
+    run_tree.add_event({"name": "new_token", "time": datetime.utcnow().isoformat()})
+    run_tree.metadata["time_to_first_token_s"] = round(seconds, 3)
+
+def lookup_cached_answer(user_question: str, request: dict):
+    """Serve first-turn questions from the shared answer cache"""
+    if not config.ANSWER_CACHE_ENABLED or st.session_state.conversation.depth:
+        return None
+    hit = answer_cache.get(user_question, request["model"], assistant.request_verbosity(request), retrieval_scope())
+    if hit is not None:
+        # Follow-ups chain from the cached response, branching a new conversation
+        finish_turn(user_question, request, hit.answer, hit.response_id, cached=True)
+    return hit
+
+def store_cached_answer(user_question: str, request: dict, answer: str, response_id: str):
+    """Remember a first-turn answer for other sessions"""
+    if not config.ANSWER_CACHE_ENABLED or st.session_state.conversation.depth or not answer:
+        return
+    answer_cache.put(
+        user_question, answer, response_id,
+        request["model"], assistant.request_verbosity(request), retrieval_scope(),
+    )
+
+def coalescing_key(user_question: str, request: dict):
+    """Identity of a first-turn request for sharing one upstream call across sessions"""
+    if not config.SINGLE_FLIGHT_ENABLED or st.session_state.conversation.depth:
+        return None
+    return (normalize_question(user_question), request["model"], assistant.request_verbosity(request), retrieval_scope())
+
+def shared_call_cancelled(error: RequestCancelledError) -> UpstreamUnavailableError:
+    """What the sessions sharing a coalesced call see when its leader was cancelled: the busy message"""
+    return UpstreamUnavailableError(f"Shared request cancelled ({error.reason})")
+
+def shared_call_timed_out(error: TimeoutError) -> DeadlineExceededError:
+    """What a session waiting on a coalesced call sees when the leader outlasts its deadline: the busy message"""
+    return DeadlineExceededError(f"Shared request still running at the turn deadline ({error})")
 
 # OpenAI client setup
-@traceable if LANGSMITH_AVAILABLE else lambda x: x
-def ask_bot(user_question: str, verbosity: str = "low"):
-    common_kwargs = {
-        "model": "gpt-5-nano",
-        "tools": [{"type": "file_search", "vector_store_ids": [st.session_state.vector_store_id]}],
-        "text": {"verbosity": verbosity}
-        }
-
-    if st.session_state.last_response_id:
-        # Continue the same conversation on the server
-        resp = client.responses.create(
-            previous_response_id=st.session_state.last_response_id,
-            input=[{"role": "user", "content": user_question}],
-            **common_kwargs,
-        )
-    else:
-        # First turn: seed with system + initial assistant message
-        resp = client.responses.create(
-            input=[
-                {"role": "system", "content": SYSTEM_INSTRUCTIONS},
-                {"role": "assistant", "content": INITIAL_ASSISTANT_MESSAGE},
-                {"role": "user", "content": user_question},
-            ],
-            **common_kwargs,
-        )
-
-    st.session_state.last_response_id = resp.id
-    print(resp.output_text)
+@trace_turn
+def ask_bot(user_question: str, verbosity: Optional[str] = None, cancel: Optional[CancelToken] = None,
+            heartbeat=None):
+    """Answer in one piece; the call runs on a TurnWorker and heartbeat() is called between polls"""
+    request, compacted = begin_turn(user_question, verbosity)
+    hit = lookup_cached_answer(user_question, request)
+    if hit is not None:
+        return hit.answer
+
+    started = time.perf_counter()
+    speculation = claim_speculation(user_question)
+    if speculation is not None:
+        # Usually done already; if not, keep repainting (and stay interruptible) until it is
+        deadline = time.monotonic() + config.TURN_DEADLINE_SECONDS
+        while not speculation_settled(speculation, deadline):
+            if heartbeat is not None:
+                heartbeat()
+        speculated = serve_speculation(speculation, user_question, request, started, compacted)
+        if speculated is not None:
+            return speculated
+    key = coalescing_key(user_question, request)
+    # Session state is only readable on the script thread
+    client, session_id = get_client(), st.session_state.session_id
+    def call(token):
+        try:
+            return assistant.create_response(client, request, scheduler, session_id, metrics=metrics, cancel=token)
+        except RequestCancelledError as e:
+            if key is None:
+                raise
+            raise shared_call_cancelled(e) from e
+
+    def run(token, emit):
+        if key is None:
+            return call(token), False
+        # Identical concurrent first turns share one call; each session still
+        # chains its own follow-ups from the shared response id
+        try:
+            return single_flight.do(key, lambda: call(token), timeout=config.TURN_DEADLINE_SECONDS)
+        except TimeoutError as e:
+            raise shared_call_timed_out(e) from e
+
+    worker = TurnWorker(run, cancel)
+    for _ in worker.events(time.monotonic() + config.TURN_DEADLINE_SECONDS, config.STREAM_RENDER_INTERVAL):
+        if heartbeat is not None:
+            heartbeat()
+    resp, shared = worker.result
+
+    remember_retrieval(user_question, request, resp)
+    finish_turn(user_question, request, resp.output_text, resp.id,
+                None if shared else resp.usage, started, compacted, cached=shared)
     return resp.output_text
 
+@trace_stream
+def ask_bot_stream(user_question: str, verbosity: Optional[str] = None, cancel: Optional[CancelToken] = None):
+    """Stream the answer, yielding text deltas as they arrive
+
+    The stream is read on a TurnWorker; while nothing arrives an empty
+    string is yielded every STREAM_RENDER_INTERVAL so the caller keeps
+    repainting (and stays interruptible).
+    """
+    request, compacted = begin_turn(user_question, verbosity)
+    hit = lookup_cached_answer(user_question, request)
+    if hit is not None:
+        yield hit.answer
+        return
+
+    started = time.perf_counter()
+    speculation = claim_speculation(user_question)
+    if speculation is not None:
+        # Usually done already; if not, keep repainting until it is
+        deadline = time.monotonic() + config.TURN_DEADLINE_SECONDS
+        while not speculation_settled(speculation, deadline):
+            yield ""
+        speculated = serve_speculation(speculation, user_question, request, started, compacted)
+        if speculated is not None:
+            yield speculated
+            return
+    key = coalescing_key(user_question, request)
+    deadline = time.monotonic() + config.TURN_DEADLINE_SECONDS
+    flight = None
+    if key is not None:
+        flight, leader = single_flight.begin(key)
+        if not leader:
+            # An identical first turn is already streaming for another session
+            while not flight.wait(config.STREAM_RENDER_INTERVAL) and time.monotonic() < deadline:
+                yield ""
+            try:
+                response = single_flight.wait(flight, timeout=0)
+            except TimeoutError as e:
+                raise shared_call_timed_out(e) from e
+            remember_retrieval(user_question, request, response)
+            finish_turn(user_question, request, response.output_text, response.id,
+                        started=started, compacted=compacted, cached=True)
+            yield response.output_text
+            return
+
+    response = None
+    error = None
+    worker = None
+    try:
+        client, session_id = get_client(), st.session_state.session_id
+        upstream = {}
+
+        def open_stream(remaining):
+            return client.responses.create(stream=True, timeout=remaining, **request)
+
+        def read_stream(token, emit):
+            # Hold a scheduler slot for the whole stream; retries only happen before the first event
+            with tracing.span("responses.create", run_type="llm", model=request["model"], stream=True), \
+                    (scheduler.slot(session_id, deadline, token) if scheduler is not None else nullcontext()):
+                upstream["started"] = time.perf_counter()
+                if scheduler is None:
+                    # Thin client: the chat backend queues, rate-limits and retries
+                    stream = open_stream(max(0.0, deadline - time.monotonic()))
+                else:
+                    stream = scheduler.run_with_retries(open_stream, deadline, token)
+                # Cancelling disconnects at once, so a blocked read fails instead of waiting for the next event
+                assistant.close_on_cancel(stream, token)
+                try:
+                    for event in stream:
+                        if token.cancelled:
+                            break
+                        emit(event)
+                finally:
+                    # Closing disconnects, so upstream stops generating a cancelled answer
+                    close = getattr(stream, "close", None)
+                    if close is not None:
+                        close()
+
+        first_token_s = None
+        worker = TurnWorker(read_stream, cancel)
+        for event in worker.events(deadline, config.STREAM_RENDER_INTERVAL):
+            if event is None:
+                yield ""
+            elif event.type == "response.output_text.delta":
+                if first_token_s is None:
+                    first_token_s = time.perf_counter() - started
+                    record_first_token(first_token_s)
+                yield event.delta
+            elif event.type == "response.completed":
+                # The completion event carries the id needed to chain follow-ups
+                response = event.response
+                metrics.observe("upstream", time.perf_counter() - upstream["started"])
+                remember_retrieval(user_question, request, response)
+                finish_turn(user_question, request, response.output_text, response.id,
+                            response.usage, started, compacted, first_token_s=first_token_s)
+            elif event.type == "response.failed":
+                raise RuntimeError(f"Response failed: {event.response.error}")
+            elif event.type == "error":
+                raise RuntimeError(f"Response stream error: {event.message}")
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        if worker is not None and response is None:
+            # Closed early or failed: don't leave the stream holding a slot
+            worker.cancel("abandoned")
+        if flight is not None:
+            if isinstance(error, RequestCancelledError):
+                error = shared_call_cancelled(error)
+            elif response is None and error is None:
+                error = UpstreamUnavailableError("The shared request ended before completing")
+            single_flight.finish(key, flight, result=response, error=error)
+
 def reset_conversation():
     """Reset the conversation history."""
     st.session_state.last_response_id = None
-    st.session_state.messages = []
+    st.session_state.messages.clear()
+    st.session_state.history_pages = 0
+    st.session_state.conversation.reset()
+    speculator.discard(st.session_state.session_id)
+    retrieval_cache.discard(st.session_state.session_id)
     st.rerun()
 
 # Main app
 def main():
     # Add LangSmith tracing for app startup
-    if LANGSMITH_AVAILABLE and is_langsmith_configured():
+    if settings["langsmith_enabled"]:
         print("🚀 App started - LangSmith tracing active")
-        config = get_langsmith_config()
-        print(f"📊 Project: {config['project']}, Environment: {config['environment']}")
+        langsmith_config = settings["langsmith"]
+        print(f"📊 Project: {langsmith_config['project']}, Environment: {langsmith_config['environment']}")
     elif LANGSMITH_AVAILABLE:
         print("🚀 App started - LangSmith available but not configured")
     else:
@@ -517,9 +675,11 @@ def main():
 
     
     # Load vector store
-    if not st.session_state.vector_store_id:
+    if retriever is None and not st.session_state.vector_store_id:
         st.session_state.vector_store_id = load_vector_store()
-    
+
+    startup_profile.mark("header")
+
     # Sidebar
     with st.sidebar:
         st.header("⚙️ Settings")
@@ -531,6 +691,43 @@ def main():
         # Reset button
         if st.button("🔄 Reset Conversation", type="secondary"):
             reset_conversation()
+
+        # Any click outside the chat interrupts an answer being written; this one does nothing else
+        st.button("⏹️ Stop Answer", type="secondary", help="Stop the answer being written and keep what has arrived")
+
+        # Example questions (pre-warmed, so these answer instantly)
+        st.markdown("### 💡 Try Asking")
+        for question in config.EXAMPLE_QUESTIONS:
+            if st.button(question, key=f"example_{question}", use_container_width=True):
+                st.session_state.pending_question = question
+
+        if config.SHOW_PERF_STATS:
+            with st.expander("📊 Performance", expanded=False):
+                st.caption("Answer cache")
+                st.json(answer_cache.stats())
+                st.caption("Stage latency")
+                st.json(metrics.summary())
+                st.caption("Model routing")
+                st.json(router.stats())
+                if scheduler is not None:
+                    st.caption("Request scheduler")
+                    st.json(scheduler.stats())
+                st.caption("Request coalescing")
+                st.json(single_flight.stats())
+                if config.SPECULATION_ENABLED:
+                    st.caption("Speculative follow-ups")
+                    st.json(speculator.stats())
+                if retriever is None and config.RETRIEVAL_REUSE_ENABLED:
+                    st.caption("Reused file_search results")
+                    st.json(retrieval_cache.stats())
+                st.caption("Chat history (this session)")
+                st.json(st.session_state.messages.stats())
+                st.caption("Conversation turns (tokens / latency)")
+                st.dataframe(st.session_state.conversation.report(), hide_index=True)
+                prewarmer = example_prewarmer()
+                if prewarmer is not None:
+                    st.caption("Example pre-warming")
+                    st.json(prewarmer.status())
         
         # Feedback section
         st.markdown("---")
@@ -565,20 +762,8 @@ def main():
         # Support section
         st.markdown("### 💝 Support This App")
         st.markdown("Help keep this Time Series Course Assistant free and running!")
-        
-        
-        # Buy Me a Coffee button
-        button(
-            username="diogoalvesx",  # Replace with your actual username
-            floating=True,
-            text="Buy me a coffee",
-            emoji="☕",
-            bg_color="#0074FF",  # Your brand blue
-            font_color="#FFFFFF",  # White text
-            coffee_color="#FFFFFF",  # White coffee icon
-            width=300
-        )
-        
+
+    startup_profile.mark("sidebar")
 
     
     # Welcome message and capabilities - always visible
@@ -598,19 +783,58 @@ def main():
     st.markdown('<p class="call-to-action">How can I help you? 🚀</p>', unsafe_allow_html=True)
     st.markdown('</div>', unsafe_allow_html=True)
     
+    chat_panel()
+    startup_profile.mark("chat")
+
+    # Below this line the page is already painted
+    enable_code_copy()
+    with st.sidebar:
+        support_button()
+    # Keep the example questions answered in the background
+    example_prewarmer()
+    startup_profile.mark("deferred")
+    startup_profile.finish(config.LOG_DIR / "startup.json")
+
+def example_prewarmer():
+    """The background job answering EXAMPLE_QUESTIONS, started on first call (None when disabled)"""
+    if config.PREWARM_ENABLED and config.ANSWER_CACHE_ENABLED and retrieval_scope():
+        return get_prewarmer(retrieval_scope(), config.DEFAULT_MODEL, DEFAULT_VERBOSITY)
+    return None
+
+def support_button():
+    """Floating Buy Me a Coffee button; streamlit_extras is imported here, after the first paint"""
+    from streamlit_extras.buy_me_a_coffee import button
+
+    button(
+        username="diogoalvesx",  # Replace with your actual username
+        floating=True,
+        text="Buy me a coffee",
+        emoji="☕",
+        bg_color="#0074FF",  # Your brand blue
+        font_color="#FFFFFF",  # White text
+        coffee_color="#FFFFFF",  # White coffee icon
+        width=300
+    )
+
+@st.fragment
+def chat_panel():
+    """History, input form and turn handling; a submitted question reruns only this fragment"""
     # Main chat area - show messages when they exist
+    chat_area = st.container()
     if st.session_state.messages:
-        # Add some spacing before chat messages
-        st.markdown("<br>", unsafe_allow_html=True)
-        
-        # Display chat messages with enhanced styling
-        for i, message in enumerate(st.session_state.messages):
-            # Add timestamp for recent messages
-            timestamp = None
-            if i == len(st.session_state.messages) - 1:
-                timestamp = datetime.now().strftime("%H:%M")
-            
-            display_message(message["role"], message["content"], timestamp)
+        with chat_area:
+            # Add some spacing before chat messages
+            st.markdown("<br>", unsafe_allow_html=True)
+
+            # Older messages live on disk and are paged in on request
+            messages = st.session_state.messages
+            shown_older = min(messages.spilled, st.session_state.history_pages * config.HISTORY_PAGE_SIZE)
+            if shown_older < messages.spilled:
+                st.button(f"⬆️ Load earlier messages ({messages.spilled - shown_older} more)",
+                          key="load_earlier", on_click=load_earlier_messages)
+
+            # Display chat messages with enhanced styling; the newest gets a timestamp
+            display_history(messages.older(shown_older) + list(messages), datetime.now().strftime("%H:%M"))
     
     # Enhanced chat input at the bottom
     col1, col2, col3 = st.columns([1, 3, 1])
@@ -626,7 +850,17 @@ def main():
             
             submitted = st.form_submit_button("🚀 Send", use_container_width=True, type="primary", help="Send your message")
             if submitted and user_input.strip():
-                process_user_input(user_input.strip())
+                process_user_input(user_input.strip(), chat_area)
+
+    # Example question clicked in the sidebar
+    if st.session_state.pending_question:
+        question = st.session_state.pending_question
+        st.session_state.pending_question = None
+        process_user_input(question, chat_area)
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        # Also runs when st.rerun() cuts the script short
+        metrics.observe("rerun", time.perf_counter() - RERUN_STARTED)
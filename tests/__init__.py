@@ -0,0 +1 @@
+"""Unit tests for Time Series Course Assistant"""
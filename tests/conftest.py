@@ -0,0 +1,24 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# The modules live at the project root, next to streamlit_app.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def mock_api():
+    """A fast local mock Responses API (benchmarks.mock_responses_api) and an OpenAI client pointed at it"""
+    import httpx
+    from openai import OpenAI
+
+    from benchmarks.mock_responses_api import MockConfig, start_in_thread
+
+    server = start_in_thread(MockConfig(ttft_ms=1, ttft_sigma=0.0, tokens_per_second=100_000, output_tokens=5,
+                                        file_search_ms=0))
+    client = OpenAI(api_key="sk-mock", base_url=f"http://127.0.0.1:{server.server_address[1]}/v1",
+                    max_retries=0, http_client=httpx.Client(timeout=10))
+    yield server, client
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,86 @@
+import pytest
+
+import answer_cache
+from answer_cache import AnswerCache, cosine, ngram_vector, normalize_question
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(answer_cache.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    return AnswerCache(tmp_path / "answers.sqlite3", ttl_seconds=60, max_entries=3, similarity_threshold=0.9)
+
+
+def test_normalize_folds_case_punctuation_and_spacing():
+    assert normalize_question("  When to use ARIMA vs. SARIMA?? ") == "when to use arima vs sarima"
+
+
+def test_ngram_vectors_are_normalized():
+    vector = ngram_vector("arima vs sarima")
+    assert cosine(vector, vector) == pytest.approx(1.0)
+    assert cosine(vector, ngram_vector("lstm training")) < 0.5
+
+
+def test_exact_hit_ignores_case_and_punctuation(cache):
+    cache.put("When to use ARIMA vs SARIMA?", "Use SARIMA for seasonality.", "resp_1", "m", "low", "vs_1")
+    hit = cache.get("when to use arima vs sarima", "m", "low", "vs_1")
+    assert (hit.answer, hit.response_id, hit.match) == ("Use SARIMA for seasonality.", "resp_1", "exact")
+
+
+def test_key_is_scoped_by_model_verbosity_and_store(cache):
+    cache.put("What is a lag?", "A shifted copy.", None, "m", "low", "vs_1")
+    assert cache.get("What is a lag?", "other", "low", "vs_1") is None
+    assert cache.get("What is a lag?", "m", "medium", "vs_1") is None
+    assert cache.get("What is a lag?", "m", "low", "vs_2") is None
+    assert AnswerCache.make_key(AnswerCache.scope("m", "low", "vs_1"), "q") != \
+        AnswerCache.make_key(AnswerCache.scope("m", "low", "vs_2"), "q")
+
+
+def test_similar_hit_above_threshold_only(cache):
+    cache.put("How do I tune Prophet hyperparameters?", "Use a grid.", None, "m", "low", "vs_1")
+    hit = cache.get("How do I tune the Prophet hyperparameters?", "m", "low", "vs_1")
+    assert hit.match == "similar" and hit.similarity >= 0.9
+    assert cache.get("How do I train an LSTM?", "m", "low", "vs_1") is None
+
+
+def test_entries_expire_after_ttl(cache, clock):
+    cache.put("What is a lag?", "A shifted copy.", None, "m", "low", "vs_1")
+    assert cache.contains("What is a lag?", "m", "low", "vs_1")
+    clock.now += 61
+    assert not cache.contains("What is a lag?", "m", "low", "vs_1")
+    assert cache.get("What is a lag?", "m", "low", "vs_1") is None
+    assert cache.stats()["expired"] == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_is_evicted_over_cap(cache, clock):
+    for i in range(3):
+        cache.put(f"question {i}", f"answer {i}", None, "m", "low", "vs_1")
+        clock.now += 1
+    cache.get("question 0", "m", "low", "vs_1")  # Now the most recently used
+    clock.now += 1
+    cache.put("question 3", "answer 3", None, "m", "low", "vs_1")
+    assert cache.get("question 1", "m", "low", "vs_1") is None
+    assert cache.get("question 0", "m", "low", "vs_1").answer == "answer 0"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_survive_a_restart(tmp_path, clock):
+    path = tmp_path / "answers.sqlite3"
+    AnswerCache(path, 60, 10, 0.9).put("How do I tune Prophet?", "Use a grid.", None, "m", "low", "vs_1")
+    reopened = AnswerCache(path, 60, 10, 0.9)
+    assert reopened.get("how do i tune prophet", "m", "low", "vs_1").match == "exact"
+    assert reopened.get("How do I tune the Prophet?", "m", "low", "vs_1").match == "similar"
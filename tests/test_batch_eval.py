@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+import batch_eval
+from batch_eval import BatchRunner, Script, completed_scripts, load_scripts
+from scheduler import RequestScheduler
+
+SCRIPTS = [
+    Script("single", ["What is SARIMAX?"]),
+    Script("chain", ["How does Prophet handle holidays?", "And custom regressors?"]),
+]
+
+
+@pytest.fixture
+def runner(mock_api):
+    server, client = mock_api
+    scheduler = RequestScheduler(max_concurrency=2, requests_per_minute=60_000, burst=100, max_retries=0)
+    return server.api, BatchRunner(client, scheduler, "vs_mock", model="gpt-4.1", run_id="test")
+
+
+def read_rows(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_scripts_load_from_each_format(tmp_path):
+    (tmp_path / "q.txt").write_text("What is ACF?\n\nWhat is PACF?\n", encoding="utf-8")
+    (tmp_path / "q.jsonl").write_text('{"id": 7, "turns": ["a", "b"]}\n{"question": "c"}\n', encoding="utf-8")
+    (tmp_path / "q.json").write_text('[{"id": "x", "question": "d"}]', encoding="utf-8")
+    (tmp_path / "q.csv").write_text("question\ne\n", encoding="utf-8")
+    assert [s.turns for s in load_scripts(tmp_path / "q.txt")] == [["What is ACF?"], ["What is PACF?"]]
+    jsonl = load_scripts(tmp_path / "q.jsonl")
+    assert (jsonl[0].script_id, jsonl[0].turns) == ("7", ["a", "b"])
+    assert jsonl[1].script_id == load_scripts(tmp_path / "q.jsonl")[1].script_id  # Stable generated ID
+    assert load_scripts(tmp_path / "q.json") == [Script("x", ["d"])]
+    with pytest.raises(ValueError):
+        load_scripts(tmp_path / "q.csv")
+
+
+def test_turns_chain_on_the_previous_response(runner, tmp_path):
+    _, runner = runner
+    output = tmp_path / "eval.jsonl"
+    summary = runner.run(SCRIPTS, output, workers=2)
+    assert (summary["ok"], summary["failed"], summary["turns"]) == (2, 0, 3)
+    assert summary["output_tokens"] > 0 and set(summary["latency_s"]) == {"p50", "p95"}
+    rows = {(row["script_id"], row["turn"]): row for row in read_rows(output)}
+    assert rows[("chain", 2)]["error"] is None and rows[("chain", 2)]["answer"]
+    assert rows[("chain", 1)]["response_id"] != rows[("chain", 2)]["response_id"]
+
+
+def test_rerun_skips_completed_scripts_and_retries_failed_ones(runner, tmp_path):
+    api, runner = runner
+    output = tmp_path / "eval.jsonl"
+    api.config.rate_429 = 1.0
+    failed = runner.run(SCRIPTS[:1], output)
+    assert failed["failed"] == 1 and "429" in read_rows(output)[0]["error"]
+    assert completed_scripts(output) == set()
+
+    api.config.rate_429 = 0.0
+    assert runner.run(SCRIPTS, output)["ok"] == 2
+    assert completed_scripts(output) == {"single", "chain"}
+    requests = api.stats["requests"]
+    again = runner.run(SCRIPTS, output)
+    assert (again["skipped"], again["turns"]) == (2, 0) and api.stats["requests"] == requests
+
+
+def test_torn_last_line_does_not_break_resume(tmp_path):
+    output = tmp_path / "eval.jsonl"
+    output.write_text('{"script_id": "a", "error": null}\n{"script_id": "b", "err', encoding="utf-8")
+    assert completed_scripts(output) == {"a"}
+
+
+def test_example_questions_are_the_default(monkeypatch):
+    monkeypatch.setattr(batch_eval.config, "EXAMPLE_QUESTIONS", ["What is MAPE?"])
+    (script,) = load_scripts()
+    assert script.turns == ["What is MAPE?"] and len(script.script_id) == 12
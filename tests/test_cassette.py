@@ -0,0 +1,73 @@
+import pytest
+
+from cassette import Cassette, CassetteClient, CassetteMissError, Record, request_key, wrap_client
+
+QUESTION = [{"role": "system", "content": "Be brief"}, {"role": "user", "content": "What is a lag?"}]
+
+
+def test_request_key_ignores_timeouts_and_extras():
+    base = {"model": "gpt-4.1", "input": QUESTION}
+    assert request_key(base) == request_key({**base, "timeout": 3.0, "extra_headers": {"X-Id": "1"}})
+    assert request_key(base) != request_key({**base, "model": "gpt-4.1-mini"})
+
+
+def test_record_reads_nested_json_as_attributes():
+    record = Record({"id": "resp_1", "output": [{"type": "message", "content": [{"text": "hi"}]}]})
+    assert record.output[0].content[0].text == "hi"
+    with pytest.raises(AttributeError):
+        record.usage
+
+
+def test_replay_answers_recorded_calls_without_the_api(mock_api, tmp_path):
+    server, client = mock_api
+    path = tmp_path / "calls.jsonl.gz"
+    recorder = CassetteClient(client, Cassette(path), "record")
+    recorded = recorder.responses.create(model="gpt-4.1", input=QUESTION)
+    deltas = [e.delta for e in recorder.responses.create(model="gpt-4.1", input=QUESTION, stream=True)
+              if e.type == "response.output_text.delta"]
+
+    server.shutdown()  # Replay must not need the server
+    cassette = Cassette(path)
+    assert len(cassette) == 2
+    assert cassette.questions() == ["What is a lag?", "What is a lag?"]
+    player = CassetteClient(client, cassette, "replay", latency="zero")
+    replayed = player.responses.create(model="gpt-4.1", input=QUESTION, timeout=1.0)
+    assert (replayed.id, replayed.output_text) == (recorded.id, recorded.output_text)
+    events = list(player.responses.create(model="gpt-4.1", input=QUESTION, stream=True))
+    assert [e.delta for e in events if e.type == "response.output_text.delta"] == deltas
+    assert events[-1].response.output_text == "".join(deltas)
+
+
+def test_closing_a_recording_stream_early_closes_upstream(mock_api, tmp_path):
+    server, client = mock_api
+    recorder = CassetteClient(client, Cassette(tmp_path / "calls.jsonl.gz"), "record")
+    stream = recorder.responses.create(model="gpt-4.1", input=QUESTION, stream=True)
+    next(iter(stream))
+    stream.close()
+    assert stream.stream.response.is_closed
+    assert len(recorder.cassette) == 0  # Abandoned streams aren't saved
+
+
+def test_repeated_calls_replay_in_order_then_repeat_the_last(tmp_path):
+    cassette = Cassette(tmp_path / "calls.jsonl.gz")
+    key = request_key({"model": "gpt-4.1", "input": QUESTION})
+    for answer in ("first", "second"):
+        cassette.append({"key": key, "stream": False, "response": {"output_text": answer}})
+    player = CassetteClient(None, Cassette(cassette.path), "replay", latency="zero")
+    answers = [player.responses.create(model="gpt-4.1", input=QUESTION).output_text for _ in range(3)]
+    assert answers == ["first", "second", "second"]
+
+
+def test_unrecorded_call_is_a_miss(tmp_path):
+    player = CassetteClient(None, Cassette(tmp_path / "empty.jsonl.gz"), "replay")
+    with pytest.raises(CassetteMissError) as e:
+        player.responses.create(model="gpt-4.1", input="Never asked")
+    assert "Replay mode" in e.value.user_message
+    assert player.cassette.stats["misses"] == 1
+
+
+def test_other_modes_leave_the_client_alone(tmp_path):
+    client = object()
+    assert wrap_client(client, "off", tmp_path / "calls.jsonl.gz") is client
+    with pytest.raises(ValueError):
+        CassetteClient(client, Cassette(tmp_path / "calls.jsonl.gz"), "rewind")
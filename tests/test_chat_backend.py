@@ -0,0 +1,93 @@
+import httpx
+import pytest
+from openai import AsyncOpenAI
+from starlette.testclient import TestClient
+
+from chat_backend import AsyncGate, BackendClient, ChatBackend, create_app
+from scheduler import FRIENDLY_MESSAGE, RequestScheduler, UpstreamUnavailableError
+
+REQUEST = {"model": "gpt-4.1", "input": [{"role": "user", "content": "What is a lag?"}]}
+
+
+@pytest.fixture
+def backend(mock_api):
+    server, _ = mock_api
+    client = AsyncOpenAI(api_key="sk-mock", base_url=f"http://127.0.0.1:{server.server_address[1]}/v1",
+                         max_retries=0)
+    scheduler = RequestScheduler(max_concurrency=2, requests_per_minute=60_000, burst=100, max_retries=0)
+    return server.api, ChatBackend(client, AsyncGate(scheduler, max_concurrency=2, max_queue=10), "vs_mock")
+
+
+@pytest.fixture
+def http(backend):
+    with TestClient(create_app(backend[1])) as client:
+        yield client
+
+
+@pytest.mark.parametrize("body", [b"{not json", b"[1, 2]", b'{"stream": true}'])
+def test_malformed_body_is_a_400(http, body):
+    response = http.post("/v1/turns", content=body, headers={"Content-Type": "application/json"})
+    assert response.status_code == 400
+    assert response.json()["error"]["type"] in ("JSONDecodeError", "ValueError")
+
+
+def test_turn_returns_the_response_json_and_frees_its_slot(backend, http):
+    _, chat = backend
+    response = http.post("/v1/turns", json={"request": REQUEST})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["object"] == "response" and body["output_text"]
+    gate = http.get("/v1/stats").json()["gate"]
+    assert (gate["granted"], gate["active"]) == (1, 0)
+    assert chat.stats["completed"] == 1
+
+
+def test_bare_question_is_built_into_a_request(http):
+    response = http.post("/v1/turns", json={"question": "What is SARIMAX?", "model": "gpt-4.1"})
+    assert response.status_code == 200 and response.json()["output_text"]
+
+
+def test_stream_is_relayed_as_sse(backend, http):
+    _, chat = backend
+    with http.stream("POST", "/v1/turns", json={"request": REQUEST, "stream": True}) as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        lines = list(response.iter_lines())
+    assert "event: response.completed" in lines
+    assert chat.stats["streamed"] == 1 and chat.gate.stats()["active"] == 0
+
+
+def test_upstream_rejection_is_a_503_with_the_busy_message(backend, http):
+    api, _ = backend
+    api.config.rate_429 = 1.0
+    response = http.post("/v1/turns", json={"request": REQUEST})
+    assert response.status_code == 503
+    assert response.json()["error"]["user_message"] == FRIENDLY_MESSAGE
+
+
+def test_full_queue_is_shed(backend, http):
+    _, chat = backend
+    chat.gate.max_queue = 0
+    assert http.post("/v1/turns", json={"request": REQUEST}).status_code == 503
+    assert chat.gate.stats()["shed"] == 1
+
+
+def test_backend_client_reads_like_the_sdk(backend, http):
+    api, _ = backend
+    client = BackendClient(str(http.base_url), http_client=http)
+    resp = client.responses.create(timeout=10, **REQUEST)
+    assert resp.output_text and resp.id.startswith("resp")
+
+    events = list(client.responses.create(stream=True, timeout=10, **REQUEST))
+    deltas = "".join(e.delta for e in events if e.type == "response.output_text.delta")
+    assert events[-1].type == "response.completed" and events[-1].response.output_text == deltas
+
+    api.config.rate_429 = 1.0
+    with pytest.raises(UpstreamUnavailableError) as e:
+        client.responses.create(**REQUEST)
+    assert e.value.user_message == FRIENDLY_MESSAGE
+
+
+def test_unreachable_backend_is_unavailable():
+    client = BackendClient("http://127.0.0.1:9", http_client=httpx.Client(timeout=1.0))
+    with pytest.raises(UpstreamUnavailableError):
+        client.responses.create(**REQUEST)
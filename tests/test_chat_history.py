@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+import chat_history
+from chat_history import ChatHistory, HistoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return HistoryStore(tmp_path / "history.db", retention_seconds=3600)
+
+
+def fill(history: ChatHistory, count: int) -> None:
+    for i in range(count):
+        history.append("user" if i % 2 == 0 else "assistant", f"message {i}")
+
+
+def test_older_messages_spill_to_the_store(store):
+    history = ChatHistory("s1", store, window=4, max_messages=100)
+    fill(history, 10)
+    assert len(history) == 10 and history.spilled == 6
+    assert [m.content for m in history] == [f"message {i}" for i in range(6, 10)]
+    assert [m.content for m in history.older(2)] == ["message 4", "message 5"]
+    assert [m.seq for m in history.older(100)] == list(range(6))
+    assert store.stats() == {"spilled_sessions": 1, "spilled_messages": 6}
+
+
+def test_total_is_capped_by_dropping_the_oldest(store):
+    history = ChatHistory("s1", store, window=3, max_messages=5)
+    fill(history, 9)
+    assert len(history) == 5
+    assert [m.seq for m in history.older(10)] == [4, 5]
+    assert [m.seq for m in history] == [6, 7, 8]
+
+
+def test_without_a_store_only_the_window_is_kept():
+    history = ChatHistory("s1", None, window=3, max_messages=10)
+    fill(history, 5)
+    assert len(history) == 3 and history.spilled == 0
+    assert history.older(5) == []
+
+
+def test_clear_deletes_the_session_spill_only(store):
+    mine, theirs = ChatHistory("s1", store, 2, 10), ChatHistory("s2", store, 2, 10)
+    fill(mine, 5)
+    fill(theirs, 5)
+    mine.clear()
+    assert not mine
+    assert store.stats() == {"spilled_sessions": 1, "spilled_messages": 3}
+
+
+def test_prune_drops_spilled_rows_past_retention(store, monkeypatch):
+    history = ChatHistory("s1", store, window=1, max_messages=10)
+    fill(history, 3)
+    now = time.time()
+    monkeypatch.setattr(chat_history.time, "time", lambda: now + 7200)
+    assert store.prune() == 2
+    assert store.stats()["spilled_messages"] == 0
+
+
+def test_live_stats_cover_live_sessions(store):
+    before = chat_history.live_stats()["sessions"]
+    history = ChatHistory("s1", store, window=4, max_messages=10)
+    fill(history, 2)
+    stats = chat_history.live_stats()
+    assert stats["sessions"] == before + 1
+    assert history.stats()["resident_messages"] == 2 and history.stats()["resident_kb"] > 0
@@ -0,0 +1,49 @@
+from code_blocks import code_block_html, highlight, render_code_blocks
+
+ANSWER = """Fit the model:
+
+```python
+from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+model = SARIMAX(y, order=(1, 1, 1))
+```
+
+Then forecast."""
+
+
+def test_complete_fences_become_one_line_of_html():
+    rendered = render_code_blocks(ANSWER)
+    assert "```" not in rendered and rendered.startswith("Fit the model:\n\n")
+    block = rendered.split("\n")[2]
+    assert block.startswith('<div class="code-block">') and '<span class="code-label">python</span>' in block
+    assert "&#10;&#10;" in block  # The blank line inside the code, kept in the same HTML block
+    assert rendered.endswith("\n\nThen forecast.")
+
+
+def test_unclosed_fence_is_left_for_the_next_repaint():
+    partial = ANSWER[:ANSWER.index("model =")]
+    assert render_code_blocks(partial) == partial
+    assert render_code_blocks("No code here") == "No code here"
+
+
+def test_code_is_escaped_and_highlighted():
+    html = highlight('print("<b>")', "python")
+    assert "<b>" not in html and "&lt;" in html
+    assert 'class="nb"' in html  # Pygments token class for the print builtin
+    assert "<script>" not in highlight("<script>", "no-such-language")
+
+
+def test_indented_fence_in_a_list_item():
+    markdown = "1. Run:\n   ```bash\n   pip install prophet\n   ```\n2. Import it."
+    rendered = render_code_blocks(markdown)
+    assert rendered.startswith("1. Run:\n   <div")
+    assert "<code>pip<" in rendered  # The list item's indent is not part of the code
+    assert rendered.endswith("2. Import it.")
+
+
+def test_blocks_are_memoized_by_content():
+    code_block_html.cache_clear()
+    render_code_blocks(ANSWER)
+    render_code_blocks(ANSWER + "\n\nAnything else?")
+    info = code_block_html.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
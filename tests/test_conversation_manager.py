@@ -0,0 +1,53 @@
+from types import SimpleNamespace
+
+from conversation_manager import ConversationManager
+
+
+def usage(input_tokens: int, cached: int = 0, output: int = 50) -> SimpleNamespace:
+    return SimpleNamespace(input_tokens=input_tokens, output_tokens=output,
+                           input_tokens_details=SimpleNamespace(cached_tokens=cached))
+
+
+def test_compaction_once_the_chain_crosses_the_budget():
+    manager = ConversationManager(token_budget=1000)
+    manager.record_turn("What is ARIMA?", "A model.", usage(400), 1.0)
+    assert not manager.needs_compaction()
+    manager.record_turn("And SARIMA?", "Seasonal ARIMA.", usage(1200, cached=300), 1.0)
+    assert manager.needs_compaction()
+    stats = manager.record_turn("Show code", "model = SARIMAX(...)", usage(200), 1.0, compacted=True)
+    assert (stats.turn, stats.chain) == (3, 2)
+    assert not manager.needs_compaction()
+    assert manager.report()[1]["cached_tokens"] == 300
+
+
+def test_zero_budget_never_compacts():
+    manager = ConversationManager(token_budget=0)
+    manager.record_turn("q", "a", usage(10 ** 6), 1.0)
+    assert not manager.needs_compaction()
+
+
+def test_compacted_history_summarizes_older_turns_and_keeps_recent_ones():
+    manager = ConversationManager(token_budget=1000, keep_turns=1)
+    manager.record_turn("What is ARIMA? Explain it.", "An autoregressive model. It differences.", None, 1.0)
+    manager.record_turn("What is SARIMA?", "ARIMA with seasonal terms.", None, 1.0)
+    summary, question, answer = manager.compacted_history()
+    assert summary["role"] == "system"
+    assert "- Q: What is ARIMA? → A: An autoregressive model." in summary["content"]
+    assert "SARIMA" not in summary["content"]
+    assert (question, answer) == ({"role": "user", "content": "What is SARIMA?"},
+                                  {"role": "assistant", "content": "ARIMA with seasonal terms."})
+
+
+def test_summary_keeps_the_freshest_turns_within_its_budget():
+    manager = ConversationManager(token_budget=1000, keep_turns=0, summary_chars=60)
+    for i in range(5):
+        manager.record_turn(f"Question {i}?", f"Answer {i}.", None, 1.0)
+    summary = manager.compacted_history()[0]["content"]
+    assert "Question 4" in summary and "Question 0" not in summary
+
+
+def test_reset_starts_a_new_conversation():
+    manager = ConversationManager(token_budget=1000)
+    manager.record_turn("q", "a", usage(2000), 1.0)
+    manager.reset()
+    assert manager.depth == 0 and not manager.needs_compaction() and manager.report() == []
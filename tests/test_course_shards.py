@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+import course_shards
+from course_shards import GENERAL, QueryRouter, Route, part_of, stem_phrase
+
+PATHS = [
+    "Part 1/02_holt_winters.py",
+    "Part 1/03_arima.py",
+    "Part 1/04_sarima.py",
+    "Part 1/05_sarimax_exogenous.py",
+    "Part 2/prophet.py",
+    "Part 2/03_prophet_holidays.txt",
+    "Part 3/07_lstm_model.py",
+    "intro.txt",
+]
+
+
+@pytest.fixture
+def router():
+    return QueryRouter.from_paths(PATHS, max_parts=2)
+
+
+def test_part_of_uses_folders_and_name():
+    assert part_of("Part 2/06_prophet_cv.py") == "prophet"
+    assert part_of("tft/01_covariates.py") == "tft"
+    assert part_of("misc/intro.txt") == GENERAL
+
+
+def test_stem_phrase_drops_lecture_number():
+    assert stem_phrase("04_sarimax_exogenous") == "sarimax exogenous"
+    assert stem_phrase("prophet") == "prophet"
+
+
+def test_topic_word_routes_to_part_not_file(router):
+    route = router.route("How does Prophet handle holidays?")
+    assert route == Route(["prophet", GENERAL])
+    assert route.filters() == {"type": "or", "filters": [
+        {"type": "eq", "key": "part", "value": "prophet"},
+        {"type": "eq", "key": "part", "value": GENERAL},
+    ]}
+
+
+def test_stem_is_not_matched_inside_another_word(router):
+    route = router.route("ARIMA vs SARIMA, which one?")
+    assert route.stems == []
+    assert route.parts == ["arima", GENERAL]
+
+
+def test_full_stem_names_a_file(router):
+    route = router.route("Explain 05_sarimax_exogenous.py")
+    assert route == Route(["arima"], ["05_sarimax_exogenous"])
+    assert route.filters() == {"type": "eq", "key": "stem", "value": "05_sarimax_exogenous"}
+
+
+def test_stem_phrase_names_a_file(router):
+    assert router.route("show me the prophet holidays lecture").stems == ["03_prophet_holidays"]
+    assert router.route("the sarimax exogenous script").stems == ["05_sarimax_exogenous"]
+
+
+def test_too_many_or_no_parts_search_everything(router):
+    assert router.route("Compare LSTM, Prophet and SARIMAX").filters() is None
+    assert router.route("Hello there").filters() is None
+
+
+def test_stats_count_routes(router):
+    router.route("Explain 05_sarimax_exogenous")
+    router.route("How does Prophet handle holidays?")
+    router.route("Hello there")
+    stats = router.stats()
+    assert (stats["routed_to_file"], stats["routed_to_parts"], stats["searched_all"]) == (1, 1, 1)
+    assert stats["narrowed_rate"] == pytest.approx(0.667)
+
+
+def test_store_router_needs_every_file_tagged(tmp_path, monkeypatch):
+    monkeypatch.setattr(course_shards, "_store_routers", {})
+    files = {path: {"part": part_of(path)} for path in PATHS}
+    (tmp_path / "vs_tagged.json").write_text(json.dumps({"vector_store_id": "vs_tagged", "files": files}))
+    files["intro.txt"] = {}
+    (tmp_path / "vs_untagged.json").write_text(json.dumps({"vector_store_id": "vs_untagged", "files": files}))
+
+    assert course_shards.store_router("vs_tagged", tmp_path).route("How are LSTM layers stacked?").parts == ["lstm", GENERAL]
+    assert course_shards.store_router("vs_untagged", tmp_path) is None
+    assert course_shards.store_router("vs_missing", tmp_path) is None
+    assert course_shards.routing_stats()["vs_untagged"] == {"enabled": False}
@@ -0,0 +1,58 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from local_retrieval import LocalIndex, ShardedIndex, chunk_text, load_or_build  # noqa: E402
+
+LECTURES = {
+    "prophet/03_prophet_holidays.txt": "Prophet takes a holidays dataframe with the holiday name and date. " * 20,
+    "prophet/04_prophet_cv.py": "df_cv = cross_validation(m, initial='730 days', horizon='30 days') " * 20,
+    "lstm/05_lstm_cv.py": "LSTM cross validation walks forward over the series with an expanding window. " * 20,
+    "arima/06_sarimax_exogenous.py": "SARIMAX takes exogenous regressors through the exog argument. " * 20,
+}
+
+
+@pytest.fixture
+def materials(tmp_path):
+    root = tmp_path / "materials"
+    for rel_path, text in LECTURES.items():
+        (root / rel_path).parent.mkdir(parents=True, exist_ok=True)
+        (root / rel_path).write_text(text, encoding="utf-8")
+    return root
+
+
+def test_chunk_text_respects_max_chars():
+    chunks = chunk_text("\n".join(f"line {i} " * 10 for i in range(50)), max_chars=200, overlap_lines=0)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 200 for chunk in chunks)
+
+
+def test_search_finds_the_relevant_file(materials, tmp_path):
+    index = LocalIndex.build(materials, tmp_path / "index")
+    assert index.search("How are exogenous regressors passed to SARIMAX?", 1)[0].filename.endswith(
+        "06_sarimax_exogenous.py")
+
+
+def test_search_batch_stem_filter(materials, tmp_path):
+    index = LocalIndex.build(materials, tmp_path / "index")
+    results = index.search_batch(["cross validation"], 5, stems={"05_lstm_cv"})[0]
+    assert results and {r.filename for r in results} == {"05_lstm_cv.py"}
+
+
+def test_sharded_index_routes_and_merges(materials, tmp_path):
+    index = ShardedIndex.build(materials, tmp_path / "shards")
+    assert set(index.shards) == {"prophet", "lstm", "arima"}
+    assert {r.filename for r in index.search("How does Prophet do cross validation?", 5)} <= {
+        "03_prophet_holidays.txt", "04_prophet_cv.py"}
+    # No part named: every shard is searched and the results merged by score
+    merged = index.search("cross validation", 10)
+    assert {"04_prophet_cv.py", "05_lstm_cv.py"} <= {r.filename for r in merged}
+    assert [r.score for r in merged] == sorted((r.score for r in merged), reverse=True)
+    assert index.router.stats()["routed_to_parts"] == 1
+
+
+def test_load_or_build_reopens_sharded_index(materials, tmp_path):
+    built = load_or_build(tmp_path / "index", materials, sharded=True)
+    reopened = load_or_build(tmp_path / "index", None, sharded=True)
+    assert isinstance(reopened, ShardedIndex)
+    assert reopened.scope == built.scope
@@ -0,0 +1,63 @@
+import json
+import urllib.request
+
+from metrics import Histogram, MetricsRegistry
+
+
+def test_histogram_buckets_and_percentiles():
+    hist = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        hist.observe(value)
+    assert hist.counts == [1, 2, 1]
+    assert (hist.count, round(hist.sum, 2)) == (4, 4.25)
+    assert hist.percentile(50) == 0.7
+    assert Histogram().percentile(95) == 0.0
+
+
+def test_summary_per_stage():
+    registry = MetricsRegistry()
+    for seconds in (0.1, 0.2, 0.3):
+        registry.observe("upstream", seconds)
+    with registry.timer("render"):
+        pass
+    summary = registry.summary()
+    assert summary["upstream"] == {"count": 3, "p50_s": 0.2, "p95_s": 0.3}
+    assert summary["render"]["count"] == 1
+
+
+def test_prometheus_text_has_histograms_counters_and_gauges():
+    registry = MetricsRegistry(namespace="t")
+    registry.observe("ttft", 0.3)
+    registry.inc("tokens", 120, kind="input")
+    registry.inc("turns")
+    registry.register_collector("cache", lambda: {"hits": 3, "rate": 0.5, "label": "x", "open": True,
+                                                  "nested": {"depth": 2}})
+    registry.register_collector("broken", lambda: 1 / 0)
+    text = registry.render_prometheus()
+    assert 't_stage_seconds_bucket{stage="ttft",le="0.25"} 0' in text
+    assert 't_stage_seconds_bucket{stage="ttft",le="0.5"} 1' in text
+    assert 't_stage_seconds_count{stage="ttft"} 1' in text
+    assert 't_tokens_total{kind="input"} 120.0' in text
+    assert "t_turns_total 1.0" in text
+    assert "t_cache_hits 3" in text and "t_cache_nested_depth 2" in text
+    assert "t_cache_label" not in text and "t_cache_open" not in text
+
+
+def test_turn_log_is_jsonl(tmp_path):
+    path = tmp_path / "turns.jsonl"
+    registry = MetricsRegistry(namespace="turnlog_test", log_path=path)
+    registry.log_turn({"turn": 1, "model": "m"})
+    record = json.loads(path.read_text(encoding="utf-8").splitlines()[-1])
+    assert record["turn"] == 1 and "ts" in record
+
+
+def test_serves_metrics_endpoint():
+    registry = MetricsRegistry(namespace="t")
+    registry.inc("turns")
+    server = registry.serve("127.0.0.1", 0)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics", timeout=5) as response:
+            assert "t_turns_total 1.0" in response.read().decode("utf-8")
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,45 @@
+import pytest
+from openai import RateLimitError
+
+from benchmarks.mock_responses_api import MockConfig, MockResponsesAPI
+
+
+def test_prompt_prefixes_are_cached_from_1024_tokens():
+    api = MockResponsesAPI(MockConfig())
+    short = {"input": [{"role": "user", "content": "hi"}]}
+    long = {"input": [{"role": "system", "content": "x" * 8000}, {"role": "user", "content": "first"}]}
+    assert api.prompt_usage(short)[1] == 0
+    tokens, cached = api.prompt_usage(long)
+    assert tokens > 1024 and cached == 0
+    long["input"][1]["content"] = "second question"
+    assert api.prompt_usage(long)[1] >= 1024
+
+
+def test_responses_through_the_sdk(mock_api):
+    server, client = mock_api
+    response = client.responses.create(model="m", input=[{"role": "user", "content": "ARIMA vs SARIMA?"}])
+    assert response.id.startswith("resp_") and response.output_text
+    assert response.usage.output_tokens == 6  # output_tokens words plus the follow-up suggestion
+    events = [event.type for event in client.responses.create(model="m", input="hi", stream=True)]
+    assert events[0] == "response.created" and events[-1] == "response.completed"
+    assert "response.output_text.delta" in events
+    assert server.api.stats["streamed"] == 1
+
+
+def test_file_search_results_are_included_on_request(mock_api):
+    _, client = mock_api
+    response = client.responses.create(
+        model="m", input=[{"role": "user", "content": "When does the ACF show seasonal spikes at lag m?"}],
+        tools=[{"type": "file_search", "vector_store_ids": ["vs_mock"]}], include=["file_search_call.results"],
+    )
+    search = response.output[0]
+    assert search.type == "file_search_call"
+    assert search.results[0].filename == "03_arima_vs_sarima.txt"
+
+
+def test_injected_429_carries_retry_after(mock_api):
+    server, client = mock_api
+    server.api.config.rate_429 = 1.0
+    with pytest.raises(RateLimitError) as raised:
+        client.responses.create(model="m", input="hi")
+    assert raised.value.response.headers["retry-after-ms"] == str(server.api.config.retry_after_ms)
@@ -0,0 +1,86 @@
+import pytest
+
+import model_router
+from model_router import ModelRouter, detect_intent
+
+QUESTION = "How do I choose the seasonal order for SARIMA on weekly data?"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(model_router.time, "monotonic", clock)
+    return clock
+
+
+def make_router(**kwargs) -> ModelRouter:
+    options = dict(primary_model="primary", fast_model="fast", latency_slo_s=10.0, min_samples=5,
+                   max_sample_age_s=60.0)
+    options.update(kwargs)
+    return ModelRouter(**options)
+
+
+def test_detect_intent():
+    assert detect_intent("Show me the code for Prophet CV") == "code"
+    assert detect_intent("ARIMA vs SARIMA?") == "compare"
+    assert detect_intent("What is stationarity?") == "definition"
+    assert detect_intent("Tell me about the capstone") == "general"
+
+
+def test_routes_by_question_shape(clock):
+    router = make_router()
+    assert router.route("What is a lag?").model == "fast"
+    decision = router.route(QUESTION)
+    assert (decision.model, decision.verbosity, decision.reason) == ("primary", "low", "general")
+    assert router.route(" ".join(["word"] * 41) + " code").verbosity == "medium"
+
+
+def test_falls_back_when_primary_breaches_slo(clock):
+    router = make_router()
+    for _ in range(5):
+        router.observe("primary", 30.0)
+    decision = router.route(QUESTION)
+    assert (decision.model, decision.reason) == ("fast", "slo_fallback")
+    assert router.route(QUESTION, allow_fallback=False).model == "primary"
+
+
+def test_same_model_fallback_lowers_verbosity(clock):
+    router = make_router(fast_model="primary")
+    for _ in range(5):
+        router.observe("primary", 30.0)
+    decision = router.route(" ".join(["word"] * 41) + " code")
+    assert (decision.model, decision.verbosity, decision.reason) == ("primary", "low", "slo_fallback")
+
+
+def test_primary_is_tried_again_once_slow_samples_expire(clock):
+    router = make_router()
+    for _ in range(5):
+        router.observe("primary", 30.0)
+    assert router.route(QUESTION).model == "fast"
+    # In fallback the primary gets no traffic, so no new samples; the slow ones age out
+    clock.now += 61
+    assert router.p95("primary") is None
+    assert router.route(QUESTION).model == "primary"
+    # Recovered: fresh fast samples keep it on the primary
+    for _ in range(5):
+        router.observe("primary", 2.0)
+    assert router.route(QUESTION).model == "primary"
+    assert router.stats()["models"]["primary"]["p95_s"] == 2.0
+
+
+def test_stats_count_decisions_and_tokens(clock):
+    router = make_router()
+    usage = type("Usage", (), {"input_tokens": 100, "output_tokens": 20})()
+    router.observe("primary", 1.0, usage)
+    router.route(QUESTION)
+    stats = router.stats()
+    assert stats["models"]["primary"]["avg_input_tokens"] == 100
+    assert stats["decisions"] == {"primary/low/general": 1}
@@ -0,0 +1,55 @@
+from types import SimpleNamespace
+
+import pytest
+
+from answer_cache import AnswerCache
+from prewarm import ExampleQuestionPrewarmer
+
+QUESTIONS = ["When to use ARIMA vs SARIMA?", "How does Prophet handle holidays?"]
+
+
+class FakeResponses:
+    """Stands in for client.responses: answers every request, or fails them all"""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.requests = []
+
+    def create(self, **request):
+        self.requests.append(request)
+        if self.error is not None:
+            raise self.error
+        return SimpleNamespace(id=f"resp_{len(self.requests)}", output_text="Use SARIMA for seasonal data.")
+
+
+@pytest.fixture
+def client():
+    return SimpleNamespace(responses=FakeResponses())
+
+
+def make_prewarmer(client, tmp_path, questions=QUESTIONS):
+    cache = AnswerCache(tmp_path / "answers.sqlite3", ttl_seconds=3600, max_entries=10, similarity_threshold=0.9)
+    return ExampleQuestionPrewarmer(client, cache, questions, "vs_mock", model="gpt-5-nano", verbosity="low",
+                                    max_workers=2, refresh_seconds=3600)
+
+
+def test_example_answers_land_in_the_cache(client, tmp_path):
+    prewarmer = make_prewarmer(client, tmp_path)
+    assert prewarmer.warm_all() == 2
+    hit = prewarmer.cache.get(QUESTIONS[0], "gpt-5-nano", "low", "vs_mock")
+    assert hit is not None and hit.answer and hit.response_id
+    assert prewarmer.status()["warmed"] == 2
+
+
+def test_fresh_answers_are_not_fetched_again(client, tmp_path):
+    prewarmer = make_prewarmer(client, tmp_path)
+    prewarmer.warm_all()
+    assert prewarmer.warm_all(force=False) == 0
+    assert len(client.responses.requests) == 2
+
+
+def test_failures_are_counted_not_raised(tmp_path):
+    client = SimpleNamespace(responses=FakeResponses(RuntimeError("429 Too Many Requests")))
+    prewarmer = make_prewarmer(client, tmp_path)
+    assert prewarmer.warm_all() == 0
+    assert prewarmer.status()["failed"] == 2
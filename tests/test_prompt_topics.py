@@ -0,0 +1,37 @@
+import assistant
+from prompt_topics import COURSE_MAP, classify_topics, topic_context
+
+
+def test_full_prompt_keeps_the_course_map_before_the_closing_rules():
+    prompt = assistant.SYSTEM_INSTRUCTIONS
+    assert "Context: Course outline" not in prompt
+    assert prompt.index("Boundaries") < prompt.index(COURSE_MAP) < prompt.index("What to prioritize per topic")
+    assert prompt.endswith("say so.\n")
+
+
+def test_core_prompt_has_the_outline_instead_of_the_map():
+    core = assistant.SYSTEM_CORE
+    assert "Context: Course outline" in core and COURSE_MAP not in core
+    assert core.index("Course outline") < core.index("What to prioritize per topic")
+
+
+def test_classifier_picks_the_most_mentioned_topics():
+    assert classify_topics("SARIMA vs ARIMA: how do we pick the AIC order?", 2) == ["arima"]
+    assert classify_topics("Prophet holidays vs a SARIMAX exogenous holiday regressor", 1) == ["prophet"]
+    assert classify_topics("What's the weather like?", 3) == []
+
+
+def test_topic_context_is_in_course_order():
+    assert topic_context(["prophet", "analysis"]) == topic_context(["analysis", "prophet"])
+    assert topic_context([]) == ""
+
+
+def test_first_turn_request_uses_the_prompt_for_the_mode():
+    full = assistant.build_request("How does N-BEATS stack blocks?", None, context="snippets", topic_prompt=False)
+    assert full["input"][0]["content"] == assistant.SYSTEM_INSTRUCTIONS
+    assert assistant.request_topics(full) == []
+
+    topics = assistant.build_request("How does N-BEATS stack blocks?", None, context="snippets", topic_prompt=True)
+    assert topics["input"][0]["content"] == assistant.SYSTEM_CORE
+    assert assistant.request_topics(topics) == ["nbeats"]
+    assert topics["input"][-1] == {"role": "user", "content": "How does N-BEATS stack blocks?"}
@@ -0,0 +1,37 @@
+from types import SimpleNamespace
+
+import rendering
+from rendering import build_message_html, history_html, render_block_html
+
+
+def message(role, content):
+    return SimpleNamespace(role=role, content=content)
+
+
+def test_user_bubbles_drop_line_breaks_and_assistant_code_is_highlighted():
+    assert "<br>Hi" in build_message_html("user", "Hi<br/>&lt;br&gt;")
+    assert "Hi<br/>" not in build_message_html("user", "Hi<br/>")
+    assistant = build_message_html("assistant", "```python\nx = 1\n```", timestamp="10:00")
+    assert 'class="code-block"' in assistant and "10:00" in assistant
+
+
+def test_history_closes_blocks_once_they_are_big_enough(monkeypatch):
+    bubble = len(build_message_html("user", "x" * 100))
+    monkeypatch.setattr(rendering.config, "RENDER_BLOCK_MIN_BYTES", bubble * 2)
+    messages = [message("user" if i % 2 == 0 else "assistant", "x" * 100) for i in range(6)]
+    elements = history_html(messages)
+    # Two closed blocks of two, the open remainder, then the newest message alone
+    assert len(elements) == 4
+    assert elements[0] == render_block_html((("user", "x" * 100), ("assistant", "x" * 100)))
+
+
+def test_closed_blocks_do_not_change_as_the_chat_grows(monkeypatch):
+    monkeypatch.setattr(rendering.config, "RENDER_BLOCK_MIN_BYTES", 1)
+    messages = [message("user", f"question {i}") for i in range(4)]
+    before = history_html(messages)
+    after = history_html(messages + [message("assistant", "answer")])
+    assert after[:len(before) - 1] == before[:-1]
+
+
+def test_empty_history():
+    assert history_html([]) == []
@@ -0,0 +1,96 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import retrieval_cache
+from retrieval_cache import RetrievalCache, RetrievedChunk, search_results, stem_words
+
+CHUNKS = [
+    RetrievedChunk("file_1", "04_sarimax_exogenous.py", 0.9,
+                   "model = SARIMAX(train, exog=train_exog, order=(1, 1, 1), seasonal_order=(1, 1, 1, 12))"),
+    RetrievedChunk("file_2", "03_arima_vs_sarima.txt", 0.7,
+                   "The seasonal order adds seasonal differencing at lag m."),
+]
+
+
+@pytest.fixture
+def cache():
+    cache = RetrievalCache(max_sessions=2, max_reuses=2, ttl_seconds=600, min_coverage=0.6, top_k=1)
+    cache.store("s1", "How are exogenous regressors added in SARIMAX?", CHUNKS)
+    return cache
+
+
+@pytest.mark.parametrize("question", [
+    "Show the code for that",
+    "Why?",
+    "Can you explain that seasonal order line?",
+    "What does exog do in that snippet?",
+    "Explain line 3 of 04_sarimax_exogenous.py",
+])
+def test_follow_ups_about_the_last_answer_reuse_it(cache, question):
+    assert cache.lookup("s1", question) is not None
+
+
+@pytest.mark.parametrize("question, reason", [
+    ("How does Prophet handle holidays?", "topic"),
+    ("Show me lecture 7 instead", "lecture"),
+    ("What is a good learning rate?", "not_follow_up"),
+    ("How would that work with a weekly frequency and quarterly dummies?", "new_terms"),
+])
+def test_new_subjects_search_again(cache, question, reason):
+    assert cache.lookup("s1", question) is None
+    assert cache.stats()["misses"] == {reason: 1}
+
+
+def test_reuse_is_bounded_in_count_and_age(cache, monkeypatch):
+    assert cache.lookup("s1", "Why?") and cache.lookup("s1", "And that?")
+    assert cache.lookup("s1", "Why?") is None
+    cache.store("s1", "How are exogenous regressors added in SARIMAX?", CHUNKS)
+    later = time.monotonic() + 601
+    monkeypatch.setattr(retrieval_cache.time, "monotonic", lambda: later)
+    assert cache.lookup("s1", "Why?") is None
+    assert cache.stats()["misses"] == {"expired": 2}
+
+
+def test_speculative_lookups_are_not_counted(cache):
+    assert cache.lookup("s1", "Why?", record=False) is not None
+    assert cache.stats()["hits"] == 0 and cache._entries["s1"].reuses == 0
+
+
+def test_empty_search_forgets_and_old_sessions_are_evicted(cache):
+    cache.store("s1", "Something new", [])
+    assert cache.lookup("s1", "Why?") is None and cache.stats()["no_results"] == 1
+    for session in ("s2", "s3", "s4"):
+        cache.store(session, "Question", CHUNKS)
+    assert cache.stats()["sessions"] == 2 and cache.lookup("s2", "Why?") is None
+
+
+def test_context_holds_the_top_snippets(cache):
+    context = cache.context(cache.lookup("s1", "Why?"))
+    assert "[04_sarimax_exogenous.py]" in context and "03_arima_vs_sarima.txt" not in context
+
+
+def test_latency_saved_estimate(cache):
+    cache.lookup("s1", "Why?")
+    cache.observe(searched=True, seconds=2.0)
+    cache.observe(searched=False, seconds=1.5)
+    stats = cache.stats()
+    assert (stats["searched_follow_up_ms"], stats["reused_follow_up_ms"], stats["latency_saved_s"]) == (
+        2000.0, 1500.0, 0.5)
+
+
+def test_search_results_are_deduplicated_best_first():
+    result = SimpleNamespace(file_id="file_2", filename="03_arima_vs_sarima.txt", score=0.4, text="lag m")
+    response = SimpleNamespace(output=[
+        SimpleNamespace(type="file_search_call", results=[result, result,
+                        SimpleNamespace(file_id="file_1", filename=None, score=0.8, text="exog")]),
+        SimpleNamespace(type="message", content=[]),
+    ])
+    assert [(c.filename, c.score) for c in search_results(response)] == [("file_1", 0.8),
+                                                                        ("03_arima_vs_sarima.txt", 0.4)]
+    assert search_results(SimpleNamespace(output=None)) == []
+
+
+def test_lecture_numbers_match_without_leading_zeros():
+    assert stem_words("04") == {"4"} and "4" in stem_words("04_sarimax_exogenous.py")
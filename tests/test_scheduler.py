@@ -0,0 +1,182 @@
+import threading
+import time
+
+import pytest
+
+from scheduler import (
+    CancelToken, CircuitBreaker, DeadlineExceededError, RequestCancelledError, RequestScheduler, TokenBucket,
+    UpstreamUnavailableError, is_retryable, retry_after_seconds,
+)
+
+
+class StatusError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = type("Response", (), {"headers": headers or {}})()
+
+
+def make_scheduler(**kwargs) -> RequestScheduler:
+    options = dict(max_concurrency=1, requests_per_minute=60_000, burst=100, base_delay=0.0, max_delay=0.0)
+    options.update(kwargs)
+    return RequestScheduler(**options)
+
+
+def wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def test_token_bucket_spends_burst_then_paces():
+    bucket = TokenBucket(rate_per_second=10, capacity=2)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    with pytest.raises(DeadlineExceededError):
+        bucket.acquire(deadline=time.monotonic() + 0.01)
+
+
+def test_slots_are_granted_round_robin_across_sessions():
+    scheduler = make_scheduler()
+    order, threads = [], []
+    blocker = scheduler.slot("blocker")
+    blocker.__enter__()
+
+    def queue(session_id):
+        with scheduler.slot(session_id):
+            order.append(session_id)
+
+    # a queues twice before b queues once; b must not wait behind both of a's calls
+    for session_id in ("a", "a", "b"):
+        queued = scheduler.stats()["queue_depth"]
+        threads.append(threading.Thread(target=queue, args=(session_id,)))
+        threads[-1].start()
+        wait_for(lambda: scheduler.stats()["queue_depth"] == queued + 1)
+    blocker.__exit__(None, None, None)
+    for thread in threads:
+        thread.join(5)
+    assert order == ["a", "b", "a"]
+    assert scheduler.stats()["active"] == 0
+
+
+def test_deadline_while_queued():
+    scheduler = make_scheduler()
+    with scheduler.slot("a"):
+        with pytest.raises(DeadlineExceededError):
+            with scheduler.slot("b", deadline=time.monotonic() + 0.02):
+                pass
+    assert scheduler.stats()["deadline_exceeded"] == 1
+    assert scheduler.stats()["queue_depth"] == 0
+
+
+def test_cancel_leaves_the_queue():
+    scheduler = make_scheduler()
+    token, outcome = CancelToken(), []
+
+    def queue():
+        try:
+            with scheduler.slot("b", cancel=token):
+                outcome.append("granted")
+        except RequestCancelledError as e:
+            outcome.append(e.reason)
+
+    with scheduler.slot("a"):
+        thread = threading.Thread(target=queue)
+        thread.start()
+        wait_for(lambda: scheduler.stats()["queue_depth"] == 1)
+        token.cancel("stopped")
+        thread.join(5)
+    assert outcome == ["stopped"]
+    assert scheduler.stats()["queue_depth"] == 0
+
+
+def test_cancelling_gives_a_held_slot_back_at_once():
+    scheduler = make_scheduler()
+    token, sent, returned = CancelToken(), threading.Event(), threading.Event()
+
+    def call():
+        with scheduler.slot("a", cancel=token):
+            sent.set()
+            returned.wait(5)  # The caller's blocked read, still unwinding
+
+    thread = threading.Thread(target=call)
+    thread.start()
+    sent.wait(5)
+    token.cancel("stopped")
+    assert scheduler.stats()["active"] == 0
+    with scheduler.slot("b", deadline=time.monotonic() + 1):
+        pass
+    returned.set()
+    thread.join(5)
+    stats = scheduler.stats()
+    assert (stats["active"], stats["granted"], stats["cancelled"]) == (0, 2, 1)
+
+
+def test_retries_retryable_errors_then_succeeds():
+    scheduler = make_scheduler(max_retries=3)
+    attempts = []
+
+    def flaky(timeout):
+        attempts.append(timeout)
+        if len(attempts) < 3:
+            raise StatusError(429)
+        return "ok"
+
+    assert scheduler.call(flaky, "a", timeout=5) == "ok"
+    assert len(attempts) == 3
+    assert scheduler.stats()["retries"] == 2
+    assert scheduler.breaker.state == "closed"
+
+
+def test_gives_up_after_max_retries_and_does_not_retry_client_errors():
+    scheduler = make_scheduler(max_retries=1)
+
+    def unavailable(timeout):
+        raise StatusError(503)
+
+    with pytest.raises(UpstreamUnavailableError):
+        scheduler.call(unavailable, "a")
+    assert scheduler.stats()["gave_up"] == 1
+
+    calls = []
+
+    def bad_request(timeout):
+        calls.append(timeout)
+        raise StatusError(400)
+
+    with pytest.raises(StatusError):
+        scheduler.call(bad_request, "a")
+    assert len(calls) == 1
+
+
+def test_retryable_and_retry_after():
+    assert is_retryable(StatusError(429)) and is_retryable(StatusError(502))
+    assert not is_retryable(StatusError(400))
+    assert is_retryable(TimeoutError())
+    assert retry_after_seconds(StatusError(429, {"retry-after-ms": "250"})) == 0.25
+    assert retry_after_seconds(StatusError(429, {"retry-after": "2"})) == 2.0
+    assert retry_after_seconds(StatusError(429)) is None
+
+
+def test_circuit_breaker_opens_then_probes():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.05)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()  # One probe at a time
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_open_circuit_rejects_without_queueing():
+    scheduler = make_scheduler(breaker=CircuitBreaker(failure_threshold=1, reset_seconds=60))
+    scheduler.breaker.record_failure()
+    with pytest.raises(UpstreamUnavailableError):
+        scheduler.call(lambda timeout: "ok", "a")
+    assert scheduler.stats()["rejected_open_circuit"] == 1
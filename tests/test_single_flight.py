@@ -0,0 +1,80 @@
+import threading
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def run_waiter(flights: SingleFlight, key, outcomes: list, timeout: float = 5.0) -> threading.Thread:
+    def wait():
+        try:
+            outcomes.append(flights.do(key, lambda: pytest.fail("a waiter must not call fn"), timeout=timeout))
+        except BaseException as e:
+            outcomes.append(e)
+
+    thread = threading.Thread(target=wait)
+    thread.start()
+    return thread
+
+
+def test_concurrent_callers_share_the_leaders_result():
+    flights = SingleFlight()
+    outcomes = []
+    flight, leader = flights.begin("q")
+    waiters = [run_waiter(flights, "q", outcomes) for _ in range(3)]
+    flights.finish("q", flight, result="answer")
+    for thread in waiters:
+        thread.join(5)
+    assert leader
+    assert outcomes == [("answer", True)] * 3
+    assert flights.stats() == {"leaders": 1, "coalesced": 3, "failed": 0, "wait_timeouts": 0, "in_flight": 0}
+
+
+def test_leader_error_propagates_to_waiters():
+    flights = SingleFlight()
+    started, release, outcomes = threading.Event(), threading.Event(), []
+
+    def fail():
+        started.set()
+        release.wait(5)
+        raise ValueError("upstream failed")
+
+    def lead():
+        try:
+            flights.do("q", fail)
+        except ValueError as e:
+            outcomes.append(e)
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    started.wait(5)
+    waiter = run_waiter(flights, "q", outcomes)
+    release.set()
+    leader.join(5)
+    waiter.join(5)
+    assert [str(outcome) for outcome in outcomes] == ["upstream failed"] * 2
+    assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+    assert flights.stats()["failed"] == 1
+    # The failed flight is gone: the next caller leads a new one
+    assert flights.do("q", lambda: "retry") == ("retry", False)
+
+
+def test_waiter_times_out_while_leader_runs():
+    flights = SingleFlight()
+    flight, _ = flights.begin("q")
+    with pytest.raises(TimeoutError):
+        flights.wait(flight, timeout=0.01)
+    assert flights.stats()["wait_timeouts"] == 1
+    flights.finish("q", flight, result="late")
+    assert flights.wait(flight, timeout=0) == "late"
+
+
+def test_finish_is_idempotent_and_keys_are_independent():
+    flights = SingleFlight()
+    flight, _ = flights.begin("a")
+    _, other_leader = flights.begin("b")
+    flights.finish("a", flight, result=1)
+    flights.finish("a", flight, error=RuntimeError("ignored"))
+    assert other_leader
+    assert flights.wait(flight) == 1
+    assert flights.stats()["in_flight"] == 1
@@ -0,0 +1,93 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import speculation
+from speculation import Speculator, extract_follow_up
+
+
+@pytest.fixture
+def speculator():
+    speculator = Speculator(max_workers=1, ttl_seconds=60, similarity_threshold=0.8)
+    yield speculator
+    speculator._pool.shutdown(wait=True)
+
+
+def answer(output_tokens: int = 10):
+    return SimpleNamespace(output_text="Here is the code", usage=SimpleNamespace(input_tokens=100,
+                                                                                output_tokens=output_tokens))
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("SARIMA adds seasonal terms.\n\nWant me to show the SARIMAX code?", "Show the SARIMAX code?"),
+    ("Done. **Would you like to compare it with Prophet?**", "Compare it with Prophet?"),
+    ("Shall I walk through the ACF plot?", "Walk through the ACF plot?"),
+    ("All clear?", None),
+    ("That is all for today.", None),
+])
+def test_extract_follow_up(text, expected):
+    assert extract_follow_up(text) == expected
+
+
+def test_matching_question_gets_the_precomputed_answer(speculator):
+    speculator.launch("s1", "Show the SARIMAX code", "resp_1", answer)
+    assert speculator.take("s1", "show the sarimax code", "resp_1", timeout=5).output_text == "Here is the code"
+    assert speculator.take("s1", "show the sarimax code", "resp_1") is None  # Consumed
+    assert speculator.stats()["hits"] == 1
+
+
+def test_accepting_the_offer_counts_as_a_match(speculator):
+    speculator.launch("s1", "Show the SARIMAX code", "resp_1", answer)
+    assert speculator.take("s1", "Yes please!", "resp_1", timeout=5) is not None
+
+
+def test_other_question_discards_and_counts_wasted_tokens(speculator):
+    speculator.launch("s1", "Show the SARIMAX code", "resp_1", lambda: answer(output_tokens=42))
+    assert speculator.take("s1", "What is a unit root test?", "resp_1", timeout=5) is None
+    speculator._pool.shutdown(wait=True)
+    stats = speculator.stats()
+    assert stats["missed"] == 1 and stats["hit_rate"] == 0.0
+    assert (stats["wasted_input_tokens"], stats["wasted_output_tokens"]) == (100, 42)
+
+
+def test_moved_on_or_expired_speculation_is_stale(speculator, monkeypatch):
+    speculator.launch("s1", "Show the SARIMAX code", "resp_1", answer)
+    assert speculator.take("s1", "Show the SARIMAX code", "resp_2") is None
+    speculator.launch("s1", "Show the SARIMAX code", "resp_1", answer)
+    later = time.monotonic() + 120
+    monkeypatch.setattr(speculation.time, "monotonic", lambda: later)
+    assert speculator.take("s1", "Show the SARIMAX code", "resp_1") is None
+    assert speculator.stats()["stale"] == 2
+
+
+def test_queued_speculation_is_cancelled_without_spending_tokens(speculator):
+    release = threading.Event()
+    speculator.launch("busy", "Explain the ACF plot", "resp_0", release.wait)
+    speculator.launch("s1", "Show the SARIMAX code", "resp_1", answer)
+    speculator.discard("s1")  # Still queued behind the busy worker
+    release.set()
+    stats = speculator.stats()
+    assert stats["cancelled"] == 1 and stats["pending"] == 1
+
+
+def test_failed_speculation_is_not_served(speculator):
+    def fail():
+        raise RuntimeError("upstream error")
+
+    speculator.launch("s1", "Show the SARIMAX code", "resp_1", fail)
+    assert speculator.take("s1", "Show the SARIMAX code", "resp_1", timeout=5) is None
+    assert speculator.stats()["failed"] == 1
+
+
+def test_claim_returns_a_running_speculation_without_waiting(speculator):
+    release = threading.Event()
+    speculator.launch("s1", "Show the SARIMAX code", "resp_1", lambda: release.wait(5) and answer())
+    started = time.monotonic()
+    future = speculator.claim("s1", "Show the SARIMAX code", "resp_1")
+    assert not future.done() and time.monotonic() - started < 1
+    assert speculator.claim("s1", "Show the SARIMAX code", "resp_1") is None  # Consumed
+    release.set()
+    assert speculator.result(future, timeout=5).output_text == "Here is the code"
+    assert speculator.stats()["hits"] == 1
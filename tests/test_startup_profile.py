@@ -0,0 +1,52 @@
+import json
+import sys
+import types
+
+import startup_profile
+from startup_profile import StartupProfile, parse_importtime
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:      2500 |      41000 | openai
+import time:      1800 |      30000 |   openai._client
+import time:       900 |       4000 | httpx
+import time:       300 |       2000 | openai.types
+"""
+
+
+def test_parse_importtime_totals_direct_imports_per_package():
+    assert parse_importtime(IMPORTTIME) == {"openai": 43.0, "httpx": 4.0}
+    assert parse_importtime(IMPORTTIME, top=1) == {"openai": 43.0}
+
+
+def test_phases_record_the_packages_they_import(monkeypatch, tmp_path, capsys):
+    profile = StartupProfile()
+    monkeypatch.setitem(sys.modules, "fake_heavy_sdk", types.ModuleType("fake_heavy_sdk"))
+    profile.mark("imports")
+    profile.mark("sidebar")
+    report = profile.finish(tmp_path / "logs" / "startup.json")
+    assert [p["phase"] for p in report["phases"]] == ["imports", "sidebar"]
+    assert report["phases"][0]["imported"] == ["fake_heavy_sdk"] and report["phases"][1]["imported"] == []
+    assert json.loads((tmp_path / "logs" / "startup.json").read_text()) == report
+    assert "Startup profile: imports" in capsys.readouterr().out
+
+
+def test_only_the_first_run_is_profiled(monkeypatch, capsys):
+    monkeypatch.setattr(startup_profile, "_profile", None)
+    monkeypatch.setattr(startup_profile, "ENABLED", True)
+    startup_profile.begin()
+    startup_profile.mark("header")
+    assert startup_profile.finish() is not None
+    startup_profile.begin()  # A rerun
+    startup_profile.mark("chat")
+    assert startup_profile.finish() is None
+    assert [p["phase"] for p in startup_profile._profile.phases] == ["header"]
+
+
+def test_disabled_profile_records_nothing(monkeypatch):
+    monkeypatch.setattr(startup_profile, "_profile", None)
+    monkeypatch.setattr(startup_profile, "ENABLED", False)
+    startup_profile.begin()
+    startup_profile.mark("header")
+    assert startup_profile.finish() is None
@@ -0,0 +1,63 @@
+from pathlib import Path
+
+import pytest
+
+import config
+import resources
+from single_flight import SingleFlight
+
+streamlit_testing = pytest.importorskip("streamlit.testing.v1")
+
+APP = str(Path(__file__).resolve().parent.parent / "streamlit_app.py")
+
+
+@pytest.fixture
+def app_config(monkeypatch, tmp_path):
+    """Run the app offline: no warm-up, prewarming, metrics endpoint or files outside tmp_path"""
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("VECTOR_STORE_ID", "vs_test")
+    for name, value in [("WARM_CONNECTIONS", False), ("PREWARM_ENABLED", False), ("METRICS_ENABLED", False),
+                        ("ANSWER_CACHE_ENABLED", False), ("SPECULATION_ENABLED", False), ("CHAT_BACKEND_URL", ""),
+                        ("TRACING_BACKEND", "off"), ("SINGLE_FLIGHT_ENABLED", True), ("STREAM_RESPONSES", True),
+                        ("HISTORY_PATH", tmp_path / "history.sqlite3"),
+                        ("METRICS_LOG_PATH", tmp_path / "turns.jsonl")]:
+        monkeypatch.setattr(config, name, value)
+
+
+def ask(question: str):
+    app = streamlit_testing.AppTest.from_file(APP, default_timeout=30).run()
+    app.text_area[0].input(question)
+    next(button for button in app.button if button.label == "🚀 Send").click().run()
+    return app
+
+
+def test_streamed_first_turn_finishes_its_flight_when_the_leader_fails_early(app_config, monkeypatch):
+    finished = []
+    finish = SingleFlight.finish
+
+    def record_finish(self, key, flight, result=None, error=None):
+        finished.append(error)
+        finish(self, key, flight, result=result, error=error)
+
+    def unavailable_client():
+        raise RuntimeError("client setup failed")
+
+    monkeypatch.setattr(SingleFlight, "finish", record_finish)
+    monkeypatch.setattr(resources, "get_client", unavailable_client)
+    app = ask("Which course part covers SARIMAX?")
+
+    assert [str(e) for e in finished] == ["client setup failed"]
+    # Nothing left in flight, so the next session asking the same question leads a fresh call
+    assert resources.get_single_flight().stats()["in_flight"] == 0
+    assert "client setup failed" in app.exception[0].value
+
+
+def test_thin_client_exports_no_local_scheduler_stats(app_config, monkeypatch):
+    monkeypatch.setattr(config, "CHAT_BACKEND_URL", "http://127.0.0.1:8600")
+    resources.get_metrics.clear()
+    try:
+        exported = resources.get_metrics().render_prometheus()
+    finally:
+        resources.get_metrics.clear()
+    assert "tsa_single_flight_" in exported
+    assert "tsa_scheduler_" not in exported
@@ -0,0 +1,144 @@
+import json
+import time
+
+import pytest
+
+import tracing
+from tracing import FileSink, LangSmithSink, Tracer
+
+
+class ListSink:
+    def __init__(self, fail: bool = False):
+        self.spans = []
+        self.fail = fail
+
+    def export(self, spans):
+        if self.fail:
+            raise ConnectionError("sink unreachable")
+        self.spans.extend(spans)
+
+
+def wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+@pytest.fixture
+def make_tracer():
+    tracers = []
+
+    def make(sink, **options):
+        options.setdefault("flush_seconds", 60)
+        tracer = Tracer(sink, **options)
+        tracers.append(tracer)
+        return tracer
+
+    yield make
+    for tracer in tracers:
+        tracer.close()
+
+
+def test_nested_spans_form_one_trace(make_tracer):
+    sink = ListSink()
+    tracer = make_tracer(sink)
+    with tracer.span("turn", session="s1") as root:
+        tracing.annotate_trace(model="gpt-4.1")
+        with tracer.span("retrieve") as child:
+            child.set(hits=3)
+    tracer.flush()
+    wait_for(lambda: len(sink.spans) == 2)
+    assert [s.name for s in sink.spans] == ["retrieve", "turn"]
+    assert child.trace_id == root.trace_id and child.parent_id == root.span_id
+    assert root.attributes == {"session": "s1", "model": "gpt-4.1"}
+    assert tracer.stats()["exported_spans"] == 2
+
+
+def test_sampling_keeps_errors_and_slow_traces(make_tracer):
+    tracer = make_tracer(ListSink(), sample_rate=0.0, slow_seconds=0.02)
+    with tracer.span("fast"):
+        pass
+    with pytest.raises(ValueError):
+        with tracer.span("broken"):
+            raise ValueError("bad input")
+    with tracer.span("slow"):
+        time.sleep(0.03)
+    tracer.flush()
+    wait_for(lambda: len(tracer.sink.spans) == 2)
+    stats = tracer.stats()
+    assert (stats["not_sampled"], stats["kept_error"], stats["kept_slow"]) == (1, 1, 1)
+    errors = [s.error for s in tracer.sink.spans if s.error]
+    assert errors == ["ValueError: bad input"]
+
+
+def test_full_buffer_drops_the_oldest_trace(make_tracer):
+    sink = ListSink()
+    tracer = make_tracer(sink, buffer_size=2)
+    for name in ("first", "second", "third"):
+        with tracer.span(name):
+            pass
+    assert tracer.stats()["dropped"] == 1
+    tracer.flush()
+    wait_for(lambda: len(sink.spans) == 2)
+    assert [s.name for s in sink.spans] == ["second", "third"]
+
+
+def test_failing_sink_never_reaches_the_caller(make_tracer):
+    tracer = make_tracer(ListSink(fail=True))
+    with tracer.span("turn"):
+        pass
+    tracer.flush()
+    wait_for(lambda: tracer.stats()["export_errors"] == 1)
+    assert tracer.stats()["buffered"] == 0
+
+
+def test_file_sink_writes_jsonl(make_tracer, tmp_path):
+    path = tmp_path / "traces" / "spans.jsonl"
+    tracer = make_tracer(FileSink(path))
+    with tracer.span("turn", question="What is a lag?"):
+        pass
+    tracer.flush()
+    wait_for(lambda: tracer.stats()["exported_spans"] == 1)
+    (record,) = [json.loads(line) for line in path.read_text().splitlines()]
+    assert record["name"] == "turn" and record["attributes"] == {"question": "What is a lag?"}
+
+
+def test_langsmith_runs_link_children_to_parents():
+    class Client:
+        runs = None
+
+        def batch_ingest_runs(self, create):
+            self.runs = create
+
+    client = Client()
+    root = tracing.Span("turn", "t1", None, {"run_type": "chain", "inputs": {"q": "hi"}})
+    child = tracing.Span("responses.create", "t1", root.span_id, {"run_type": "llm", "model": "gpt-4.1"})
+    root.end = child.end = time.time()
+    LangSmithSink(lambda: client, "course").export([child, root])
+    parent_run, child_run = client.runs
+    assert child_run["parent_run_id"] == parent_run["id"] == parent_run["trace_id"] == child_run["trace_id"]
+    assert child_run["dotted_order"].startswith(parent_run["dotted_order"] + ".")
+    assert (child_run["run_type"], child_run["extra"]) == ("llm", {"metadata": {"model": "gpt-4.1"}})
+    assert parent_run["inputs"] == {"q": "hi"} and parent_run["session_name"] == "course"
+
+
+def test_traced_is_a_no_op_without_a_tracer_and_spans_with_one(make_tracer, monkeypatch):
+    @tracing.traced()
+    def answer():
+        return "42"
+
+    @tracing.traced("stream")
+    def stream():
+        yield from "ab"
+
+    monkeypatch.setattr(tracing, "_tracer", None)
+    assert answer() == "42" and list(stream()) == ["a", "b"]
+
+    sink = ListSink()
+    monkeypatch.setattr(tracing, "_tracer", make_tracer(sink))
+    answer()
+    list(stream())
+    tracing._tracer.flush()
+    wait_for(lambda: len(sink.spans) == 2)
+    assert [s.name for s in sink.spans] == ["answer", "stream"]
@@ -0,0 +1,93 @@
+import threading
+import time
+
+import httpx
+import pytest
+from openai import OpenAI
+
+import assistant
+from benchmarks.mock_responses_api import MockConfig, start_in_thread
+from scheduler import CancelToken, RequestCancelledError, RequestScheduler
+from turn_worker import TurnWorker
+
+
+@pytest.fixture
+def slow_api():
+    """A mock Responses API that takes 5 s to the first token, and a client pointed at it"""
+    server = start_in_thread(MockConfig(ttft_ms=5000, ttft_sigma=0.0, tokens_per_second=100_000, output_tokens=5,
+                                        file_search_ms=0))
+    client = OpenAI(api_key="sk-mock", base_url=f"http://127.0.0.1:{server.server_address[1]}/v1",
+                    max_retries=0, http_client=httpx.Client(timeout=10))
+    yield client
+    server.shutdown()
+    server.server_close()
+
+
+def test_emitted_items_then_the_result():
+    def target(token, emit):
+        for word in ("ARIMA", "models"):
+            emit(word)
+        return "done"
+
+    worker = TurnWorker(target)
+    assert [item for item in worker.events(poll_interval=0.01) if item is not None] == ["ARIMA", "models"]
+    assert worker.result == "done"
+
+
+def test_polls_yield_none_while_nothing_arrives():
+    release = threading.Event()
+    worker = TurnWorker(lambda token, emit: release.wait(5))
+    events = worker.events(poll_interval=0.01)
+    assert next(events) is None
+    release.set()
+    assert all(item is None for item in events)
+    assert worker.result is True
+
+
+def test_errors_are_raised_on_the_reading_thread():
+    def target(token, emit):
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError, match="bad request"):
+        list(TurnWorker(target).events(poll_interval=0.01))
+
+
+def test_deadline_cancels_the_token_and_detaches():
+    release = threading.Event()
+    worker = TurnWorker(lambda token, emit: release.wait(5))
+    started = time.monotonic()
+    with pytest.raises(RequestCancelledError) as e:
+        list(worker.events(deadline=time.monotonic() + 0.05, poll_interval=0.01))
+    assert e.value.reason == "deadline" and worker.token.cancelled
+    assert time.monotonic() - started < 1  # Without waiting for the blocked call
+    release.set()
+
+
+def test_failure_after_cancel_is_reported_as_the_cancel():
+    token = CancelToken()
+
+    def target(token, emit):
+        token.wait(5)
+        raise ConnectionError("stream closed")
+
+    worker = TurnWorker(target, token)
+    token.cancel("stopped")
+    with pytest.raises(RequestCancelledError) as e:
+        list(worker.events(poll_interval=0.01))
+    assert e.value.reason == "stopped"
+
+
+def test_cancelling_disconnects_a_call_blocked_upstream(slow_api):
+    scheduler = RequestScheduler(max_concurrency=1, requests_per_minute=60_000, burst=100)
+    request = {"model": "gpt-4.1", "input": "ARIMA vs SARIMA?"}
+    worker = TurnWorker(lambda token, emit: assistant.create_response(slow_api, request, scheduler, "a",
+                                                                      cancel=token))
+    threading.Timer(0.3, worker.cancel, args=("stopped",)).start()
+    started = time.monotonic()
+    with pytest.raises(RequestCancelledError):
+        list(worker.events(poll_interval=0.01))
+    worker._thread.join(2)
+    # The worker's blocked read failed at once instead of waiting for the answer
+    assert not worker._thread.is_alive() and time.monotonic() - started < 2
+    stats = scheduler.stats()
+    assert (stats["active"], stats["cancelled"]) == (0, 1)
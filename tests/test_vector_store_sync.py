@@ -0,0 +1,112 @@
+import os
+
+import pytest
+
+import vector_store_sync
+from vector_store_sync import SyncManifest, plan_sync, scan_materials, sync
+
+
+@pytest.fixture
+def materials(tmp_path):
+    root = tmp_path / "materials"
+    for rel_path, text in {
+        "arima/01_sarimax_exogenous.py": "model = SARIMAX(y, exog=X)",
+        "prophet/02_prophet_holidays.txt": "Prophet takes a holidays dataframe.",
+        "notes.md": "Course notes",
+        "slides.pdf": "not synced",
+    }.items():
+        (root / rel_path).parent.mkdir(parents=True, exist_ok=True)
+        (root / rel_path).write_text(text, encoding="utf-8")
+    return root
+
+
+@pytest.fixture
+def store(mock_api, materials, tmp_path):
+    server, client = mock_api
+    store_id = client.vector_stores.create(name="course").id
+
+    def run(**options):
+        return sync(client, store_id, materials, tmp_path / "manifests", max_workers=2, **options)
+
+    return server.api, store_id, run
+
+
+def attached(api, store_id):
+    return {f["attributes"]["path"]: f["attributes"] for f in api.store_files(store_id)}
+
+
+def test_first_sync_uploads_and_tags_every_supported_file(store):
+    api, store_id, run = store
+    report = run()
+    assert (report["upload"], report["uploaded"], report["failed"]) == (3, 3, {})
+    assert attached(api, store_id)["arima/01_sarimax_exogenous.py"] == {
+        "path": "arima/01_sarimax_exogenous.py", "stem": "01_sarimax_exogenous", "part": "arima"}
+    report = run()
+    assert (report["unchanged"], report["uploaded"], report["attached"]) == (3, 0, 0)
+
+
+def test_changed_and_deleted_files_replace_and_remove_their_copies(store, materials):
+    api, store_id, run = store
+    run()
+    (materials / "notes.md").write_text("Course notes, revised", encoding="utf-8")
+    (materials / "prophet" / "02_prophet_holidays.txt").unlink()
+    report = run()
+    assert (report["uploaded"], report["deleted"], report["unchanged"]) == (1, 1, 1)
+    assert sorted(attached(api, store_id)) == ["arima/01_sarimax_exogenous.py", "notes.md"]
+    assert len(api.files) == 2  # The old copy of notes.md is gone too
+
+
+def test_interrupted_upload_is_attached_without_uploading_again(store, tmp_path):
+    api, store_id, run = store
+    run()
+    manifest = SyncManifest.for_store(store_id, tmp_path / "manifests")
+    entry = manifest.get("notes.md")
+    api.detach_file(store_id, entry["file_id"])
+    manifest.update("notes.md", state="uploaded")
+    uploads = api.stats["uploads"]
+    report = run()
+    assert (report["attach"], report["attached"]) == (1, 1)
+    assert api.stats["uploads"] == uploads and "notes.md" in attached(api, store_id)
+
+
+def test_files_without_their_part_are_retagged_in_place(store, tmp_path):
+    api, store_id, run = store
+    run()
+    SyncManifest.for_store(store_id, tmp_path / "manifests").update("arima/01_sarimax_exogenous.py", part=None)
+    uploads = api.stats["uploads"]
+    assert run()["retagged"] == 1
+    assert api.stats["uploads"] == uploads
+
+
+def test_dry_run_only_plans(store):
+    api, store_id, run = store
+    assert run(dry_run=True) == {"upload": 3, "attach": 0, "delete": 0, "retag": 0, "unchanged": 0}
+    assert api.stats["uploads"] == 0
+
+
+def test_scan_reuses_hashes_while_size_and_mtime_match(materials, tmp_path, monkeypatch):
+    manifest = SyncManifest(tmp_path / "manifest.json", "vs_1")
+    path = materials / "notes.md"
+    stat = path.stat()
+    manifest.update("notes.md", sha256="recorded", size=stat.st_size, mtime_ns=stat.st_mtime_ns, state="attached")
+    hashed = []
+    real_hash = vector_store_sync.file_sha256
+
+    def file_sha256(p):
+        hashed.append(p.name)
+        return real_hash(p)
+
+    monkeypatch.setattr(vector_store_sync, "file_sha256", file_sha256)
+    files = {f.rel_path: f for f in scan_materials(materials, manifest)}
+    assert files["notes.md"].sha256 == "recorded" and "notes.md" not in hashed
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    files = {f.rel_path: f for f in scan_materials(materials, manifest)}
+    assert files["notes.md"].sha256 == real_hash(path)
+    assert [f.rel_path for f in plan_sync(list(files.values()), manifest).upload] == [
+        "arima/01_sarimax_exogenous.py", "notes.md", "prophet/02_prophet_holidays.txt"]
+
+
+def test_manifest_of_another_store_is_ignored(tmp_path):
+    SyncManifest(tmp_path / "manifest.json", "vs_1").update("notes.md", sha256="abc")
+    assert SyncManifest(tmp_path / "manifest.json", "vs_2").entries == {}
+    assert SyncManifest(tmp_path / "manifest.json", "vs_1").get("notes.md") == {"sha256": "abc"}
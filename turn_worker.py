@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Upstream calls of a chat turn on a worker thread, so the turn can be cancelled
+
+Streamlit only stops or reruns a script at a yield point (any st.* call
+that sends something to the browser). A script thread blocked inside
+responses.create never reaches one, so a stop click, a reset or a closed
+tab waits for the whole answer. A TurnWorker runs the call on a daemon
+thread and hands over what it produces through a queue; the script thread
+polls it and repaints between polls, which is where Streamlit interrupts
+it. Cancelling the worker's token (when interrupted, or at the turn
+deadline) detaches the script thread, gives the scheduler slot back and
+disconnects the call's stream, so the worker's blocked read fails at once
+rather than when the next event arrives.
+"""
+
+import contextvars
+import queue
+import threading
+import time
+from typing import Any, Callable, Iterator, Optional
+
+from scheduler import CancelToken, RequestCancelledError
+
+_ITEM, _DONE, _FAILED = range(3)
+
+
+class TurnWorker:
+    """Run target(token, emit) on a daemon thread; the script thread reads emitted items with events()"""
+
+    def __init__(self, target: Callable[[CancelToken, Callable[[Any], None]], Any],
+                 token: Optional[CancelToken] = None, name: str = "turn-worker"):
+        self.token = token if token is not None else CancelToken()
+        self.result: Any = None
+        self._queue: "queue.Queue" = queue.Queue()
+        # Copy the context so spans opened by the worker nest under the turn's trace
+        context = contextvars.copy_context()
+        self._thread = threading.Thread(target=context.run, args=(self._run, target), name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self, target) -> None:
+        try:
+            result = target(self.token, lambda item: self._queue.put((_ITEM, item)))
+        except BaseException as e:
+            self._queue.put((_FAILED, e))
+        else:
+            self._queue.put((_DONE, result))
+
+    def events(self, deadline: Optional[float] = None, poll_interval: float = 0.05) -> Iterator[Any]:
+        """Yield each emitted item, or None after every poll_interval without one
+
+        Ends when the target returns (its return value is then in .result) and
+        re-raises what it raised. Past the deadline the token is cancelled and
+        RequestCancelledError("deadline") is raised here, on the script thread.
+        """
+        while True:
+            timeout = poll_interval
+            if deadline is not None:
+                timeout = min(timeout, max(deadline - time.monotonic(), 0.0))
+            try:
+                kind, value = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                if deadline is not None and time.monotonic() >= deadline:
+                    self.cancel("deadline")
+                    raise RequestCancelledError("deadline")
+                yield None
+                continue
+            if kind == _ITEM:
+                yield value
+            elif kind == _DONE:
+                self.result = value
+                return
+            elif self.token.cancelled:
+                # E.g. the read failing because cancelling closed the stream under it
+                raise RequestCancelledError(self.token.reason) from value
+            else:
+                raise value
+
+    def cancel(self, reason: str) -> bool:
+        return self.token.cancel(reason)
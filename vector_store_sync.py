@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Incremental sync of the course files into the OpenAI vector store
+
+Walks a course materials directory, hashes each transcript and script, and
+compares the hashes with a local manifest of what the store already holds.
+Only new or changed files are uploaded and attached, through a bounded
+thread pool; a changed file's old copy is removed once the new one is
+attached, and files deleted locally are removed from the store. The
+manifest is written after every step, so an interrupted sync picks up
+where it stopped (an upload that was never attached is attached, not
+uploaded again). Each file is attached with its path, filename stem and
+course part as attributes, which the app's shard routing filters on (see
+course_shards.py); files attached before they had a part are retagged in
+place, without uploading them again.
+
+Sync the store named by VECTOR_STORE_ID:
+    python vector_store_sync.py --materials course_materials
+Create a store first, or see what would change:
+    python vector_store_sync.py --create-store "Time Series Course"
+    python vector_store_sync.py --dry-run
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import config
+from course_shards import part_of
+from local_retrieval import SUPPORTED_SUFFIXES
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class SyncManifest:
+    """What one vector store holds, by path relative to the materials directory
+
+    Each entry records the content hash, the stat signature it was hashed
+    at, the uploaded file ID and its state: "uploaded" (not yet attached to
+    the store) or "attached", and the course part it is tagged with.
+    previous_file_id is an older copy still to be removed after a change.
+    """
+
+    def __init__(self, path: Path, vector_store_id: str):
+        self.path = Path(path)
+        self.vector_store_id = vector_store_id
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        if self.path.exists():
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if data.get("vector_store_id") == vector_store_id:
+                self.entries = data.get("files", {})
+
+    @classmethod
+    def for_store(cls, vector_store_id: str, manifest_dir: Path = config.VECTOR_STORE_MANIFEST_DIR) -> "SyncManifest":
+        return cls(Path(manifest_dir) / f"{vector_store_id}.json", vector_store_id)
+
+    def get(self, rel_path: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self.entries.get(rel_path)
+            return dict(entry) if entry is not None else None
+
+    def update(self, rel_path: str, **fields: Any) -> None:
+        with self._lock:
+            self.entries.setdefault(rel_path, {}).update(fields)
+            self._save()
+
+    def remove(self, rel_path: str) -> None:
+        with self._lock:
+            self.entries.pop(rel_path, None)
+            self._save()
+
+    def _save(self) -> None:
+        # Write-then-rename so an interruption never leaves a truncated manifest
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"vector_store_id": self.vector_store_id, "files": self.entries},
+                                  indent=1, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+@dataclass
+class LocalFile:
+    rel_path: str
+    path: Path
+    sha256: str
+    size: int
+    mtime_ns: int
+
+
+@dataclass
+class SyncPlan:
+    upload: List[LocalFile] = field(default_factory=list)  # New or changed
+    attach: List[LocalFile] = field(default_factory=list)  # Uploaded before an interruption, never attached
+    delete: List[str] = field(default_factory=list)  # In the store, gone from disk
+    retag: List[LocalFile] = field(default_factory=list)  # Attached, but not tagged with their current part
+    unchanged: int = 0
+
+    def summary(self) -> Dict[str, int]:
+        return {"upload": len(self.upload), "attach": len(self.attach),
+                "delete": len(self.delete), "retag": len(self.retag), "unchanged": self.unchanged}
+
+
+def scan_materials(materials_dir: Path, manifest: SyncManifest, rehash: bool = False) -> List[LocalFile]:
+    """Hash every supported file; a file whose size and mtime match its manifest entry keeps its recorded hash"""
+    materials_dir = Path(materials_dir)
+    files = []
+    for path in sorted(p for p in materials_dir.rglob("*") if p.is_file() and p.suffix.lower() in SUPPORTED_SUFFIXES):
+        rel_path = path.relative_to(materials_dir).as_posix()
+        stat = path.stat()
+        entry = manifest.get(rel_path)
+        if (not rehash and entry is not None
+                and entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns):
+            sha256 = entry["sha256"]
+        else:
+            sha256 = file_sha256(path)
+        files.append(LocalFile(rel_path, path, sha256, stat.st_size, stat.st_mtime_ns))
+    return files
+
+
+def plan_sync(files: List[LocalFile], manifest: SyncManifest) -> SyncPlan:
+    plan = SyncPlan()
+    for local in files:
+        entry = manifest.get(local.rel_path)
+        if entry is None or entry.get("sha256") != local.sha256:
+            plan.upload.append(local)
+        elif entry.get("state") == "uploaded":
+            plan.attach.append(local)
+        elif entry.get("part") != part_of(local.rel_path):
+            plan.retag.append(local)
+        else:
+            plan.unchanged += 1
+    on_disk = {local.rel_path for local in files}
+    plan.delete = sorted(rel_path for rel_path in manifest.entries if rel_path not in on_disk)
+    return plan
+
+
+class VectorStoreSync:
+    """Apply a SyncPlan to one vector store with a bounded pool of workers"""
+
+    def __init__(self, client, vector_store_id: str, manifest: SyncManifest,
+                 max_workers: int = config.VECTOR_STORE_SYNC_WORKERS):
+        self.client = client
+        self.vector_store_id = vector_store_id
+        self.manifest = manifest
+        self.max_workers = max_workers
+
+    def run(self, plan: SyncPlan) -> Dict[str, Any]:
+        started = time.perf_counter()
+        tasks = ([(self._upload, local) for local in plan.upload]
+                 + [(self._attach, local) for local in plan.attach]
+                 + [(self._retag, local) for local in plan.retag]
+                 + [(self._delete, rel_path) for rel_path in plan.delete])
+        done, failed = {"uploaded": 0, "attached": 0, "retagged": 0, "deleted": 0}, {}
+        pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="vector-store-sync")
+        try:
+            futures = {pool.submit(task, item): item for task, item in tasks}
+            for future in as_completed(futures):
+                item = futures[future]
+                rel_path = item if isinstance(item, str) else item.rel_path
+                try:
+                    done[future.result()] += 1
+                except Exception as e:
+                    # Left as-is in the manifest; the next sync retries it
+                    failed[rel_path] = f"{type(e).__name__}: {e}"
+        except KeyboardInterrupt:
+            # Finish the in-flight calls so the manifest matches the store, drop the rest
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+        pool.shutdown(wait=True)
+        return {**plan.summary(), **done, "failed": failed,
+                "seconds": round(time.perf_counter() - started, 2)}
+
+    def _upload(self, local: LocalFile) -> str:
+        entry = self.manifest.get(local.rel_path) or {}
+        if entry.get("state") == "uploaded":
+            # Changed again before its last upload was attached: that upload is stale
+            self._remove(entry["file_id"])
+            previous = entry.get("previous_file_id")
+        else:
+            previous = entry.get("file_id")
+        uploaded = self.client.files.create(file=(local.path.name, local.path.read_bytes()), purpose="assistants")
+        self.manifest.update(local.rel_path, sha256=local.sha256, size=local.size, mtime_ns=local.mtime_ns,
+                             file_id=uploaded.id, state="uploaded", previous_file_id=previous)
+        self._attach(local)
+        return "uploaded"
+
+    def _attach(self, local: LocalFile) -> str:
+        entry = self.manifest.get(local.rel_path)
+        part = part_of(local.rel_path)
+        self.client.vector_stores.files.create(
+            self.vector_store_id, file_id=entry["file_id"], attributes=file_attributes(local.rel_path, part),
+        )
+        self.manifest.update(local.rel_path, state="attached", size=local.size, mtime_ns=local.mtime_ns, part=part)
+        if entry.get("previous_file_id"):
+            self._remove(entry["previous_file_id"])
+            self.manifest.update(local.rel_path, previous_file_id=None)
+        return "attached"
+
+    def _retag(self, local: LocalFile) -> str:
+        entry = self.manifest.get(local.rel_path)
+        part = part_of(local.rel_path)
+        self.client.vector_stores.files.update(
+            entry["file_id"], vector_store_id=self.vector_store_id, attributes=file_attributes(local.rel_path, part),
+        )
+        self.manifest.update(local.rel_path, part=part)
+        return "retagged"
+
+    def _delete(self, rel_path: str) -> str:
+        entry = self.manifest.get(rel_path) or {}
+        for file_id in (entry.get("file_id"), entry.get("previous_file_id")):
+            if file_id:
+                self._remove(file_id)
+        self.manifest.remove(rel_path)
+        return "deleted"
+
+    def _remove(self, file_id: str) -> None:
+        """Detach from the store and delete the upload; either may already be gone"""
+        from openai import NotFoundError
+
+        try:
+            self.client.vector_stores.files.delete(file_id, vector_store_id=self.vector_store_id)
+        except NotFoundError:
+            pass
+        try:
+            self.client.files.delete(file_id)
+        except NotFoundError:
+            pass
+
+
+def file_attributes(rel_path: str, part: str) -> Dict[str, str]:
+    """Attributes a file is attached with; file_search filters on stem and part"""
+    return {"path": rel_path, "stem": Path(rel_path).stem, "part": part}
+
+
+def sync(client, vector_store_id: str, materials_dir: Path, manifest_dir: Path = config.VECTOR_STORE_MANIFEST_DIR,
+         max_workers: int = config.VECTOR_STORE_SYNC_WORKERS, rehash: bool = False,
+         dry_run: bool = False) -> Dict[str, Any]:
+    """Bring the vector store in line with materials_dir; returns counts per action"""
+    manifest = SyncManifest.for_store(vector_store_id, manifest_dir)
+    plan = plan_sync(scan_materials(materials_dir, manifest, rehash), manifest)
+    if dry_run:
+        return plan.summary()
+    return VectorStoreSync(client, vector_store_id, manifest, max_workers).run(plan)
+
+
+def make_client(base_url: Optional[str] = None, max_workers: int = config.VECTOR_STORE_SYNC_WORKERS):
+    """OpenAI client with a connection per worker; the SDK retries 429s and 5xx on its own"""
+    import httpx
+    from openai import OpenAI
+
+    return OpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"), base_url=base_url,
+        http_client=httpx.Client(limits=httpx.Limits(max_connections=max_workers),
+                                 timeout=httpx.Timeout(config.HTTP_TIMEOUT, connect=10.0)),
+        max_retries=3,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upload new and changed course files to the vector store")
+    parser.add_argument("--materials", type=Path, default=config.COURSE_MATERIALS_DIR)
+    parser.add_argument("--vector-store-id", default=os.getenv("VECTOR_STORE_ID"))
+    parser.add_argument("--create-store", metavar="NAME", help="Create a new vector store and sync into it")
+    parser.add_argument("--manifest-dir", type=Path, default=config.VECTOR_STORE_MANIFEST_DIR)
+    parser.add_argument("--workers", type=int, default=config.VECTOR_STORE_SYNC_WORKERS)
+    parser.add_argument("--rehash", action="store_true", help="Hash every file even if its size and mtime match")
+    parser.add_argument("--dry-run", action="store_true", help="Only print what would change")
+    parser.add_argument("--base-url", help="API base URL, e.g. a local mock")
+    args = parser.parse_args()
+
+    client = make_client(args.base_url, args.workers)
+    vector_store_id = args.vector_store_id
+    if args.create_store:
+        vector_store_id = client.vector_stores.create(name=args.create_store).id
+        print(f"✅ Created vector store {vector_store_id}; set VECTOR_STORE_ID={vector_store_id} in .env")
+    if not vector_store_id:
+        parser.error("No vector store: set VECTOR_STORE_ID, pass --vector-store-id or use --create-store")
+    if not args.materials.is_dir():
+        parser.error(f"Course materials directory not found: {args.materials}")
+
+    report = sync(client, vector_store_id, args.materials, args.manifest_dir, args.workers,
+                  rehash=args.rehash, dry_run=args.dry_run)
+    print(json.dumps(report, indent=2))
+    if report.get("failed"):
+        raise SystemExit(f"❌ {len(report['failed'])} files failed; run the sync again to retry them")
+
+
+if __name__ == "__main__":
+    main()